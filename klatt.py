@@ -17,14 +17,28 @@ Legal
  
  (C) Neil Tallim, Sydni Bennie, 2009
 """
+import array
+import ctypes
+import itertools
+import multiprocessing
+import multiprocessing.sharedctypes
 import optparse
+import random
 import re
 import sys
 
 import src.parwave as parwave
+import src.plan as plan
+import src.render_cache as render_cache
+import src.scheduler as scheduler
 import src.transform as transform
 import src.waveform as waveform
 
+_worker_options = None #: The options with which a pool worker renders paragraphs.
+_worker_output = None #: The shared buffer into which a pool worker writes the samples of chunks, if any.
+_worker_plan_reader = None #: The utterance plan from which a pool worker reads paragraphs, if any.
+_worker_synthesizer = None #: The synthesizer with which a pool worker renders paragraphs.
+
 def main(input_file, options):
 	"""
 	Renders the IPA found in input_file, producing a wavefile containing
@@ -37,46 +51,322 @@ def main(input_file, options):
 	"""
 	print "Language: '%s'" % (transform.language_rules.language.NAME)
 	
-	synthesizer = parwave.Synthesizer() #The synthesizer that will render speech.
+	if options.seed is not None: #Any integer is accepted, but seeds are packed as unsigned values.
+		options.seed = parwave.normalizeSeed(options.seed)
+		
+	if options.export_plan:
+		_exportPlan(input_file, options)
+		return
+		
+	plan_reader = None
+	if options.plan:
+		try:
+			plan_reader = plan.PlanReader(input_file)
+		except (IOError, ValueError), e:
+			print "Unable to read the utterance plan: %s" % (e)
+			sys.exit(1)
+			
+	if options.balance:
+		if options.continuous:
+			print "Sounds cannot be divided among processes in continuous mode."
+			sys.exit(1)
+		if options.seed is None: #Every process must derive the same noise for each sound.
+			options.seed = random.randint(0, 0xFFFFFFFF)
+			
+	try:
+		synthesizer = _prepareSynthesizer(options) #The synthesizer that will render speech.
+	except (OSError, ValueError), e:
+		print "Unable to prepare the synthesizer: %s" % (e)
+		sys.exit(1)
 	wave_form = None
 	try:
-  		wave_form = waveform.WaveForm(options.output) #The wavefile interface to which data will be dumped.
-  	except IOError:
-  		print "Unable to open '%s' for recording. Please close any applications that might be using it and try again." % (options.output)
-  		sys.exit(1)
-  	chomp_regexp = re.compile("\r?\n$") #A regular expression that cuts newlines off the ends of strings.
-  	silent_half_second = synthesizer.generateSilence(500) #Half of a second of silence.
-  	try:
-  		paragraph_count = 0
-		for paragraph in open(input_file):
-			paragraph = chomp_regexp.sub("", paragraph).strip()
-			if not paragraph: #Skip blank lines.
-				continue
-				
-			#Compensate for Microsoft Notepad.
-			if paragraph_count == 0 and paragraph.startswith('\xef\xbb\xbf'):
-				paragraph = paragraph[3:]
-				
-			paragraph_count += 1
-			print "Processing paragraph #%i..." % (paragraph_count)
-			paragraph = paragraph.decode('utf-8')
+		wave_form = waveform.WaveForm(options.output, synthesizer.getSampleRate()) #The wavefile interface to which data will be dumped.
+	except IOError:
+		print "Unable to open '%s' for recording. Please close any applications that might be using it and try again." % (options.output)
+		sys.exit(1)
+	silent_half_second = synthesizer.generateSilence(500) #Half of a second of silence.
+	pool = None
+	try:
+		if plan_reader:
+			paragraphs = plan_reader.getParagraphs()
+		else:
+			paragraphs = enumerate(_readParagraphs(input_file), 1)
+		if options.balance: #Every segment is laid out up front, then the script is divided into chunks of similar cost.
+			seed = options.seed
+			if synthesizer.getRenderCache(): #Sounds in a render cache are already seeded individually.
+				seed = None
+			placed_segments = transform.layoutSegments(_describeParagraphs(paragraphs, options, plan_reader), synthesizer.getSampleRate(), seed)
+			chunks = scheduler.scheduleChunks(placed_segments, options.jobs)
+			print "Rendering %i segments in %i chunks..." % (len(placed_segments), len(chunks))
+			if options.jobs > 1: #Chunks are independent, so they may be rendered in parallel, straight into a buffer that holds the whole script.
+				sample_count = 0
+				if placed_segments:
+					(segment, position, segment_sample_count, segment_seed) = placed_segments[-1]
+					sample_count = position + segment_sample_count
+				output = multiprocessing.sharedctypes.RawArray(ctypes.c_short, sample_count) #Zeroed, so silence need not be written.
+				pool = multiprocessing.Pool(options.jobs, _initWorker, (options, input_file, output))
+				pool.map(_renderChunkInWorker, chunks)
+				wave_form.addRawSamples(buffer(output))
+			else:
+				for chunk in chunks:
+					for segment in transform.renderPlacedSegments(chunk, options, synthesizer):
+						wave_form.addSamples(segment)
+		else:
+			if options.jobs > 1: #Paragraphs are independent, so they may be rendered in parallel, then written in order.
+				pool = multiprocessing.Pool(options.jobs, _initWorker, (options, input_file))
+				for samples in pool.imap(_renderParagraphInWorker, paragraphs):
+					wave_form.addSamples(samples)
+					wave_form.addSamples(silent_half_second) #Add a half-second of silence.
+			else:
+				for (paragraph_number, paragraph) in paragraphs:
+					for segment in _renderParagraph(paragraph_number, paragraph, options, synthesizer, plan_reader):
+						wave_form.addSamples(segment)
+					wave_form.addSamples(silent_half_second) #Add a half-second of silence.
+		wave_form.close()
+		if pool:
+			pool.close()
+			pool.join()
+			
+		if options.debug and not pool: #Workers' statistics are not collected.
+			print "Co-efficient cache: %(hits)i hits, %(misses)i misses, %(evictions)i evictions, %(entries)i/%(capacity)i entries" % (synthesizer.getCoefficientCache().getStatistics())
+			print "Expansion cache: %(hits)i hits, %(misses)i misses, %(evictions)i evictions, %(entries)i/%(capacity)i entries" % (transform.universal_rules.getExpansionCache().getStatistics())
+			if synthesizer.getRenderCache():
+				print "Render cache: %(hits)i hits, %(disk_hits)i disk hits, %(misses)i misses, %(evictions)i evictions, %(entries)i entries, %(bytes)i bytes" % (synthesizer.getRenderCache().getStatistics())
+	except Exception, e:
+		if pool:
+			pool.terminate()
+		print "An error occurred: %s" % (e)
+	if plan_reader:
+		plan_reader.close()
+		
+def _exportPlan(input_file, options):
+	"""
+	Applies every rule to the IPA found in input_file, writing the resulting
+	utterance plan instead of rendering it.
+	
+	@type input_file: basestring
+	@param input_file: A file containing synthesizable IPA.
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	"""
+	try:
+		plan_writer = plan.PlanWriter(options.export_plan)
+	except IOError:
+		print "Unable to open '%s' for writing." % (options.export_plan)
+		sys.exit(1)
+	try:
+		for (paragraph_number, paragraph) in enumerate(_readParagraphs(input_file), 1):
+			print "Processing paragraph #%i..." % (paragraph_number)
 			if options.verbose:
 				print u"'%s'" % (paragraph)
-				
-			for segment in transform.paragraphToSound(paragraph, options, synthesizer): #Convert and add the paragraph.
-				wave_form.addSamples(segment)
-			wave_form.addSamples(silent_half_second) #Add a half-second of silence.
-		wave_form.close()
+			plan_writer.addParagraph(paragraph_number, transform.paragraphToSegments(paragraph, options, paragraph_number))
 	except Exception, e:
 		print "An error occurred: %s" % (e)
+	plan_writer.close()
+	
+def _prepareSynthesizer(options):
+	"""
+	Creates a synthesizer configured by the given options.
+	
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	
+	@rtype: L{parwave.Synthesizer}
+	@return: A synthesizer, ready to render speech.
+	
+	@raise OSError: If the render cache's directory cannot be created.
+	@raise ValueError: If the options cannot be combined.
+	"""
+	cache = None #The cache in which rendered sounds are kept, if any.
+	if options.cache or options.cache_directory:
+		cache = render_cache.RenderCache(directory=options.cache_directory)
+	return parwave.Synthesizer(options.engine, seed=options.seed, continuous=options.continuous, render_cache=cache, sample_rate=options.sample_rate, preview=options.preview)
+	
+def _readParagraphs(input_file):
+	"""
+	Reads the paragraphs in input_file, one per non-blank line.
+	
+	Surrounding whitespace, and a byte-order mark at the start of the file,
+	are removed, so offsets reported within a paragraph are relative to the
+	stripped line.
+	
+	@type input_file: basestring
+	@param input_file: A file containing synthesizable IPA.
+	
+	@rtype: generator
+	@return: A generator that yields each paragraph as unicode.
+	"""
+	chomp_regexp = re.compile("\r?\n$") #A regular expression that cuts newlines off the ends of strings.
+	first_line = True
+	for paragraph in open(input_file):
+		#Compensate for Microsoft Notepad, before stripping, so whitespace after the mark is stripped too.
+		if first_line and paragraph.startswith('\xef\xbb\xbf'):
+			paragraph = paragraph[3:]
+		first_line = False
 		
+		paragraph = chomp_regexp.sub("", paragraph).strip()
+		if not paragraph: #Skip blank lines.
+			continue
+		yield paragraph.decode('utf-8')
+		
+def _renderParagraph(paragraph_number, paragraph, options, synthesizer, plan_reader=None):
+	"""
+	Renders a single paragraph.
+	
+	If a seed was given and no render cache is in use, noise is re-seeded for
+	each paragraph, so paragraphs sound the same no matter which process
+	renders them, or whether they are rendered from an utterance plan.
+	
+	@type paragraph_number: int
+	@param paragraph_number: The paragraph's position in the input, indexed
+	    from 1.
+	@type paragraph: unicode|tuple(2)
+	@param paragraph: The text to be synthesized or, if a plan reader is
+	    given, the location of its segments in the plan.
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	@type synthesizer: L{parwave.Synthesizer}
+	@param synthesizer: The synthesizer to use when rendering sounds.
+	@type plan_reader: L{plan.PlanReader}|None
+	@param plan_reader: The utterance plan from which the paragraph is read,
+	    if any.
+	
+	@rtype: generator
+	@return: A generator that yields arrays containing 16-bit integers that
+	    represent synthesized speech.
+	"""
+	if options.seed is not None and not synthesizer.getRenderCache(): #Sounds in a render cache are already seeded individually.
+		synthesizer.reseed((options.seed + paragraph_number) & 0xFFFFFFFF)
+	print "Processing paragraph #%i..." % (paragraph_number)
+	if plan_reader:
+		return transform.renderSegments(plan_reader.readSegments(*paragraph), options, synthesizer)
+	if options.verbose:
+		print u"'%s'" % (paragraph)
+	return transform.paragraphToSound(paragraph, options, synthesizer, paragraph_number)
+	
+def _describeParagraphs(paragraphs, options, plan_reader=None):
+	"""
+	Describes the segments of each paragraph, including the half-second of
+	silence that follows it, without synthesizing anything.
+	
+	@type paragraphs: iterable
+	@param paragraphs: A tuple for each paragraph, containing its position in
+	    the input, indexed from 1, and the text to be synthesized or, if a plan
+	    reader is given, the location of its segments in the plan.
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	@type plan_reader: L{plan.PlanReader}|None
+	@param plan_reader: The utterance plan from which paragraphs are read, if
+	    any.
+	
+	@rtype: generator
+	@return: A generator that yields, for each paragraph, its position in the
+	    input and a list of its segments, as described by the C{SEGMENT_*}
+	    enumeration of L{transform}.
+	"""
+	for (paragraph_number, paragraph) in paragraphs:
+		print "Processing paragraph #%i..." % (paragraph_number)
+		if plan_reader:
+			segments = list(plan_reader.readSegments(*paragraph))
+		else:
+			if options.verbose:
+				print u"'%s'" % (paragraph)
+			segments = list(transform.paragraphToSegments(paragraph, options, paragraph_number))
+		segments.append((transform.SEGMENT_PAUSE, 500)) #Add a half-second of silence.
+		yield (paragraph_number, segments)
+		
+def _initWorker(options, input_file, output=None):
+	"""
+	Prepares a pool worker to render paragraphs or chunks; the IPA tables and
+	language rules are already loaded, having been imported with this module.
+	
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	@type input_file: basestring
+	@param input_file: The file being rendered, which the worker maps for
+	    itself if it is an utterance plan.
+	@type output: ctypes.Array|None
+	@param output: The shared buffer of 16-bit integers, large enough for the
+	    whole script, into which chunks are rendered, if any.
+	"""
+	global _worker_options
+	global _worker_output
+	global _worker_plan_reader
+	global _worker_synthesizer
+	_worker_options = options
+	_worker_output = output
+	if options.plan:
+		_worker_plan_reader = plan.PlanReader(input_file)
+	_worker_synthesizer = _prepareSynthesizer(options)
+	
+def _renderParagraphInWorker(job):
+	"""
+	Renders a single paragraph in a pool worker.
+	
+	@type job: tuple(2)
+	@param job: The paragraph's position in the input, indexed from 1, and the
+	    text to be synthesized, or the location of its segments in the
+	    utterance plan.
+	
+	@rtype: array.array
+	@return: An array containing 16-bit integers that represent the whole
+	    paragraph's synthesized speech, joined so it can be sent back in one
+	    piece.
+	"""
+	(paragraph_number, paragraph) = job
+	samples = array.array('h')
+	for sounds in _renderParagraph(paragraph_number, paragraph, _worker_options, _worker_synthesizer, _worker_plan_reader):
+		samples.extend(sounds)
+	return samples
+	
+def _renderChunkInWorker(chunk):
+	"""
+	Renders a chunk of laid-out segments in a pool worker, writing each sound
+	into the shared output buffer at the position fixed by its layout, so no
+	samples need to be sent back.
+	
+	Silence is skipped, since the buffer starts zeroed and, with every sound
+	seeded individually, silence has no effect on the sounds that follow.
+	
+	@type chunk: list
+	@param chunk: The segments to be synthesized, as produced by
+	    L{transform.layoutSegments}.
+	
+	@rtype: int
+	@return: The number of samples written.
+	
+	@raise ValueError: If a sound's length does not match its layout.
+	"""
+	address = ctypes.addressof(_worker_output)
+	sample_size = ctypes.sizeof(ctypes.c_short)
+	placed_sounds = [placed_segment for placed_segment in chunk if placed_segment[0][0] == transform.SEGMENT_SOUND]
+	written_samples = 0
+	for (placed_sound, sounds) in itertools.izip(placed_sounds, transform.renderPlacedSegments(placed_sounds, _worker_options, _worker_synthesizer)):
+		(segment, position, sample_count, segment_seed) = placed_sound
+		if len(sounds) != sample_count:
+			raise ValueError("A sound at sample %i produced %i samples, rather than %i." % (position, len(sounds), sample_count))
+		ctypes.memmove(address + position * sample_size, sounds.buffer_info()[0], sample_count * sample_size)
+		written_samples += sample_count
+	return written_samples
+	
 if __name__ == '__main__':
 	parser = optparse.OptionParser(usage="%prog [options] <IPA script>", version="%s v%s" % ("Klatt CPSC 599", "June 13, 2009"),
 	 description="Renders IPA transcriptions as synthesized speech.")
+	parser.add_option("-C", "--cache", dest="cache", help="Keep rendered sounds in memory, so each distinct sound is only synthesized once", action="store_true", default=False)
+	parser.add_option("--cache-dir", dest="cache_directory", help="Also keep rendered sounds in the given directory, for use by later runs with the same seed (implies --cache)", type="string", default=None)
+	parser.add_option("-c", "--continuous", dest="continuous", help="Let each sound ring into the next, carrying glottal pulse phase along, instead of rendering and discarding a warm-up period for each", action="store_true", default=False)
 	parser.add_option("-d", "--debug", dest="debug", help="Output statistical information", action="store_true", default=False)
 	parser.add_option("-v", "--verbose", dest="verbose", help="Output intermediate state information", action="store_true", default=False)
+	parser.add_option("-p", "--preview", dest="preview", help="Render quickly at %iHz, without the highest formants, for auditioning" % (parwave.PREVIEW_SAMPLE_RATE), action="store_true", default=False)
+	parser.add_option("-r", "--rate", dest="sample_rate", help="Specify the output sample rate, in Hz (default: %i)" % (parwave.SAMPLE_RATE), type="int", default=parwave.SAMPLE_RATE)
+	parser.add_option("-j", "--jobs", dest="jobs", help="Render paragraphs in the given number of processes (default: 1)", type="int", default=1)
+	parser.add_option("-b", "--balance", dest="balance", help="Divide the script among --jobs processes by sound, rather than by paragraph, seeding each sound's noise individually, so output does not depend on the number of processes; not available with --continuous", action="store_true", default=False)
+	parser.add_option("-P", "--plan", dest="plan", help="Render an utterance plan, written by --export-plan, instead of an IPA script, skipping parsing and rules", action="store_true", default=False)
+	parser.add_option("-x", "--export-plan", dest="export_plan", help="Write the script's utterance plan to the given file, instead of rendering it", type="string", default=None)
 	parser.add_option("-o", "--output", dest = "output", help="Specify an alternate output wavefile (default: output.wav)", type="string", default="output.wav")
-	parser.add_option("-t", "--turbo", dest="turbo", help="Enable super-fast rendering at the expense of uniform noise", action="store_true", default=False)
+	parser.add_option("-e", "--engine", dest="engine", help="Select the rendering engine: %s (default: %s)" % (', '.join(parwave.ENGINES), parwave.ENGINE_REFERENCE), type="choice", choices=parwave.ENGINES, default=parwave.ENGINE_REFERENCE)
+	parser.add_option("-s", "--seed", dest="seed", help="Seed the noise generator, making output reproducible", type="int", default=None)
+	parser.add_option("-t", "--turbo", dest="turbo", help="Repeat the periodic, voiced part of each sound instead of rendering it in full, about three times faster with the reference engine, but little faster with the vectorized engine; ignored with --continuous", action="store_true", default=False)
 	(options, arguments) = parser.parse_args()
 	
 	if not arguments:
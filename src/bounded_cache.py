@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: src.bounded_cache
+ 
+Purpose
+=======
+ Provides the bounded, least-recently-used table shared by the caches that
+ spare synthesis from recomputing values it has already derived.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2009
+"""
+import collections
+
+class BoundedCache(object):
+	"""
+	A table of computed values that holds a fixed number of them, evicting the
+	least-recently-used value when it is full, and counts how effective it
+	has been.
+	
+	Subclasses describe what is stored and provide a lookup method that builds
+	a key and passes it to L{_fetch}, along with the means of computing the
+	value.
+	"""
+	_capacity = None #: The maximum number of values to hold.
+	_entries = None #: The values held, ordered from least- to most-recently used.
+	_evictions = 0 #: The number of values discarded to make room for others.
+	_hits = 0 #: The number of lookups satisfied by a stored value.
+	_misses = 0 #: The number of lookups that required a value to be computed.
+	
+	def __init__(self, capacity):
+		"""
+		Prepares an empty table.
+		
+		@type capacity: int
+		@param capacity: The maximum number of values to hold; 0 disables
+		    storage entirely.
+		"""
+		self._capacity = capacity
+		self._entries = collections.OrderedDict()
+		
+	def getStatistics(self):
+		"""
+		Describes how effective this table has been.
+		
+		@rtype: dict
+		@return: The number of 'hits', 'misses', and 'evictions' seen so far,
+		    plus the number of 'entries' held and the table's 'capacity'.
+		"""
+		return {
+		 'hits': self._hits,
+		 'misses': self._misses,
+		 'evictions': self._evictions,
+		 'entries': len(self._entries),
+		 'capacity': self._capacity,
+		}
+		
+	def _fetch(self, key, compute, *arguments):
+		"""
+		Retrieves a stored value, computing and storing it if necessary.
+		
+		@type key: hashable
+		@param key: Everything on which the value depends.
+		@type compute: callable
+		@param compute: The function that computes the value, which must never
+		    be None.
+		@type arguments: tuple
+		@param arguments: The arguments with which to call compute.
+		
+		@rtype: any
+		@return: The value.
+		"""
+		entries = self._entries
+		value = entries.pop(key, None)
+		if value is None:
+			self._misses += 1
+			value = compute(*arguments)
+			if not self._capacity:
+				return value
+			if len(entries) >= self._capacity:
+				entries.popitem(last=False)
+				self._evictions += 1
+		else:
+			self._hits += 1
+		entries[key] = value #(Re-)insert as the most-recently used value.
+		return value
+		
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: src.context
+ 
+Purpose
+=======
+ Provides read-only views onto the words and phonemes that surround the one
+ being synthesized, so rules can inspect their context without every position
+ in a sentence receiving its own copies.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2009
+"""
+class SequenceView(object):
+	"""
+	A read-only window onto a contiguous part of a sequence, which behaves like
+	a list of the elements it covers without copying them.
+	
+	Rules written for lists keep working: views may be indexed, sliced,
+	iterated, searched, measured, tested for truth, compared with lists, and
+	concatenated with lists, which produces a new list.
+	"""
+	__slots__ = ('_sequence', '_start', '_stop')
+	__hash__ = None #: Like lists, views are unhashable, since they compare by content.
+	
+	def __init__(self, sequence, start=0, stop=None):
+		"""
+		Prepares a view.
+		
+		@type sequence: sequence
+		@param sequence: The sequence to be viewed; it must not change while the
+		    view is in use.
+		@type start: int
+		@param start: The index of the first element covered.
+		@type stop: int|None
+		@param stop: The index after the last element covered; if omitted, the
+		    view extends to the end of the sequence.
+		"""
+		if stop is None:
+			stop = len(sequence)
+		self._sequence = sequence
+		self._start = start
+		self._stop = max(start, stop)
+		
+	def __len__(self):
+		"""
+		@rtype: int
+		@return: The number of elements covered.
+		"""
+		return self._stop - self._start
+		
+	def __nonzero__(self):
+		"""
+		@rtype: bool
+		@return: True if any elements are covered.
+		"""
+		return self._stop > self._start
+		
+	def __getitem__(self, index):
+		"""
+		Retrieves an element or, given a slice, a list of elements.
+		
+		@type index: int|slice
+		@param index: The position of the element within this view; negative
+		    values count from the end.
+		
+		@rtype: any
+		@return: The element, or a list of elements.
+		
+		@raise IndexError: If the position is not covered.
+		"""
+		if isinstance(index, slice):
+			(start, stop, step) = index.indices(self._stop - self._start)
+			return [self._sequence[self._start + i] for i in xrange(start, stop, step)]
+		if index < 0:
+			index += self._stop - self._start
+		if not 0 <= index < self._stop - self._start:
+			raise IndexError("view index out of range")
+		return self._sequence[self._start + index]
+		
+	def __iter__(self):
+		"""
+		@rtype: iterator
+		@return: An iterator over the elements covered, in order.
+		"""
+		sequence = self._sequence
+		return (sequence[i] for i in xrange(self._start, self._stop))
+		
+	def __reversed__(self):
+		"""
+		@rtype: iterator
+		@return: An iterator over the elements covered, in reverse order.
+		"""
+		sequence = self._sequence
+		return (sequence[i] for i in xrange(self._stop - 1, self._start - 1, -1))
+		
+	def __contains__(self, item):
+		"""
+		@type item: any
+		@param item: The element to be found.
+		
+		@rtype: bool
+		@return: True if the element is covered.
+		"""
+		for element in self:
+			if element == item:
+				return True
+		return False
+		
+	def __add__(self, other):
+		"""
+		@type other: sequence
+		@param other: The elements to follow those of this view.
+		
+		@rtype: list
+		@return: A new list of this view's elements, then the other's.
+		"""
+		return list(self) + list(other)
+		
+	def __radd__(self, other):
+		"""
+		@type other: sequence
+		@param other: The elements to precede those of this view.
+		
+		@rtype: list
+		@return: A new list of the other's elements, then this view's.
+		"""
+		return list(other) + list(self)
+		
+	def __eq__(self, other):
+		"""
+		@type other: any
+		@param other: The value to be compared; only lists, tuples, and views
+		    can be equal to a view.
+		
+		@rtype: bool
+		@return: True if the other value holds the same elements, in order.
+		"""
+		if not isinstance(other, (SequenceView, list, tuple)):
+			return NotImplemented
+		return len(self) == len(other) and list(self) == list(other)
+		
+	def __ne__(self, other):
+		"""
+		@type other: any
+		@param other: The value to be compared.
+		
+		@rtype: bool
+		@return: True unless the other value holds the same elements, in order.
+		"""
+		result = self.__eq__(other)
+		if result is NotImplemented:
+			return result
+		return not result
+		
+	def __repr__(self):
+		"""
+		@rtype: str
+		@return: A representation of the elements covered, as a list.
+		"""
+		return repr(list(self))
+		
+	def index(self, item):
+		"""
+		Finds the first occurrence of an element.
+		
+		@type item: any
+		@param item: The element to be found.
+		
+		@rtype: int
+		@return: The element's position within this view.
+		
+		@raise ValueError: If the element is not present.
+		"""
+		for (i, element) in enumerate(self):
+			if element == item:
+				return i
+		raise ValueError("%r is not in view" % (item,))
+		
+	def count(self, item):
+		"""
+		Counts the occurrences of an element.
+		
+		@type item: any
+		@param item: The element to be counted.
+		
+		@rtype: int
+		@return: The number of times the element appears within this view.
+		"""
+		return len([element for element in self if element == item])
+		
+		
+def precedingView(sequence, index):
+	"""
+	Provides a view of everything before a position in a sequence.
+	
+	@type sequence: sequence
+	@param sequence: The sequence to be viewed.
+	@type index: int
+	@param index: The position whose predecessors are wanted.
+	
+	@rtype: L{SequenceView}
+	@return: A view equivalent to C{sequence[:index]}.
+	"""
+	return SequenceView(sequence, 0, index)
+	
+def followingView(sequence, index):
+	"""
+	Provides a view of everything after a position in a sequence.
+	
+	@type sequence: sequence
+	@param sequence: The sequence to be viewed.
+	@type index: int
+	@param index: The position whose successors are wanted.
+	
+	@rtype: L{SequenceView}
+	@return: A view equivalent to C{sequence[index + 1:]}.
+	"""
+	return SequenceView(sequence, index + 1)
+	
\ No newline at end of file
@@ -24,6 +24,8 @@ Legal
  
  (C) Neil Tallim, Sydni Bennie, 2009
 """
+import re
+
 #Enumerations of consonant positions.
 LABIAL = 1 #: Identifies a consonant as labial.
 CORONAL = 2 #: Identifies a consonant as coronal.
@@ -1178,15 +1180,14 @@ _IPA_MAPPING = {
 } #: A neatly organized dictionary to make it easier for linguists to alter parameters.
 
 #Reduce IPA data to efficient structures.
-LIQUIDS = tuple([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['liquid']]) #: A list of all liquid phonemes.
-NASALS = tuple([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['nasal']]) #: A list of all nasal phonemes.
-STOPS = tuple([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['stop']]) #: A list of all stop phonemes.
-VOICED = tuple([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['voice']]) #: A list of all voiced phonemes.
-VOWELS = tuple([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['vowel']]) #: A list of all vowel phonemes.
+LIQUIDS = frozenset([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['liquid']]) #: A set of all liquid phonemes.
+NASALS = frozenset([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['nasal']]) #: A set of all nasal phonemes.
+STOPS = frozenset([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['stop']]) #: A set of all stop phonemes.
+VOICED = frozenset([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['voice']]) #: A set of all voiced phonemes.
+VOWELS = frozenset([ipa_character for (ipa_character, details) in _IPA_MAPPING.iteritems() if details['vowel']]) #: A set of all vowel phonemes.
 IPA_PARAMETERS = {} #: A collection of synthesizing parameter tuples, keyed by corresponding IPA character.
 IPA_REGIONS = {} #: A collection of phoneme regions, keyed by corresponding IPA character.
 IPA_DATA = {} #: A collection of both parameters and regions, in a tuple, keyed by corresponding IPA character.
-_COMPLEX_CHARACTERS = {} #: A collection of multi-character IPA symboles, arranged in a tier.
 for (ipa_character, details) in _IPA_MAPPING.iteritems():
 	#Extract an ordered tuple of data from the dictionary.
 	parameters = (
@@ -1215,15 +1216,106 @@ for (ipa_character, details) in _IPA_MAPPING.iteritems():
 	IPA_PARAMETERS[ipa_character] = parameters
 	IPA_REGIONS[ipa_character] = regions
 	IPA_DATA[ipa_character] = (parameters, regions)
-	
-	if len(ipa_character) == 2: #It's a multi-character symbol.
-		tails = _COMPLEX_CHARACTERS.get(ipa_character[0])
-		if tails is None:
-			tails = _COMPLEX_CHARACTERS[ipa_character[0]] = {}
-		tails[ipa_character[1]] = ipa_character
+_SYMBOL_PATTERN = u'|'.join([re.escape(ipa_character) for ipa_character in sorted(_IPA_MAPPING, key=len, reverse=True)]) #: An alternation of every IPA symbol, longest first, from which L{_SYMBOL_REGEXP} is compiled.
+_SYMBOL_REGEXP = None #: The regular expression that splits text into IPA symbols, each followed by any extension syntax, compiled on first use.
 del _IPA_MAPPING
 
+_CONTOUR_BLENDS = {} #: Sounds that ease one phoneme into or out of another, built as needed, keyed by (phoneme, neighbour).
+_LIAISON_BLENDS = {} #: Sounds that carry a word's terminal consonant into the next word's initial vowel, built as needed, keyed by (vowel, consonant).
+_NASAL_BLENDS = {} #: Pairs of nasalized variants of vowels, built as needed, keyed by (vowel, nasal).
+
 
+def getContourBlend(ipa_character, neighbour):
+	"""
+	Provides the sound that eases a phoneme into or out of a neighbouring
+	phoneme, made of two thirds of the phoneme and one third of its neighbour;
+	it serves as both a lead-in and a lead-out.
+	
+	Blends are built on first use and kept; integer values are blended with
+	integer division, like every other parameter arithmetic in this project.
+	
+	@type ipa_character: unicode
+	@param ipa_character: The phoneme being shaped.
+	@type neighbour: unicode
+	@param neighbour: The phoneme that precedes or follows it.
+	
+	@rtype: tuple(32)
+	@return: The blended parameters, without a duration.
+	"""
+	key = (ipa_character, neighbour)
+	blend = _CONTOUR_BLENDS.get(key)
+	if blend is None:
+		blend = _CONTOUR_BLENDS[key] = tuple([(c * 2 + n) / 3 for (c, n) in zip(IPA_PARAMETERS[ipa_character][:32], IPA_PARAMETERS[neighbour][:32])])
+	return blend
+	
+def getLiaisonBlend(ipa_character, previous_character):
+	"""
+	Provides the sound that carries the last character of a word into the
+	initial vowel of the next, made of equal parts of both.
+	
+	Blends are built on first use and kept.
+	
+	@type ipa_character: unicode
+	@param ipa_character: The vowel that begins the word.
+	@type previous_character: unicode
+	@param previous_character: The character that ended the previous word.
+	
+	@rtype: tuple(32)
+	@return: The blended parameters, without a duration.
+	"""
+	key = (ipa_character, previous_character)
+	blend = _LIAISON_BLENDS.get(key)
+	if blend is None:
+		blend = _LIAISON_BLENDS[key] = tuple([(c + p) / 2 for (c, p) in zip(IPA_PARAMETERS[ipa_character][:32], IPA_PARAMETERS[previous_character][:32])])
+	return blend
+	
+def getNasalBlends(vowel, nasal):
+	"""
+	Provides the two nasalized variants of a vowel that precedes a nasal: a
+	lead-in of two thirds vowel and one third nasal, and a terminator of one
+	third vowel and two thirds nasal.
+	
+	Blends are built on first use and kept.
+	
+	@type vowel: unicode
+	@param vowel: The vowel being nasalized.
+	@type nasal: unicode
+	@param nasal: The nasal that follows it.
+	
+	@rtype: tuple(2)
+	@return: The lead-in and terminator parameters, each a tuple(32), without
+	    durations.
+	"""
+	key = (vowel, nasal)
+	blends = _NASAL_BLENDS.get(key)
+	if blends is None:
+		values = zip(IPA_PARAMETERS[vowel][:32], IPA_PARAMETERS[nasal][:32])
+		blends = _NASAL_BLENDS[key] = (
+		 tuple([(v * 2 + n) / 3 for (v, n) in values]),
+		 tuple([(v + n * 2) / 3 for (v, n) in values]),
+		)
+	return blends
+	
+def findPhonemes(text):
+	"""
+	Finds every phoneme in a body of text, such as a whole sentence, in a
+	single pass, always matching the longest IPA symbol possible, whatever its
+	length.
+	
+	Characters that are not IPA symbols, like whitespace and punctuation, are
+	skipped, unless they are extension syntax that follows a symbol.
+	
+	@type text: unicode
+	@param text: The text to be reduced.
+	
+	@rtype: list
+	@return: A list of tuples, each containing the offset of a phoneme within
+	    the text, its IPA character, and a string of any extension syntax
+	    (C{<}, C{>}, C{+}, C{-}) that follows it.
+	"""
+	ipa_parameters = IPA_PARAMETERS #Cache for speed.
+	return [(match.start(), match.group(1), match.group(2)) for match in _getSymbolRegexp().finditer(text) if match.group(1) in ipa_parameters]
+	
 def reduceIPAClusters(token):
 	"""
 	Returns the input word as a collection of IPA characters, condensing
@@ -1237,36 +1329,23 @@ def reduceIPAClusters(token):
 	@return: A list of all IPA characters in the input token, adjusted to handle
 	    multi-character symbols, and containing all extension syntax.
 	"""
-	complex_characters = _COMPLEX_CHARACTERS #Cache for speed.
-	extension_characters = (u'<', u'>', u'+', u'-')
-	
 	output = []
-	consumed_next = False
-	for (i, c) in enumerate(token[:-1]):
-		if consumed_next: #Skip cycle.
-			consumed_next = False
-			continue
-			
-		if c in extension_characters: #Pass through extension syntax.
-			output.append(c)
-			continue
-			
-		#Determine whether this character forms part of a complex character.
-		complex_tails = complex_characters.get(c)
-		if complex_tails is None: #No match on the head.
-			output.append(c)
-			continue
-		else: #Head matched. Check tail.
-			complex_character = complex_tails.get(token[i + 1])
-			if complex_character is None: #Tail didn't match, so just add head.
-				output.append(c)
-				continue
-			else: #Tail matched, so add both the head and the tail, then skip the next cycle.
-				consumed_next = True
-				output.append(complex_character)
-				continue
-	if not consumed_next: #Don't add consumed terminals.
-		output.append(token[-1])
-		
+	for (symbol, extensions) in _getSymbolRegexp().findall(token):
+		output.append(symbol)
+		output.extend(extensions)
 	return output
+	
+def _getSymbolRegexp():
+	"""
+	Provides the regular expression that splits text into IPA symbols, each
+	followed by any extension syntax, compiling it on first use; any other
+	character is matched on its own.
+	
+	@rtype: re.RegexObject
+	@return: The compiled regular expression.
+	"""
+	global _SYMBOL_REGEXP
+	if _SYMBOL_REGEXP is None:
+		_SYMBOL_REGEXP = re.compile(u'(%s|.)([-+<>]*)' % (_SYMBOL_PATTERN), re.UNICODE | re.DOTALL)
+	return _SYMBOL_REGEXP
 	
\ No newline at end of file
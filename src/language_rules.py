@@ -16,7 +16,208 @@ Legal
 #Change the following line to use other language rulesets.
 import languages.english_canadian as language
 
-def applyRules(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, parameters_list):
+import ipa
+
+class PhonemeContext(object):
+	"""
+	Describes the sound being processed to language rules, which receive it in
+	place of a long list of arguments.
+	
+	One context is built for each phoneme and shared by every rule; only the
+	fields that describe the parameter-set being transformed change between
+	calls. Each field is described in the documentation of the language
+	module.
+	"""
+	__slots__ = (
+	 'ipa_character',
+	 'preceding_phonemes',
+	 'following_phonemes',
+	 'word_position',
+	 'remaining_words',
+	 'previous_words',
+	 'following_words',
+	 'sentence_position',
+	 'remaining_sentences',
+	 'is_quoted',
+	 'is_emphasized',
+	 'is_content',
+	 'is_question',
+	 'is_exclamation',
+	 'previous_phoneme_parameters',
+	 'remaining_phoneme_parameter_count',
+	 'previous_sound_parameters',
+	 'following_sound_parameters',
+	 'word_features',
+	)
+	
+class WordFeatures(object):
+	"""
+	Describes properties of a word that language rules would otherwise have to
+	recompute for each of its phonemes; they are gathered once per sentence,
+	by L{analyzeSentence}.
+	
+	@ivar word: The word's phonemes, joined.
+	@ivar vowel_count: The number of vowels in the word.
+	@ivar preceding_vowel_counts: For each phoneme in the word, the number of
+	    vowels that precede it.
+	@ivar last_vowel_index: The position of the word's last vowel, which
+	    forms its last syllable, indexed from 0, or None if it has no vowels.
+	@ivar is_question_word: True if the word is one of the language's
+	    question-words.
+	@ivar question_words_before: The number of question-words that precede
+	    the word in its sentence.
+	"""
+	__slots__ = (
+	 'word',
+	 'vowel_count',
+	 'preceding_vowel_counts',
+	 'last_vowel_index',
+	 'is_question_word',
+	 'question_words_before',
+	)
+	
+def _adaptRule(function):
+	"""
+	Wraps a rule function written for the original calling convention, which
+	takes every field of the context as a separate argument, so that it may be
+	called with a L{PhonemeContext}.
+	
+	@type function: callable
+	@param function: The rule function to be wrapped.
+	
+	@rtype: callable
+	@return: A function that takes a context and a parameter-set.
+	"""
+	def adaptedRule(context, parameters):
+		return function(
+		 context.ipa_character, context.preceding_phonemes, context.following_phonemes,
+		 context.word_position, context.remaining_words, context.previous_words, context.following_words,
+		 context.sentence_position, context.remaining_sentences,
+		 context.is_quoted, context.is_emphasized, context.is_content, context.is_question, context.is_exclamation,
+		 context.previous_phoneme_parameters, context.remaining_phoneme_parameter_count,
+		 context.previous_sound_parameters, context.following_sound_parameters,
+		 parameters
+		)
+	adaptedRule.__name__ = function.__name__
+	adaptedRule.__doc__ = function.__doc__
+	return adaptedRule
+	
+def _loadRules(language_module):
+	"""
+	Collects a language module's rule functions, wrapping them if they were
+	written for the original calling convention, as indicated by the absence
+	of C{RULE_API_VERSION}, and pairs each with the conditions it declares in
+	C{RULE_CONDITIONS}, if any.
+	
+	@type language_module: module
+	@param language_module: The language module whose rules are to be loaded.
+	
+	@rtype: tuple
+	@return: A (function, conditions) pair for every rule, in order, where the
+	    function is ready to be called with a L{PhonemeContext} and a
+	    parameter-set, and the conditions are None if undeclared.
+	"""
+	rule_conditions = getattr(language_module, 'RULE_CONDITIONS', {})
+	adapt = getattr(language_module, 'RULE_API_VERSION', 1) < 2
+	rules = []
+	for function in language_module.RULE_FUNCTIONS:
+		conditions = rule_conditions.get(function)
+		if adapt:
+			function = _adaptRule(function)
+		rules.append((function, conditions))
+	return tuple(rules)
+	
+def _compilePipeline(context):
+	"""
+	Assembles the rules that can affect the phoneme described by a context,
+	given its flags and IPA character, which are all that rule conditions may
+	depend upon.
+	
+	Pipelines are compiled once for each combination and kept for reuse.
+	
+	@type context: L{PhonemeContext}
+	@param context: A description of the phoneme being processed.
+	
+	@rtype: tuple
+	@return: A (function, multiplier) pair for every step, in order; the
+	    function is None for a rule that cannot fire, but whose multiplier is
+	    not 1.0, so pitch changes in exactly the same order.
+	"""
+	key = (context.ipa_character, context.is_quoted, context.is_emphasized, context.is_content, context.is_question, context.is_exclamation)
+	pipeline = _PIPELINES.get(key)
+	if pipeline is None:
+		pipeline = []
+		for (function, conditions) in _RULES:
+			if conditions is not None:
+				(flags, phonemes, inactive_multiplier) = conditions
+				if [flag for (flag, value) in flags if getattr(context, flag) != value] or (phonemes is not None and not context.ipa_character in phonemes):
+					if inactive_multiplier != 1.0:
+						pipeline.append((None, inactive_multiplier))
+					continue
+			pipeline.append((function, None))
+		pipeline = _PIPELINES[key] = tuple(pipeline)
+	return pipeline
+	
+def _analyzeWord(phonemes, question_words_before):
+	"""
+	Gathers the features of a single word.
+	
+	@type phonemes: sequence
+	@param phonemes: The word's phonemes, in order.
+	@type question_words_before: int
+	@param question_words_before: The number of question-words that precede
+	    the word in its sentence.
+	
+	@rtype: L{WordFeatures}
+	@return: A description of the word.
+	"""
+	vowels = ipa.VOWELS #Cache for efficiency.
+	
+	preceding_vowel_counts = []
+	vowel_count = 0
+	last_vowel_index = None
+	for (i, phoneme) in enumerate(phonemes):
+		preceding_vowel_counts.append(vowel_count)
+		if phoneme in vowels:
+			vowel_count += 1
+			last_vowel_index = i
+			
+	features = WordFeatures()
+	features.word = u''.join(phonemes)
+	features.vowel_count = vowel_count
+	features.preceding_vowel_counts = tuple(preceding_vowel_counts)
+	features.last_vowel_index = last_vowel_index
+	features.is_question_word = features.word in _QUESTION_WORDS
+	features.question_words_before = question_words_before
+	return features
+	
+def analyzeSentence(words):
+	"""
+	Gathers the features of every word in a sentence, in a single pass, so
+	language rules can look them up instead of scanning the sentence for each
+	phoneme.
+	
+	@type words: sequence
+	@param words: A collection of words, in order, each of which is a sequence
+	    of phonemes.
+	
+	@rtype: tuple
+	@return: A L{WordFeatures} object for each word, in order.
+	"""
+	features = []
+	question_words_before = 0
+	for phonemes in words:
+		word_features = _analyzeWord(phonemes, question_words_before)
+		if word_features.is_question_word:
+			question_words_before += 1
+		features.append(word_features)
+	return tuple(features)
+	
+_RULES = _loadRules(language) #: The current language's rules, using the context-based calling convention, with their conditions.
+_PIPELINES = {} #: Compiled rule pipelines, keyed by IPA character and flags.
+_QUESTION_WORDS = frozenset(getattr(language, 'QUESTION_WORDS', ())) #: The current language's question-words, if it declares any.
+
+def applyRules(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, parameters_list, word_features=None):
 	"""
 	Iterates through all parameters that make up the current phoneme, applying
 	all applicable language-specific rules, in a specific order, to each
@@ -62,9 +263,14 @@ def applyRules(ipa_character, preceding_phonemes, following_phonemes, word_posit
 	@type is_exclamation: bool
 	@param is_exclamation: True if the current sentence ends with an exclamation
 	    mark.
-	@type parameters_list: list
+	@type parameters_list: sequence
 	@param parameters_list: A collection of all sounds currently associated with
-	    the phoneme being processed.
+	    the phoneme being processed; neither it nor its parameter-sets, which
+	    may be tuples, are altered.
+	@type word_features: L{WordFeatures}|None
+	@param word_features: The features of the current word, as gathered by
+	    L{analyzeSentence}; if omitted, they are gathered from the phonemes and
+	    words given.
 	
 	@rtype: tuple(2)
 	@return: An updated list of parameters, consisting of transformations of
@@ -72,22 +278,48 @@ def applyRules(ipa_character, preceding_phonemes, following_phonemes, word_posit
 	    collection of f0 multiplier values, with higher numbers meaning
 	    lower-pitched sounds.
 	"""
-	rule_functions = language.RULE_FUNCTIONS
+	context = PhonemeContext()
+	context.ipa_character = ipa_character
+	context.preceding_phonemes = preceding_phonemes
+	context.following_phonemes = following_phonemes
+	context.word_position = word_position
+	context.remaining_words = remaining_words
+	context.previous_words = previous_words
+	context.following_words = following_words
+	context.sentence_position = sentence_position
+	context.remaining_sentences = remaining_sentences
+	context.is_quoted = is_quoted
+	context.is_emphasized = is_emphasized
+	context.is_content = is_content
+	context.is_question = is_question
+	context.is_exclamation = is_exclamation
+	if word_features is None:
+		word_features = _analyzeWord(list(preceding_phonemes) + [ipa_character] + list(following_phonemes), len([w for w in previous_words if w in _QUESTION_WORDS]))
+	context.word_features = word_features
+	pipeline = _compilePipeline(context)
 	
 	f0_multipliers = []
 	transformed_parameters = []
+	context.previous_phoneme_parameters = transformed_parameters
 	initial_parameter_count_zero = len(parameters_list) - 1
 	for (i, parameters) in enumerate(parameters_list): #Transforms each parameter-set in the input-list, in order.
-		parameters = parameters[:] #Make a local copy.
+		parameters = list(parameters) #Make a local, mutable copy; the input may be shared.
 		f0_multiplier = 1.0
-		preceding_parameters = []
-		following_parameters = []
-		for function in rule_functions: #Applies each language rule, in order. New parameters lists appear on either side of the central parameter set.
-			(preceding_params, following_params, multiplier) = function(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, transformed_parameters, initial_parameter_count_zero - i, preceding_parameters, following_parameters, parameters)
+		preceding_parameters = context.previous_sound_parameters = []
+		following_parameters = context.following_sound_parameters = []
+		context.remaining_phoneme_parameter_count = initial_parameter_count_zero - i
+		for (function, multiplier) in pipeline: #Applies each language rule, in order. New parameters lists appear on either side of the central parameter set.
+			if function is None: #The rule cannot fire, but still affects pitch.
+				f0_multiplier *= multiplier
+				continue
+			(preceding_params, following_params, multiplier) = function(context, parameters)
 			f0_multiplier *= multiplier
-			preceding_parameters = preceding_parameters + preceding_params
-			following_parameters = following_params + following_parameters
-			
+			#Rebind, rather than extend, so a rule that keeps the lists it was given never sees them change.
+			if preceding_params:
+				preceding_parameters = context.previous_sound_parameters = preceding_parameters + preceding_params
+			if following_params:
+				following_parameters = context.following_sound_parameters = following_params + following_parameters
+				
 		#Add everything that came out of the process to the parameters lists.
 		transformed_parameters += preceding_parameters + [parameters] + following_parameters
 		f0_multipliers += [f0_multiplier] * (len(preceding_parameters) + 1 + len(following_parameters))
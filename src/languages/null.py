@@ -22,6 +22,7 @@ Legal
 import src.ipa as ipa
 
 NAME = "null"
+RULE_API_VERSION = 2 #: Rule functions take a context object and a parameter-set.
 
 RULE_FUNCTIONS = (
 ) #: A collection of all functions to call, in order, to apply this language's rules. 
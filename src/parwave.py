@@ -17,11 +17,31 @@ Legal
  
  (C) Neil Tallim, Sydni Bennie, 2009
 """
+import array
 import math
 import random
 
-FREQUENCY = 10 #: A number that indicates the frequency of synthesized speech, as a multiple of 1000Hz.
-_F0_HZ = 80 #: The core rate at which sounds will repeat, controlling pitch.
+import bounded_cache
+
+numpy = None #: NumPy, once it has been imported by L{_importNumPy}; only the vectorized engine needs it, and importing it slows startup considerably.
+
+FREQUENCY = 10 #: A number that indicates the default frequency of synthesized speech, as a multiple of 1000Hz.
+SAMPLE_RATE = FREQUENCY * 1000 #: The default number of samples synthesized per second.
+PREVIEW_SAMPLE_RATE = 6400 #: The number of samples synthesized per second in preview mode; the lowest rate at which F1-F3 of every phoneme stay under L{_PREVIEW_FORMANT_LIMIT}.
+_F0_HZ = 80 #: The core rate at which sounds will repeat, controlling pitch, as a number of samples at L{SAMPLE_RATE}.
+_PREVIEW_FORMANT_LIMIT = 0.95 #: The fraction of the Nyquist frequency at or above which formants are dropped in preview mode.
+
+#Rendering engine enumeration.
+ENGINE_REFERENCE = 'reference' #: Identifies the sample-by-sample rendering engine.
+ENGINE_VECTORIZED = 'vectorized' #: Identifies the NumPy block-filtering rendering engine.
+ENGINES = (ENGINE_REFERENCE, ENGINE_VECTORIZED) #: All rendering engines, with the default first.
+
+_COEFFICIENT_CACHE_SIZE = 512 #: The default number of co-efficient sets held by a L{CoefficientCache}.
+_TURBO_PERIODS = 4 #: The number of glottal periods rendered exactly in turbo mode before the last is repeated.
+_RINGING_BLOCK = 64 #: The number of samples of a sound's ringing rendered at a time by the reference engine in continuous mode, until it falls silent.
+_RINGING_FLOOR = 1.0 / 32767 #: The output level below which a sound's ringing cannot be heard, since it does not reach one step of 16-bit output.
+_RINGING_WINDOW = 32 #: The number of consecutive samples that must stay below L{_RINGING_FLOOR} for a sound's ringing to be considered over.
+_SPECTRUM_DECAY = 60.0 #: The decay, in nepers, of a network's slowest resonance over the samples that follow a sound rendered in the frequency domain, so the ringing that wraps around is far below rounding error.
 
 class Synthesizer(object):
 	"""
@@ -29,18 +49,103 @@ class Synthesizer(object):
 	referenced papers.
 	"""
 	_cascade_resonators = None #: A collection of resonators to handle formants 1-6 in a cascading fashion.
+	_coefficient_cache = None #: The table from which resonator co-efficients are retrieved.
+	_continuous = False #: True if resonator state and pulse phase carry from one sound into the next.
+	_engine = None #: The engine used to render sounds; one of L{ENGINES}.
 	_glottal_antiresonator = None #: An anti-resonator for glottal frequencies.
 	_glottal_pole_resonator = None #: A resonator for glottal pole frequencies.
 	_glottal_sine_resonator = None #: A resonator for glottal sine frequencies.
+	_last_noise = 0.0 #: The last noise value used, carried between sounds in continuous mode.
 	_nasal_antiresonator = None #: An anti-resonator for nasal frequencies.
 	_nasal_pole_resonator = None #: A resonator for nasal pole frequencies.
-	_noise = 0.0 #: The last-generated random noise value, needed for echoing.
+	_noise_source = None #: The generator of white noise for aspiration and frication.
 	_parallel_resonators = None #: A collection of resonators to handle formants 2-6 in parallel.
+	_pulse_phase = None #: The number of samples since the last glottal pulse, carried between sounds in continuous mode.
+	_formant_count = 6 #: The number of formants rendered for the current sound, starting from F1.
+	_formant_limit = None #: The frequency at or above which formants are dropped.
+	_render_cache = None #: The cache in which rendered sounds are kept, if any.
+	_ringing = None #: Output still owed to the sounds that follow by the ringing of earlier sounds, in continuous mode.
+	_sample_rate = None #: The number of samples synthesized per second.
+	_seed = None #: The seed for this synthesizer's noise.
 	
-	def __init__(self):
+	def __init__(self, engine=ENGINE_REFERENCE, coefficient_cache=None, seed=None, continuous=False, render_cache=None, sample_rate=SAMPLE_RATE, preview=False):
 		"""
 		Prepares all resonator objects needed by this synthesizer.
+		
+		@type engine: basestring
+		@param engine: The engine used to render sounds. L{ENGINE_REFERENCE}
+		    steps every resonator once per sample; L{ENGINE_VECTORIZED} filters
+		    each segment as a block, which is much faster, but requires NumPy.
+		@type coefficient_cache: L{CoefficientCache}|None
+		@param coefficient_cache: The table from which resonator co-efficients
+		    will be retrieved; a new one is created if omitted, but one may be
+		    shared between synthesizers.
+		@type seed: int|None
+		@param seed: The seed for this synthesizer's noise; a given seed always
+		    produces the same speech. If omitted, noise is seeded unpredictably.
+		@type continuous: bool
+		@param continuous: If set, glottal pulse phase carries from each sound
+		    into the next, and so does each sound's ringing, so no warm-up
+		    period needs to be rendered and discarded to hide the click of
+		    resetting the resonators. Every sound starts from rest and is
+		    rendered until its ringing falls silent, and the part that outlasts
+		    it is added to the sounds that follow. This approximates carrying
+		    the network's state from sound to sound: it matches exactly only
+		    while co-efficients stay the same, and otherwise lets each sound
+		    ring out with its own, rather than retuning a ringing network, which
+		    would click. Silence breaks continuity, though it still lets the
+		    last sound ring out. The excitation is differentiated, rather than
+		    the result, which is equivalent within a sound, but keeps a network
+		    starting from rest from producing a step. Turbo rendering is
+		    ignored in this mode, since every sound is rendered whole.
+		@type render_cache: L{render_cache.RenderCache}|None
+		@param render_cache: A cache in which rendered sounds are kept, so each
+		    distinct sound is only synthesized once. Since a sound's noise must
+		    then depend only on its parameters and the seed, noise is re-seeded
+		    for every sound. If no seed was given, one is chosen at random.
+		@type sample_rate: int
+		@param sample_rate: The number of samples to synthesize per second.
+		    Formants at or above the Nyquist frequency, half of this rate, cannot
+		    be represented, so they are dropped.
+		@type preview: bool
+		@param preview: If set, speech is synthesized at no more than
+		    L{PREVIEW_SAMPLE_RATE}, and formants near the Nyquist frequency are
+		    dropped along with those above it, leaving out F4, F5, F6, and
+		    their parallel branches, but keeping F1-F3 of every phoneme; this is
+		    about twice as fast, at the expense of clarity, which makes it
+		    suitable for auditioning scripts.
+		
+		@raise ValueError: If the engine is unknown or cannot be used, if a
+		    render cache is combined with continuous mode, whose sounds depend on
+		    those before them, or if the sample rate is not positive.
 		"""
+		if not engine in ENGINES:
+			raise ValueError("Unknown rendering engine: '%s'." % (engine))
+		if engine == ENGINE_VECTORIZED and not _importNumPy():
+			raise ValueError("The '%s' engine requires NumPy." % (engine))
+		if continuous and render_cache is not None:
+			raise ValueError("Rendered sounds cannot be cached in continuous mode.")
+		if sample_rate <= 0:
+			raise ValueError("The sample rate must be positive: %i." % (sample_rate))
+		self._engine = engine
+		self._continuous = continuous
+		if coefficient_cache is None:
+			coefficient_cache = CoefficientCache()
+		self._coefficient_cache = coefficient_cache
+		if render_cache is not None and seed is None:
+			seed = random.randint(0, 0xFFFFFFFF)
+		if seed is not None:
+			seed = normalizeSeed(seed)
+		self._seed = seed
+		self._noise_source = NoiseSource(seed, engine == ENGINE_VECTORIZED)
+		self._render_cache = render_cache
+		if preview:
+			sample_rate = min(sample_rate, PREVIEW_SAMPLE_RATE)
+			self._formant_limit = sample_rate * 0.5 * _PREVIEW_FORMANT_LIMIT
+		else:
+			self._formant_limit = sample_rate * 0.5
+		self._sample_rate = sample_rate
+		
 		self._cascade_resonators = (
 		 _Resonator(),
 		 _Resonator(),
@@ -62,19 +167,76 @@ class Synthesizer(object):
 		self._nasal_antiresonator = _AntiResonator()
 		self._nasal_pole_resonator = _Resonator()
 		
+	def getCoefficientCache(self):
+		"""
+		Provides the table from which this synthesizer retrieves resonator
+		co-efficients.
+		
+		@rtype: L{CoefficientCache}
+		@return: The co-efficient table in use.
+		"""
+		return self._coefficient_cache
+		
+	def getSampleRate(self):
+		"""
+		Provides the number of samples this synthesizer produces per second,
+		which is the rate at which its output must be played.
+		
+		@rtype: int
+		@return: The sample rate in use.
+		"""
+		return self._sample_rate
+		
+	def getRenderCache(self):
+		"""
+		Provides the cache in which this synthesizer keeps rendered sounds.
+		
+		@rtype: L{render_cache.RenderCache}|None
+		@return: The render cache in use, if any.
+		"""
+		return self._render_cache
+		
+	def reseed(self, seed):
+		"""
+		Re-seeds this synthesizer's noise, so the sounds that follow are those a
+		new synthesizer with the given seed would render. If a render cache is
+		in use, the seed also selects which stored sounds are found.
+		
+		@type seed: int
+		@param seed: The new seed for this synthesizer's noise.
+		"""
+		seed = normalizeSeed(seed)
+		self._seed = seed
+		self._noise_source.reseed(seed)
+		
 	def generateSilence(self, milliseconds):
 		"""
-		Generates a period of silence and resets the noise value.
+		Generates a period of silence and resets the noise value, along with any
+		state carried between sounds in continuous mode.
 		
 		@type milliseconds: int
 		@param milliseconds: The number of milliseconds of silence to be
 		    generated.
 		
-		@rtype: tuple
-		@return: A collection of 0s, equal in length to milliseconds * 10.
+		@rtype: array.array
+		@return: A collection of 16-bit 0s, equal in length to milliseconds
+		    multiplied by the number of samples per millisecond; in continuous
+		    mode, the ringing of the last sound decays into it.
 		"""
-		self._noise = 0.0
-		return (0,) * int(milliseconds * FREQUENCY)
+		self._noise_source.reset()
+		silence = array.array('h', (0,)) * int(milliseconds * (self._sample_rate / 1000.0))
+		if self._continuous:
+			ringing = self._ringing
+			if ringing is not None:
+				if self._engine == ENGINE_VECTORIZED:
+					ringing = self._quantizeBlock(ringing[:len(silence)], 0)
+				else:
+					ringing = self._quantizeSamples(ringing[:len(silence)], 0)
+				silence[:len(ringing)] = ringing
+			self._last_noise = 0.0
+			self._pulse_phase = None
+			self._ringing = None
+		return silence
 		
 	def synthesize(self, parameters, f0_multiplier, turbo):
 		"""
@@ -90,15 +252,46 @@ class Synthesizer(object):
 		@param f0_multiplier: A modifier to apply to the f0 period. Larger vowels
 		    mean slower pitch.
 		@type turbo: bool
-		@param turbo: If set, repeats a single period's synthesized values for the
-		    entire duration of the sound, sacrificing subtle quality for speed.
+		@param turbo: If set, the voiced part of the sound, which is periodic, is
+		    rendered for a single period and repeated, while noise is rendered
+		    in full, giving nearly the same output for much less work. This has
+		    no effect in continuous mode, where each sound is rendered whole,
+		    along with its ringing.
 		
-		@rtype: tuple
-		@return: A collection of integers between -32768 and 32767 that represent
-		    synthetic speech.
+		@rtype: array.array
+		@return: A collection of 16-bit signed integers that represent synthetic
+		    speech.
+		"""
+		render_cache = self._render_cache
+		if render_cache is None:
+			return self._render(parameters, f0_multiplier, turbo)
+			
+		key = render_cache.makeKey(parameters, f0_multiplier, turbo, self._engine, self._seed, self._sample_rate, self._formant_limit)
+		sounds = render_cache.lookup(key)
+		if sounds is None:
+			self._noise_source.reseed(int(key[:8], 16)) #Derive the sound's noise from its key.
+			sounds = self._render(parameters, f0_multiplier, turbo)
+			render_cache.store(key, sounds)
+		return sounds[:] #Copy, so the caller cannot alter the stored sound.
+		
+	def _render(self, parameters, f0_multiplier, turbo):
+		"""
+		Renders the given parameters, as described in L{synthesize}.
+		
+		@type parameters: sequence(33)
+		@param parameters: A collection of synthesis parameters.
+		@type f0_multiplier: number
+		@param f0_multiplier: A modifier to apply to the f0 period.
+		@type turbo: bool
+		@param turbo: If set, the periodic, voiced part of the sound is rendered
+		    for a single period and repeated.
+		
+		@rtype: array.array
+		@return: A collection of 16-bit signed integers that represent synthetic
+		    speech.
 		"""
 		#Initialize parameters required for synthesis.
-		f0_hz = int(_F0_HZ * f0_multiplier)
+		f0_hz = int(_F0_HZ * f0_multiplier * (self._sample_rate / float(SAMPLE_RATE)))
 		(fgp, fgz, fgs, fnp, fnz,
 		 f1, f2, f3, f4, f5, f6,
 		 bgp, bgz, bgs, bnp, bnz,
@@ -106,6 +299,7 @@ class Synthesizer(object):
 		 a2, a3, a4, a5, a6,
 		 ab, ah, af, av, avs,
 		 milliseconds) = parameters
+		parallel_amplitudes = (a2, a3, a4, a5, a6)
 		
 		#Prepare all resonators.
 		self._initResonators(
@@ -113,18 +307,96 @@ class Synthesizer(object):
 		 (bgp, bgz, bgs, bnp, bnz, bw1, bw2, bw3, bw4, bw5, bw6)
 		)
 		
-		#Multiplex resonator collections.
-		resonator_collection = tuple([(c_r, p_r, a) for (c_r, p_r, a) in reversed(zip(self._cascade_resonators[1:], self._parallel_resonators, (a2, a3, a4, a5, a6)))])
-		cascade_resonator_1 = self._cascade_resonators[0]
+		samples_target = int(milliseconds * (self._sample_rate / 1000.0))
+		skipped_samples = 0
+		if not self._continuous: #Discard one full period to hide initial clicks.
+			skipped_samples = f0_hz
+		sample_count = samples_target + skipped_samples
+		period = f0_hz + 1 #The number of samples from one pulse to the next.
 		
-		#Set loop variables.
-		sounds = []
-		last_result = 0
-		period_index = f0_hz
-		samples_target = int(milliseconds * FREQUENCY)
-		for t in xrange(samples_target + f0_hz): #Run for the specified number of milliseconds, plus one full period to discard initial clicks.
-			noise = self._getNoise()
+		if self._engine == ENGINE_VECTORIZED:
+			(resonate, quantize) = (self._resonateBlock, self._quantizeBlock)
+			noise = self._noise_source.generateArray(sample_count)
+		else:
+			(resonate, quantize) = (self._resonateSamples, self._quantizeSamples)
+			noise = self._noise_source.generate(sample_count)
+			
+		plan = self._planNetwork(av, avs, ah, af, ab, parallel_amplitudes)
+		if self._continuous: #Render everything at once, along with the sound's ringing.
+			return quantize(self._renderContinuously(f0_hz, noise, av, avs, ah, af, ab, plan), 0)
+			
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = plan
+		if not (cascaded or parallel_collection or bypassed): #Nothing reaches the output; noise is still drawn, so the sounds that follow are unaffected by this shortcut.
+			return array.array('h', (0,)) * samples_target
+		if not turbo: #Render everything at once.
+			results = resonate(f0_hz, noise, av, avs, ah, af, ab, plan)
+			return quantize(results, skipped_samples)
+			
+		#The network is linear, so the response to glottal pulses and the response
+		#to noise can be rendered separately and summed. The former settles into a
+		#repeating cycle within a few periods, after which its last period is tiled.
+		voiced_count = min(sample_count, skipped_samples + period * _TURBO_PERIODS)
+		repeated_count = sample_count - voiced_count
+		voiced_plan = plan
+		if ah or af: #Leave the noise out of the voiced part.
+			voiced_plan = self._planNetwork(av, avs, 0, 0, ab, parallel_amplitudes)
+		if self._engine == ENGINE_VECTORIZED:
+			voiced_samples = resonate(f0_hz, numpy.zeros(voiced_count), av, avs, 0, 0, ab, voiced_plan)
+			voiced_samples = numpy.concatenate((voiced_samples, numpy.resize(voiced_samples[-period:], repeated_count)))
+		else: #Each pass is fed forward, so it can run one stage at a time, which is exact and much faster in pure Python.
+			pulses = [0.0] * voiced_count
+			pulses[::period] = [1.0] * len(pulses[::period])
+			voiced_samples = self._resonateSequences(pulses, [0.0] * voiced_count, av, avs, 0, 0, ab, voiced_plan)
+			cycle = voiced_samples[-period:]
+			voiced_samples += cycle * (repeated_count // period) + cycle[:repeated_count % period]
 			
+		if not (ah or af): #There is no noise to render.
+			return quantize(voiced_samples, skipped_samples)
+		for resonator in self._getResonators():
+			resonator.clear()
+		noisy_plan = self._planNetwork(0, 0, ah, af, ab, parallel_amplitudes)
+		if self._engine == ENGINE_VECTORIZED:
+			noisy_samples = resonate(f0_hz, noise, 0, 0, ah, af, ab, noisy_plan)
+			return quantize(voiced_samples + noisy_samples, skipped_samples)
+		noisy_samples = self._resonateSequences(None, noise, 0, 0, ah, af, ab, noisy_plan)
+		return quantize([v + n for (v, n) in zip(voiced_samples, noisy_samples)], skipped_samples)
+		
+	def _resonateSamples(self, f0_hz, noise_values, av, avs, ah, af, ab, plan):
+		"""
+		Passes a glottal pulse train and noise through the filter network, one
+		sample at a time.
+		
+		All resonators must already have been initialized for the sound.
+		
+		@type f0_hz: int
+		@param f0_hz: The number of samples between glottal pulses, less one.
+		@type noise_values: sequence
+		@param noise_values: The noise that drives aspiration and frication, one
+		    value per sample to be rendered.
+		@type av: number
+		@param av: The linear voicing gain.
+		@type avs: number
+		@param avs: The sinusoidal voicing gain.
+		@type ah: number
+		@param ah: The aspiration gain.
+		@type af: number
+		@param af: The frication gain.
+		@type ab: number
+		@param ab: The formant-bypass gain.
+		@type plan: tuple(5)
+		@param plan: The branches of the filter network that contribute, as
+		    determined by L{_planNetwork} for these gains.
+		
+		@rtype: list
+		@return: The network's output for each sample, before quantization.
+		"""
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = plan
+		cascade_collection = tuple(reversed(self._cascade_resonators[:self._formant_count]))
+		
+		#Set loop variables.
+		results = []
+		period_index = f0_hz #Start with a pulse.
+		for noise in noise_values:
 			#Apply linear f0 approximation.
 			pulse = 0.0
 			if period_index == f0_hz:
@@ -134,23 +406,53 @@ class Synthesizer(object):
 				period_index += 1
 				
 			#Compute cascade value.
-			source = self._glottal_pole_resonator.resonate(pulse)
-			source = (self._glottal_antiresonator.resonate(source) * av) + (self._glottal_sine_resonator.resonate(source) * avs)
-			source += noise * ah
-			source = self._nasal_pole_resonator.resonate(source)
-			source = self._nasal_antiresonator.resonate(source)
-			
+			if cascaded:
+				source = 0.0
+				if voiced:
+					source = self._glottal_pole_resonator.resonate(pulse)
+					source = (self._glottal_antiresonator.resonate(source) * av) + (self._glottal_sine_resonator.resonate(source) * avs)
+				if aspirated:
+					source += noise * ah
+				source = self._nasal_pole_resonator.resonate(source)
+				source = self._nasal_antiresonator.resonate(source)
+				for cascade_resonator in cascade_collection:
+					source = cascade_resonator.resonate(source)
+					
 			frication = noise * af
 			
-			result = frication * ab #Seed parallel value.
-			for (cascade_resonator, parallel_resonator, amplitude) in resonator_collection:
-				source = cascade_resonator.resonate(source) #Update cascade value.
+			result = 0.0
+			if bypassed: #Seed parallel value.
+				result = frication * ab
+			for (parallel_resonator, amplitude) in parallel_collection:
 				result += parallel_resonator.resonate(frication * amplitude) #Update parallel value.
-			result += cascade_resonator_1.resonate(source) #: Add final cascade value to final parallel value.
-			
-			output = result - last_result #Subtract last result from new result to introduce a micro-period into the waveform so it's audible to humans.
-			last_result = result
-			if t >= f0_hz: #Skip the first period to avoid popping.
+			if cascaded: #Add final cascade value to final parallel value.
+				result += source
+			results.append(result)
+		return results
+		
+	def _quantizeSamples(self, results, skipped_samples):
+		"""
+		Converts the network's output into integer samples, one at a time.
+		
+		@type results: sequence
+		@param results: The network's output for each rendered sample.
+		@type skipped_samples: int
+		@param skipped_samples: The number of samples to discard from the start
+		    of the output.
+		
+		@rtype: array.array
+		@return: A collection of 16-bit signed integers that represent synthetic
+		    speech.
+		"""
+		continuous = self._continuous
+		sounds = array.array('h')
+		last_result = 0.0
+		for (t, result) in enumerate(results):
+			output = result
+			if not continuous:
+				output = result - last_result #Subtract last result from new result to introduce a micro-period into the waveform so it's audible to humans.
+				last_result = result
+			if t >= skipped_samples: #Skip the first period to avoid popping.
 				output = int(output * 32767.0) #Convert the result to an integer on an appropriate scale.
 				#Constrain the output range, by clipping if necessary.
 				if output > 32767:
@@ -158,14 +460,129 @@ class Synthesizer(object):
 				elif output < -32768:
 					output = -32768
 				sounds.append(output)
+		return sounds
+		
+	def _resonateBlock(self, f0_hz, noise, av, avs, ah, af, ab, plan):
+		"""
+		Passes a glottal pulse train and noise through the filter network by
+		filtering whole blocks of samples at a time, producing the same output
+		as L{_resonateSamples}, within floating-point rounding.
+		
+		All resonators must already have been initialized for the sound.
+		
+		@type f0_hz: int
+		@param f0_hz: The number of samples between glottal pulses, less one.
+		@type noise: numpy.ndarray
+		@param noise: The noise that drives aspiration and frication, one value
+		    per sample to be rendered.
+		@type av: number
+		@param av: The linear voicing gain.
+		@type avs: number
+		@param avs: The sinusoidal voicing gain.
+		@type ah: number
+		@param ah: The aspiration gain.
+		@type af: number
+		@param af: The frication gain.
+		@type ab: number
+		@param ab: The formant-bypass gain.
+		@type plan: tuple(5)
+		@param plan: The branches of the filter network that contribute, as
+		    determined by L{_planNetwork} for these gains.
+		
+		@rtype: numpy.ndarray
+		@return: The network's output for each sample, before quantization.
+		"""
+		sample_count = noise.size
+		
+		#Apply linear f0 approximation.
+		pulses = numpy.zeros(sample_count)
+		pulses[::f0_hz + 1] = 1.0 #Start with a pulse.
+		
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = plan
+		
+		#Compute cascade values.
+		if cascaded:
+			source = numpy.zeros(sample_count)
+			if voiced:
+				source = self._glottal_pole_resonator.resonateBlock(pulses)
+				source = (self._glottal_antiresonator.resonateBlock(source) * av) + (self._glottal_sine_resonator.resonateBlock(source) * avs)
+			if aspirated:
+				source += noise * ah
+			source = self._nasal_pole_resonator.resonateBlock(source)
+			source = self._nasal_antiresonator.resonateBlock(source)
+			for cascade_resonator in reversed(self._cascade_resonators[:self._formant_count]):
+				source = cascade_resonator.resonateBlock(source)
 				
-				#Apply turbo mode processing.
-				if turbo and t == f0_hz * 2 - 1:
-					while len(sounds) * 2 < samples_target:
-						sounds *= 2
-					sounds += sounds[:samples_target - len(sounds)]
-					break
-		return tuple(sounds)
+		frication = noise * af
+		
+		if bypassed: #Seed parallel values.
+			result = frication * ab
+		else:
+			result = numpy.zeros(sample_count)
+		for (parallel_resonator, amplitude) in parallel_collection:
+			result += parallel_resonator.resonateBlock(frication * amplitude)
+		if cascaded:
+			result += source
+		return result
+		
+	def _quantizeBlock(self, results, skipped_samples):
+		"""
+		Converts the network's output into integer samples, all at once,
+		producing the same output as L{_quantizeSamples}.
+		
+		@type results: numpy.ndarray
+		@param results: The network's output for each rendered sample.
+		@type skipped_samples: int
+		@param skipped_samples: The number of samples to discard from the start
+		    of the output.
+		
+		@rtype: array.array
+		@return: A collection of 16-bit signed integers that represent synthetic
+		    speech.
+		"""
+		output = results[skipped_samples:]
+		if not self._continuous: #Subtract each result from its predecessor.
+			output = output - numpy.concatenate(((0.0,), results[:-1]))[skipped_samples:]
+		output = numpy.clip(numpy.trunc(output * 32767.0), -32768, 32767)
+		sounds = array.array('h')
+		sounds.fromstring(output.astype(numpy.int16).tostring())
+		return sounds
+		
+	def _planNetwork(self, av, avs, ah, af, ab, parallel_amplitudes):
+		"""
+		Determines which branches of the filter network contribute to the
+		current sound, so the rest can be skipped.
+		
+		Every sound's network starts from rest, so a branch is dead if its gain
+		is zero. Skipping a dead branch leaves the output exactly unchanged,
+		since it could only contribute zeroes.
+		
+		@type av: number
+		@param av: The linear voicing gain.
+		@type avs: number
+		@param avs: The sinusoidal voicing gain.
+		@type ah: number
+		@param ah: The aspiration gain.
+		@type af: number
+		@param af: The frication gain.
+		@type ab: number
+		@param ab: The formant-bypass gain.
+		@type parallel_amplitudes: sequence(5)
+		@param parallel_amplitudes: (a2, a3, a4, a5, a6) from the input
+		    parameters.
+		
+		@rtype: tuple(5)
+		@return: Whether the glottal resonators, aspiration, and the cascade
+		    branch contribute, a tuple of (resonator, amplitude) pairs for the
+		    parallel formants that do, from highest to lowest, and whether the
+		    formant bypass does.
+		"""
+		voiced = bool(av or avs)
+		aspirated = bool(ah)
+		cascaded = voiced or aspirated
+		parallel_collection = tuple([(p_r, a) for (p_r, a) in reversed(zip(self._parallel_resonators[:self._formant_count - 1], parallel_amplitudes)) if af and a])
+		bypassed = bool(af and ab)
+		return (voiced, aspirated, cascaded, parallel_collection, bypassed)
 		
 	def _initResonators(self, frequencies, bandwidths):
 		"""
@@ -179,36 +596,540 @@ class Synthesizer(object):
 		@param bandwidths: (bgp, bgz, bgs, bnp, bnz, bw1, bw2, bw3, bw4, bw5, bw6)
 		    from the input parameters.
 		"""
-		#I don't know the significance of this math, unfortunately.
-		pi_neg_div = math.pi * -0.0001
-		pi_2_div = 2.0 * math.pi * 0.0001
-		pi_neg_2_div = -pi_2_div
+		coefficients = self._coefficient_cache.lookup(frequencies, bandwidths, self._sample_rate)
+		(glottal_pole, glottal_zero, glottal_sine, nasal_pole, nasal_zero, cascade_1) = coefficients[:6]
 		
-		b = (bgp, bgz, bgs, bnp, bnz, b1, b2, b3, b4, b5, b6) = [n * m for (n, m) in zip([math.cos(pi_2_div * f) for f in frequencies], [2 * math.e ** (pi_neg_div * bw) for bw in bandwidths])]
-		c = (cgp, cgz, cgs, cnp, cnz, c1, c2, c3, c4, c5, c6) = [-math.e ** (pi_neg_2_div * bw) for bw in bandwidths]
-		a = (agp, agz, ags, anp, anz, a1, a2, a3, a4, a5, a6) = [1 - b_v - c_v for (b_v, c_v) in zip(b, c)]
+		#Drop every formant from the first that cannot be represented; F1 is always kept.
+		formant_count = 1
+		for frequency in frequencies[6:]:
+			if frequency >= self._formant_limit:
+				break
+			formant_count += 1
+		self._formant_count = formant_count
 		
-		self._cascade_resonators[0].init(a1, b1, c1)
-		for (a_n, b_n, c_n, c_r, p_r) in zip(a[6:], b[6:], c[6:], self._cascade_resonators[1:], self._parallel_resonators):
-			p_r.init(a_n, b_n, c_n)
-			c_r.init(a_n, b_n, c_n)
-		self._glottal_pole_resonator.init(agp, bgp, cgp)
-		self._glottal_sine_resonator.init(ags, bgs, cgs)
-		self._nasal_pole_resonator.init(anp, bnp, cnp)
-		self._glottal_antiresonator.init(agz, bgz, cgz)
-		self._nasal_antiresonator.init(anz, bnz, cnz)
+		self._cascade_resonators[0].load(cascade_1)
+		for (c_n, c_r, p_r) in zip(coefficients[6:formant_count + 5], self._cascade_resonators[1:], self._parallel_resonators):
+			p_r.load(c_n)
+			c_r.load(c_n)
+		for resonator in self._cascade_resonators[formant_count:] + self._parallel_resonators[formant_count - 1:]: #Dropped formants must not ring if restored.
+			resonator.clear()
+		self._glottal_pole_resonator.load(glottal_pole)
+		self._glottal_sine_resonator.load(glottal_sine)
+		self._nasal_pole_resonator.load(nasal_pole)
+		self._glottal_antiresonator.load(glottal_zero)
+		self._nasal_antiresonator.load(nasal_zero)
 		
-	def _getNoise(self):
+	def _renderContinuously(self, f0_hz, noise, av, avs, ah, af, ab, plan):
 		"""
-		Generates a random number and adds it to the last-generated random value.
+		Renders a sound from rest, along with its ringing, in continuous mode.
 		
-		@rtype: float
-		@return: A random value, half of which is echoed.
+		The output owed by earlier sounds' ringing is added to the result, and
+		the part of this sound's ringing that outlasts it is kept for the
+		sounds that follow. Ringing ends once the output stays below
+		L{_RINGING_FLOOR} for L{_RINGING_WINDOW} samples, or after a second,
+		since resonators with no bandwidth would ring forever.
+		
+		@type f0_hz: int
+		@param f0_hz: The number of samples between glottal pulses, less one.
+		@type noise: list|numpy.ndarray
+		@param noise: The noise that drives aspiration and frication, one value
+		    per sample of the sound.
+		@type av: number
+		@param av: The linear voicing gain.
+		@type avs: number
+		@param avs: The sinusoidal voicing gain.
+		@type ah: number
+		@param ah: The aspiration gain.
+		@type af: number
+		@param af: The frication gain.
+		@type ab: number
+		@param ab: The formant-bypass gain.
+		@type plan: tuple(5)
+		@param plan: The branches of the filter network that contribute, as
+		    determined by L{_planNetwork} for these gains.
+		
+		@rtype: list|numpy.ndarray
+		@return: The sound's output for each sample, before quantization.
+		"""
+		sample_count = len(noise)
+		limit = sample_count + self._sample_rate
+		(pulses, noise) = self._exciteContinuously(f0_hz, noise)
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = plan
+		if self._engine == ENGINE_VECTORIZED:
+			if cascaded or parallel_collection or bypassed:
+				results = self._resonateSpectrum(pulses, noise, av, avs, ah, af, ab, plan, limit)
+			else: #Nothing reaches the output.
+				results = numpy.zeros(sample_count)
+		else:
+			if cascaded or parallel_collection or bypassed:
+				results = self._resonateSequences(pulses, noise, av, avs, ah, af, ab, plan)
+				silence = [0.0] * _RINGING_BLOCK
+				while len(results) < limit and _findRingingEnd(results, sample_count) is None: #The network is fed forward and keeps its state, so its ringing can be rendered a block at a time.
+					results.extend(self._resonateSequences(silence, silence, av, avs, ah, af, ab, plan))
+			else: #Nothing reaches the output.
+				results = [0.0] * sample_count
+		results = results[:_findRingingEnd(results, sample_count)] #A slice up to None keeps everything.
+		
+		ringing = self._ringing
+		if ringing is not None: #Add the output owed by earlier sounds to the longer of the two.
+			if len(ringing) > len(results):
+				(results, ringing) = (ringing, results)
+			if self._engine == ENGINE_VECTORIZED:
+				results[:ringing.size] += ringing
+			else:
+				results = [r + g for (r, g) in zip(results, ringing)] + results[len(ringing):]
+		self._ringing = None
+		if len(results) > sample_count:
+			self._ringing = results[sample_count:]
+		return results[:sample_count]
+		
+	def _exciteContinuously(self, f0_hz, noise):
+		"""
+		Builds the differentiated glottal pulse train and noise that drive a
+		sound in continuous mode, continuing the last sound's pulse phase and
+		noise.
+		
+		@type f0_hz: int
+		@param f0_hz: The number of samples between glottal pulses, less one.
+		@type noise: list|numpy.ndarray
+		@param noise: The noise that drives aspiration and frication, one value
+		    per sample of the sound.
+		
+		@rtype: tuple(2)
+		@return: The differentiated pulses and noise, of the same type as
+		    noise.
+		"""
+		sample_count = len(noise)
+		if not sample_count:
+			return (noise, noise)
+			
+		pulse_phase = self._pulse_phase
+		if pulse_phase is None: #Start with a pulse.
+			pulse_phase = f0_hz
+		first_pulse = max(0, f0_hz - pulse_phase) #The period may have shrunk since the last pulse.
+		last_pulse = 0.0
+		if self._pulse_phase == 0: #The last sound ended with a pulse.
+			last_pulse = 1.0
+		last_noise = self._last_noise
+		
+		if first_pulse < sample_count:
+			self._pulse_phase = (sample_count - 1 - first_pulse) % (f0_hz + 1)
+		else:
+			self._pulse_phase = pulse_phase + sample_count
+		self._last_noise = float(noise[-1])
+		
+		if self._engine == ENGINE_VECTORIZED:
+			pulses = numpy.zeros(sample_count)
+			pulses[first_pulse::f0_hz + 1] = 1.0
+			pulses[1:] -= pulses[:-1].copy()
+			pulses[0] -= last_pulse
+			noise = noise.copy()
+			noise[1:] -= noise[:-1].copy()
+			noise[0] -= last_noise
+			return (pulses, noise)
+			
+		pulses = [0.0] * sample_count
+		for i in xrange(first_pulse, sample_count, f0_hz + 1):
+			pulses[i] = 1.0
+		pulses = [p - l for (p, l) in zip(pulses, [last_pulse] + pulses[:-1])]
+		noise = [n - l for (n, l) in zip(noise, [last_noise] + noise[:-1])]
+		return (pulses, noise)
+		
+	def _resonateSequences(self, pulses, noise, av, avs, ah, af, ab, plan):
+		"""
+		Passes a glottal pulse train and noise through the filter network one
+		stage at a time, producing exactly the output of L{_resonateSamples}
+		for the same excitation, without NumPy.
+		
+		The network is fed forward, so each stage can process every sample
+		before the next stage starts. Resonator state is kept, so the network
+		can be run again to continue the same sound.
+		
+		@type pulses: list|None
+		@param pulses: The glottal excitation, one value per sample to be
+		    rendered; unused, and may be None, if the plan is unvoiced.
+		@type noise: list
+		@param noise: The noise that drives aspiration and frication, one value
+		    per sample to be rendered.
+		@type av: number
+		@param av: The linear voicing gain.
+		@type avs: number
+		@param avs: The sinusoidal voicing gain.
+		@type ah: number
+		@param ah: The aspiration gain.
+		@type af: number
+		@param af: The frication gain.
+		@type ab: number
+		@param ab: The formant-bypass gain.
+		@type plan: tuple(5)
+		@param plan: The branches of the filter network that contribute, as
+		    determined by L{_planNetwork} for these gains.
+		
+		@rtype: list
+		@return: The network's output for each sample, before quantization.
+		"""
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = plan
+		
+		#Compute cascade values.
+		if cascaded:
+			source = [0.0] * len(noise)
+			if voiced:
+				source = self._glottal_pole_resonator.resonateSequence(pulses)
+				source = [(z * av) + (s * avs) for (z, s) in zip(self._glottal_antiresonator.resonateSequence(source), self._glottal_sine_resonator.resonateSequence(source))]
+			if aspirated:
+				source = [s + n * ah for (s, n) in zip(source, noise)]
+			source = self._nasal_pole_resonator.resonateSequence(source)
+			source = self._nasal_antiresonator.resonateSequence(source)
+			for cascade_resonator in reversed(self._cascade_resonators[:self._formant_count]):
+				source = cascade_resonator.resonateSequence(source)
+				
+		frication = [n * af for n in noise]
+		
+		if bypassed: #Seed parallel values.
+			results = [f * ab for f in frication]
+		else:
+			results = [0.0] * len(noise)
+		for (parallel_resonator, amplitude) in parallel_collection:
+			results = [r + p for (r, p) in zip(results, parallel_resonator.resonateSequence([f * amplitude for f in frication]))]
+		if cascaded:
+			results = [r + s for (r, s) in zip(results, source)]
+		return results
+		
+	def _resonateSpectrum(self, pulses, noise, av, avs, ah, af, ab, plan, limit):
+		"""
+		Passes a glottal pulse train and noise, starting from rest, through the
+		filter network in the frequency domain, where every stage is a single
+		multiplication, producing the sound and its ringing with one inverse
+		transform.
+		
+		The transform is long enough for the network's slowest resonance to
+		decay by L{_SPECTRUM_DECAY} after the sound, so the part of the ringing
+		that wraps around to the start is lost in rounding.
+		
+		@type pulses: numpy.ndarray
+		@param pulses: The glottal excitation, one value per sample of the
+		    sound.
+		@type noise: numpy.ndarray
+		@param noise: The noise that drives aspiration and frication, one value
+		    per sample of the sound.
+		@type av: number
+		@param av: The linear voicing gain.
+		@type avs: number
+		@param avs: The sinusoidal voicing gain.
+		@type ah: number
+		@param ah: The aspiration gain.
+		@type af: number
+		@param af: The frication gain.
+		@type ab: number
+		@param ab: The formant-bypass gain.
+		@type plan: tuple(5)
+		@param plan: The branches of the filter network that contribute, as
+		    determined by L{_planNetwork} for these gains.
+		@type limit: int
+		@param limit: The number of samples beyond which ringing is not
+		    rendered.
+		
+		@rtype: numpy.ndarray
+		@return: The network's output for each sample of the sound and its
+		    ringing, before quantization.
+		"""
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = plan
+		cascade_collection = tuple(reversed(self._cascade_resonators[:self._formant_count]))
+		
+		#Size the transform to the slowest resonance that contributes.
+		resonators = [parallel_resonator for (parallel_resonator, amplitude) in parallel_collection]
+		if cascaded:
+			resonators.extend((self._nasal_pole_resonator,) + cascade_collection)
+			if voiced:
+				resonators.extend((self._glottal_pole_resonator, self._glottal_sine_resonator))
+		radius = max([resonator.getRadius() for resonator in resonators] + [0.0])
+		span = limit
+		if radius == 0.0: #Only anti-resonators, which echo for two samples.
+			span = noise.size + 2
+		elif radius < 1.0:
+			span = min(limit, noise.size + 2 + int(_SPECTRUM_DECAY / -math.log(radius)))
+		fft_size = 1 << (span - 1).bit_length()
+		delays = numpy.exp(numpy.arange(fft_size // 2 + 1) * (-2j * math.pi / fft_size))
+		noise = numpy.fft.rfft(noise, fft_size)
+		
+		#Compute cascade values.
+		if cascaded:
+			source = numpy.zeros(delays.size, complex)
+			if voiced:
+				source = numpy.fft.rfft(pulses, fft_size) * self._glottal_pole_resonator.respond(delays)
+				source = source * ((self._glottal_antiresonator.respond(delays) * av) + (self._glottal_sine_resonator.respond(delays) * avs))
+			if aspirated:
+				source += noise * ah
+			source *= self._nasal_pole_resonator.respond(delays)
+			source *= self._nasal_antiresonator.respond(delays)
+			for cascade_resonator in cascade_collection:
+				source *= cascade_resonator.respond(delays)
+				
+		frication = noise * af
+		
+		if bypassed: #Seed parallel values.
+			result = frication * ab
+		else:
+			result = numpy.zeros(delays.size, complex)
+		for (parallel_resonator, amplitude) in parallel_collection:
+			result += parallel_resonator.respond(delays) * (frication * amplitude)
+		if cascaded:
+			result += source
+		return numpy.fft.irfft(result, fft_size)[:span]
+		
+	def _getResonators(self):
+		"""
+		Provides every resonator and anti-resonator used by this synthesizer.
+		
+		@rtype: tuple
+		@return: All resonators, in no particular order.
+		"""
+		return self._cascade_resonators + self._parallel_resonators + (
+		 self._glottal_antiresonator,
+		 self._glottal_pole_resonator,
+		 self._glottal_sine_resonator,
+		 self._nasal_antiresonator,
+		 self._nasal_pole_resonator,
+		)
+		
+class NoiseSource(object):
+	"""
+	Generates the echoed white noise that drives aspiration and frication, a
+	block at a time.
+	
+	Each value is a uniform random number added to the value before it. For
+	the vectorized engine, NumPy produces the random numbers; otherwise,
+	Python's generator does, seeded the way NumPy seeds its own, so a seed
+	reproduces the same noise with either engine.
+	"""
+	_echo = 0.0 #: The last-generated noise value, needed for echoing.
+	_random = None #: The seeded random number generator that feeds this source.
+	_vectorized = False #: True if NumPy produces the random numbers.
+	
+	def __init__(self, seed=None, vectorized=False):
+		"""
+		Prepares a noise source.
+		
+		@type seed: int|None
+		@param seed: The seed for the random number generator; if omitted, it is
+		    seeded unpredictably. Only its lowest 32 bits are used.
+		@type vectorized: bool
+		@param vectorized: If set, NumPy, which must already have been imported,
+		    produces the random numbers, so blocks may be generated as arrays.
+		"""
+		self._vectorized = vectorized
+		if vectorized:
+			if seed is not None:
+				seed = normalizeSeed(seed) #NumPy rejects seeds outside 32 bits.
+			self._random = numpy.random.RandomState(seed)
+		else:
+			self._random = random.Random()
+			if seed is not None:
+				self.reseed(seed)
+				
+	def reset(self):
+		"""
+		Clears the echoed value, so the next block starts from silence.
+		"""
+		self._echo = 0.0
+		
+	def reseed(self, seed):
+		"""
+		Re-seeds the random number generator and clears the echoed value, so
+		the next block is exactly the one that a new source with the same seed
+		would produce.
+		
+		@type seed: int
+		@param seed: The new seed for the random number generator; only its
+		    lowest 32 bits are used.
+		"""
+		seed = normalizeSeed(seed) #NumPy rejects seeds outside 32 bits.
+		if self._vectorized:
+			self._random.seed(seed)
+		else:
+			self._random.setstate(_seedMersenneTwister(seed))
+		self.reset()
+		
+	def generate(self, count):
+		"""
+		Generates a block of noise values.
+		
+		@type count: int
+		@param count: The number of values to generate.
+		
+		@rtype: list
+		@return: A list of floats, each of which echoes all before it.
+		"""
+		if not self._vectorized:
+			uniform = self._random.uniform #Cache for speed.
+			echo = self._echo
+			values = []
+			for t in xrange(count):
+				echo = uniform(-0.00001, 0.00001) + echo
+				values.append(echo)
+			self._echo = echo
+			return values
+		return self.generateArray(count).tolist()
+		
+	def generateArray(self, count):
+		"""
+		Generates a block of noise values as an array, which requires a
+		vectorized source.
+		
+		@type count: int
+		@param count: The number of values to generate.
+		
+		@rtype: numpy.ndarray
+		@return: An array of floats, each of which echoes all before it.
+		"""
+		values = self._random.uniform(-0.00001, 0.00001, count)
+		if count:
+			values[0] += self._echo
+			values = numpy.cumsum(values)
+			self._echo = float(values[-1])
+		return values
+		
+		
+def normalizeSeed(seed):
+	"""
+	Reduces a seed to the 32 bits that determine noise, so that any integer,
+	including a negative one, names the same noise everywhere it is used.
+	
+	@type seed: int
+	@param seed: The seed, as given.
+	
+	@rtype: int
+	@return: The seed's lowest 32 bits, as a non-negative integer.
+	"""
+	return seed & 0xFFFFFFFF
+	
+def _importNumPy():
+	"""
+	Imports NumPy, if it has not been imported already.
+	
+	@rtype: bool
+	@return: True if NumPy is available.
+	"""
+	global numpy
+	if numpy is None:
+		try:
+			import numpy as numpy_module
+		except ImportError:
+			return False
+		numpy = numpy_module
+	return True
+	
+def _seedMersenneTwister(seed):
+	"""
+	Describes the state in which NumPy's generator is left by a 32-bit seed,
+	which Python's generator, also a Mersenne Twister, seeds differently.
+	
+	@type seed: int
+	@param seed: The seed; only its lowest 32 bits are used.
+	
+	@rtype: tuple
+	@return: A state suitable for C{random.Random.setstate}.
+	"""
+	state = [seed & 0xFFFFFFFF]
+	for i in xrange(1, 624):
+		previous = state[-1]
+		state.append((1812433253 * (previous ^ (previous >> 30)) + i) & 0xFFFFFFFF)
+	state.append(624) #Every word must be tempered anew before it is used.
+	return (3, tuple(state), None)
+	
+class CoefficientCache(bounded_cache.BoundedCache):
+	"""
+	A bounded table of resonator co-efficients, keyed by the frequencies and
+	bandwidths from which they are derived.
+	
+	Rules tend to produce the same parameters over and over, so computing each
+	set once saves a lot of trigonometry; when the table is full, the
+	least-recently-used set is evicted.
+	"""
+	def __init__(self, capacity=_COEFFICIENT_CACHE_SIZE):
+		"""
+		Prepares an empty co-efficient table.
+		
+		@type capacity: int
+		@param capacity: The maximum number of co-efficient sets to hold; 0
+		    disables storage entirely.
+		"""
+		bounded_cache.BoundedCache.__init__(self, capacity)
+		
+	def lookup(self, frequencies, bandwidths, sample_rate=SAMPLE_RATE):
+		"""
+		Retrieves the co-efficients for a collection of resonators, computing
+		them if necessary.
+		
+		@type frequencies: sequence(11)
+		@param frequencies: (fgp, fgz, fgs, fnp, fnz, f1, f2, f3, f4, f5, f6)
+		    from the input parameters.
+		@type bandwidths: sequence(11)
+		@param bandwidths: (bgp, bgz, bgs, bnp, bnz, bw1, bw2, bw3, bw4, bw5, bw6)
+		    from the input parameters.
+		@type sample_rate: int
+		@param sample_rate: The number of samples synthesized per second.
+		
+		@rtype: tuple(11)
+		@return: An (a, b, c) tuple for each frequency, ready to be loaded into
+		    the corresponding resonator; the glottal and nasal zeroes are
+		    already inverted for use by anti-resonators.
 		"""
-		self._noise = random.uniform(-0.00001, 0.00001) + self._noise
-		return self._noise
+		key = tuple(frequencies) + tuple(bandwidths) + (sample_rate,)
+		return self._fetch(key, _computeCoefficients, frequencies, bandwidths, sample_rate)
 		
 		
+def _computeCoefficients(frequencies, bandwidths, sample_rate):
+	"""
+	Derives resonator co-efficients from frequency and bandwidth values.
+	
+	@type frequencies: sequence(11)
+	@param frequencies: (fgp, fgz, fgs, fnp, fnz, f1, f2, f3, f4, f5, f6)
+	    from the input parameters.
+	@type bandwidths: sequence(11)
+	@param bandwidths: (bgp, bgz, bgs, bnp, bnz, bw1, bw2, bw3, bw4, bw5, bw6)
+	    from the input parameters.
+	@type sample_rate: int
+	@param sample_rate: The number of samples synthesized per second.
+	
+	@rtype: tuple(11)
+	@return: An (a, b, c) tuple for each frequency, with the glottal and nasal
+	    zeroes inverted for use by anti-resonators.
+	"""
+	#I don't know the significance of this math, unfortunately.
+	period = 1.0 / sample_rate
+	pi_neg_div = math.pi * -period
+	pi_2_div = 2.0 * math.pi * period
+	pi_neg_2_div = -pi_2_div
+	
+	b = [n * m for (n, m) in zip([math.cos(pi_2_div * f) for f in frequencies], [2 * math.e ** (pi_neg_div * bw) for bw in bandwidths])]
+	c = [-math.e ** (pi_neg_2_div * bw) for bw in bandwidths]
+	a = [1 - b_v - c_v for (b_v, c_v) in zip(b, c)]
+	
+	coefficients = zip(a, b, c)
+	coefficients[1] = _invertCoefficients(*coefficients[1]) #Glottal zero.
+	coefficients[4] = _invertCoefficients(*coefficients[4]) #Nasal zero.
+	return tuple(coefficients)
+	
+def _invertCoefficients(a, b, c):
+	"""
+	Converts resonator co-efficients into anti-resonator co-efficients.
+	
+	@type a: number
+	@param a: The reciprocal of the value to be multiplied by the input.
+	@type b: number
+	@param b: The value to be multiplied by -1.0/a and the last-stored input.
+	@type c: number
+	@param c: The value to be multiplied by -1.0/a and the second-last-stored
+	    input.
+	
+	@rtype: tuple(3)
+	@return: The anti-resonator's (a, b, c) co-efficients.
+	"""
+	a = 1.0 / a
+	return (a, -b * a, -c * a)
+	
+	
 class _Resonator(object):
 	"""
 	A simulator of a two-tier echoing chamber.
@@ -216,8 +1137,8 @@ class _Resonator(object):
 	_a = None #: The co-efficient for the input value in each cycle.
 	_b = None #: The co-efficient for the value stored in the last cycle.
 	_c = None #: The co-efficient for the value stored in the second-last cycle.
-	_delay_1 = None #: The last-stored value for use in successive resonance.
-	_delay_2 = None #: The second-last-stored value for use in successive resonance.
+	_delay_1 = 0.0 #: The last-stored value for use in successive resonance.
+	_delay_2 = 0.0 #: The second-last-stored value for use in successive resonance.
 	
 	def init(self, a, b, c):
 		"""
@@ -230,11 +1151,51 @@ class _Resonator(object):
 		@type c: number
 		@param c: The value to be multiplied by the second-last-generated output.
 		"""
-		self._a = a
-		self._b = b
-		self._c = c
+		self.load((a, b, c))
+		
+	def load(self, coefficients):
+		"""
+		Sets precomputed resonance parameters and resets the echo queue.
+		
+		@type coefficients: sequence(3)
+		@param coefficients: The (a, b, c) co-efficients, used exactly as given.
+		"""
+		self.clear()
+		(self._a, self._b, self._c) = coefficients
+		
+	def clear(self):
+		"""
+		Empties the echo queue.
+		"""
 		self._delay_1 = self._delay_2 = 0.0
 		
+	def getRadius(self):
+		"""
+		Measures how slowly the resonator's echoes decay.
+		
+		@rtype: float
+		@return: The largest magnitude among the resonator's poles; echoes
+		    shrink by this factor with every sample.
+		"""
+		(b, c) = (self._b, self._c)
+		discriminant = b * b + 4.0 * c
+		if discriminant >= 0.0: #Real poles.
+			return (abs(b) + math.sqrt(discriminant)) / 2.0
+		return math.sqrt(-c)
+		
+	def respond(self, delays):
+		"""
+		Computes the resonator's frequency response, as though it were at rest.
+		
+		@type delays: numpy.ndarray
+		@param delays: The complex factor by which a delay of one sample
+		    multiplies each frequency.
+		
+		@rtype: numpy.ndarray
+		@return: The complex gain applied to each frequency.
+		"""
+		return self._a / (1.0 - (self._b + self._c * delays) * delays)
+		
 	def resonate(self, input):
 		"""
 		Resonates the input value, producing output.
@@ -251,6 +1212,63 @@ class _Resonator(object):
 		self._delay_1 = output
 		return output
 		
+	def resonateSequence(self, inputs):
+		"""
+		Resonates a sequence of input values, producing the same output as
+		successive calls to L{resonate}, without NumPy.
+		
+		@type inputs: sequence
+		@param inputs: The values to be resonated.
+		
+		@rtype: list
+		@return: The results of resonance.
+		"""
+		(a, b, c) = (self._a, self._b, self._c) #Cache for speed.
+		(delay_1, delay_2) = (self._delay_1, self._delay_2)
+		outputs = []
+		for input in inputs:
+			(delay_1, delay_2) = (a * input + b * delay_1 + c * delay_2, delay_1)
+			outputs.append(delay_1)
+		(self._delay_1, self._delay_2) = (delay_1, delay_2)
+		return outputs
+		
+	def resonateBlock(self, inputs):
+		"""
+		Resonates a block of input values in a single operation, producing the
+		same output as successive calls to L{resonate}.
+		
+		The last outputs are stored for use in successive resonance.
+		
+		@type inputs: numpy.ndarray
+		@param inputs: The values to be resonated.
+		
+		@rtype: numpy.ndarray
+		@return: The results of resonance.
+		"""
+		if not inputs.size: #Short sounds at low rates may have no samples at all.
+			return numpy.zeros(0)
+		response = _impulseResponse(self._b, self._c, inputs.size)
+		output = _convolve(inputs, self._a * response)
+		if self._delay_1 or self._delay_2: #Add the echoes of the last block, decaying as though no input followed them.
+			output += (self._b * self._delay_1 + self._c * self._delay_2) * response
+			output[1:] += (self._c * self._delay_1) * response[:-1]
+		self._storeBlock(output)
+		return output
+		
+	def _storeBlock(self, values):
+		"""
+		Stores the last two values of a block in the echo queue.
+		
+		@type values: numpy.ndarray
+		@param values: The block whose terminal values should be stored.
+		"""
+		if values.size > 1:
+			self._delay_1 = values[-1]
+			self._delay_2 = values[-2]
+		elif values.size:
+			self._delay_2 = self._delay_1
+			self._delay_1 = values[-1]
+			
 	def _resonate(self, input):
 		"""
 		Employs two-tier echoing to resonate the input value as though it were
@@ -282,8 +1300,31 @@ class _AntiResonator(_Resonator):
 		@param c: The value to be multiplied by -1.0/a and the second-last-stored
 		    input.
 		"""
-		a = 1.0 / a
-		_Resonator.init(self, a, -b * a, -c * a)
+		self.load(_invertCoefficients(a, b, c))
+		
+	def getRadius(self):
+		"""
+		Measures how slowly the anti-resonator's echoes decay; it has no poles,
+		so they stop after two samples.
+		
+		@rtype: float
+		@return: 0.0.
+		"""
+		return 0.0
+		
+	def respond(self, delays):
+		"""
+		Computes the anti-resonator's frequency response, as though it were at
+		rest.
+		
+		@type delays: numpy.ndarray
+		@param delays: The complex factor by which a delay of one sample
+		    multiplies each frequency.
+		
+		@rtype: numpy.ndarray
+		@return: The complex gain applied to each frequency.
+		"""
+		return self._a + (self._b + self._c * delays) * delays
 		
 	def resonate(self, input):
 		"""
@@ -300,4 +1341,146 @@ class _AntiResonator(_Resonator):
 		output = self._resonate(input)
 		self._delay_1 = input
 		return output
-		
\ No newline at end of file
+		
+	def resonateSequence(self, inputs):
+		"""
+		Resonates a sequence of input values, producing the same output as
+		successive calls to L{resonate}, without NumPy.
+		
+		@type inputs: sequence
+		@param inputs: The values to be resonated.
+		
+		@rtype: list
+		@return: The results of resonance.
+		"""
+		(a, b, c) = (self._a, self._b, self._c) #Cache for speed.
+		(delay_1, delay_2) = (self._delay_1, self._delay_2)
+		outputs = []
+		for input in inputs:
+			outputs.append(a * input + b * delay_1 + c * delay_2)
+			(delay_1, delay_2) = (input, delay_1)
+		(self._delay_1, self._delay_2) = (delay_1, delay_2)
+		return outputs
+		
+	def resonateBlock(self, inputs):
+		"""
+		Resonates a block of input values in a single operation, producing the
+		same output as successive calls to L{resonate}.
+		
+		The last inputs are stored for use in successive resonance.
+		
+		@type inputs: numpy.ndarray
+		@param inputs: The values to be resonated.
+		
+		@rtype: numpy.ndarray
+		@return: The results of resonance.
+		"""
+		if not inputs.size: #NumPy cannot convolve an empty block; short sounds at low rates may have no samples at all.
+			return numpy.zeros(0)
+		output = numpy.convolve(inputs, (self._a, self._b, self._c))[:inputs.size]
+		if self._delay_1 or self._delay_2: #Add the echoes of the last block's inputs.
+			output[0] += self._b * self._delay_1 + self._c * self._delay_2
+			if inputs.size > 1:
+				output[1] += self._c * self._delay_1
+		self._storeBlock(inputs)
+		return output
+		
+		
+def _findRingingEnd(results, start):
+	"""
+	Finds where a sound's ringing falls silent: the first point, from start
+	on, after which the output stays below L{_RINGING_FLOOR} for
+	L{_RINGING_WINDOW} samples.
+	
+	@type results: list|numpy.ndarray
+	@param results: The network's output for the sound and as much of its
+	    ringing as has been rendered.
+	@type start: int
+	@param start: The index of the first sample of ringing.
+	
+	@rtype: int|None
+	@return: The index after the last sample that can still be heard, or None
+	    if too little ringing has been rendered to tell.
+	"""
+	if numpy is not None and isinstance(results, numpy.ndarray):
+		loud = numpy.flatnonzero(numpy.abs(results[start:]) >= _RINGING_FLOOR)
+		edges = numpy.concatenate(((-1,), loud, (results.size - start,)))
+		gaps = numpy.flatnonzero(numpy.diff(edges) > _RINGING_WINDOW)
+		if not gaps.size:
+			return None
+		return start + int(edges[gaps[0]]) + 1
+		
+	end = start
+	for (i, result) in enumerate(results[start:], start):
+		if i - end >= _RINGING_WINDOW:
+			return end
+		if abs(result) >= _RINGING_FLOOR:
+			end = i + 1
+	if len(results) - end >= _RINGING_WINDOW:
+		return end
+	return None
+	
+def _convolve(signal, response):
+	"""
+	Convolves a signal with a filter's impulse response using the FFT.
+	
+	@type signal: numpy.ndarray
+	@param signal: The values to be filtered.
+	@type response: numpy.ndarray
+	@param response: The filter's impulse response, at least as long as signal.
+	
+	@rtype: numpy.ndarray
+	@return: The filtered signal, truncated to its original length.
+	"""
+	size = signal.size
+	if not size:
+		return numpy.zeros(0)
+	fft_size = 1 << (size * 2 - 1).bit_length() #The smallest power of two that avoids circular wrapping.
+	return numpy.fft.irfft(numpy.fft.rfft(signal, fft_size) * numpy.fft.rfft(response[:size], fft_size), fft_size)[:size]
+	
+def _describePoles(b, c):
+	"""
+	Describes the conjugate pair of poles of a resonator.
+	
+	@type b: float
+	@param b: The co-efficient for the value stored in the last cycle.
+	@type c: float
+	@param c: The co-efficient for the value stored in the second-last cycle;
+	    must be negative.
+	
+	@rtype: tuple(3)
+	@return: The poles' radius, and the sine and cosine of their angle.
+	"""
+	radius = math.sqrt(-c)
+	cosine = max(-1.0, min(1.0, b / (2.0 * radius)))
+	return (radius, math.sqrt(1.0 - cosine * cosine), cosine)
+	
+def _impulseResponse(b, c, count):
+	"""
+	Computes the impulse response of the recursive part of a resonator, where
+	each output is the input plus b times the last output plus c times the
+	second-last output.
+	
+	The response is derived in closed form from the filter's poles.
+	
+	@type b: float
+	@param b: The co-efficient for the value stored in the last cycle.
+	@type c: float
+	@param c: The co-efficient for the value stored in the second-last cycle.
+	@type count: int
+	@param count: The number of response values to compute.
+	
+	@rtype: numpy.ndarray
+	@return: The first count values of the impulse response.
+	"""
+	n = numpy.arange(count)
+	discriminant = b * b + 4.0 * c
+	if abs(discriminant) <= 1e-13 * b * b: #A repeated pole, as found when the resonant frequency is 0Hz.
+		return (n + 1) * (b / 2.0) ** n
+	if discriminant > 0.0: #Two real poles.
+		root = math.sqrt(discriminant)
+		(pole_1, pole_2) = ((b + root) / 2.0, (b - root) / 2.0)
+		return (pole_1 ** (n + 1) - pole_2 ** (n + 1)) / root
+	#A conjugate pair of poles, described by their radius and angle.
+	(radius, sine, cosine) = _describePoles(b, c)
+	return radius ** n * numpy.sin((n + 1) * math.atan2(sine, cosine)) / sine
\ No newline at end of file
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: src.plan
+ 
+Purpose
+=======
+ Reads and writes utterance plans: the segments of a script, as produced by
+ L{transform.paragraphToSegments} after every rule has been applied, in a
+ compact binary form that can be memory-mapped, so a script may be rendered
+ again, with other engines or settings, without being parsed or having rules
+ applied.
+ 
+Format
+======
+ A plan begins with a 16-byte header: the magic string C{KLATTPLN}, followed
+ by the format's version as a little-endian 32-bit integer and four bytes of
+ padding. A series of fixed-size, 280-byte records follows, each of which is
+ a kind byte, seven bytes of padding, and 34 little-endian doubles, whose
+ meaning depends on the kind:
+  - A paragraph record begins each paragraph; the first value is the
+    paragraph's position in its script, indexed from 1.
+  - A sound record holds the 33 synthesis parameters of a sound, followed by
+    its f0 multiplier.
+  - A pause record holds a pause's duration, in milliseconds, as its first
+    value.
+  - A sentence-end record marks the end of a sentence; it has no values.
+ Unused values are zero.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2009
+"""
+import mmap
+import struct
+
+import transform
+
+_MAGIC = 'KLATTPLN' #: Identifies a file as an utterance plan.
+_VERSION = 1 #: The version of the format written; change it whenever the layout of records changes.
+_HEADER = struct.Struct('<8sI4x') #: The layout of a plan's header.
+_RECORD = struct.Struct('<B7x34d') #: The layout of each record.
+_VALUE_COUNT = 34 #: The number of values in each record.
+
+#Record-kind enumeration.
+_RECORD_PARAGRAPH = 0 #: Identifies a record as the start of a paragraph.
+_RECORD_SOUND = 1 #: Identifies a record as a sound.
+_RECORD_PAUSE = 2 #: Identifies a record as a pause.
+_RECORD_SENTENCE_END = 3 #: Identifies a record as the end of a sentence.
+
+_SEGMENT_RECORDS = {
+ transform.SEGMENT_SOUND: _RECORD_SOUND,
+ transform.SEGMENT_PAUSE: _RECORD_PAUSE,
+ transform.SEGMENT_SENTENCE_END: _RECORD_SENTENCE_END,
+} #: The kind of record that stores each kind of segment.
+
+class PlanWriter(object):
+	"""
+	Writes an utterance plan, one paragraph at a time.
+	"""
+	_file = None #: The file to which the plan is written.
+	
+	def __init__(self, filename):
+		"""
+		Creates a plan, replacing any file of the same name.
+		
+		@type filename: basestring
+		@param filename: The path of the plan to be written.
+		
+		@raise IOError: If the file cannot be created.
+		"""
+		self._file = open(filename, 'wb')
+		self._file.write(_HEADER.pack(_MAGIC, _VERSION))
+		
+	def addParagraph(self, paragraph_number, segments):
+		"""
+		Appends a paragraph to the plan.
+		
+		@type paragraph_number: int
+		@param paragraph_number: The paragraph's position in its script, indexed
+		    from 1.
+		@type segments: iterable
+		@param segments: The paragraph's segments, as described by the
+		    C{SEGMENT_*} enumeration of L{transform}.
+		
+		@raise ValueError: If a segment is of an unknown kind.
+		"""
+		pack = _RECORD.pack #Cache for efficiency.
+		padding = (0.0,) * _VALUE_COUNT
+		
+		records = [pack(_RECORD_PARAGRAPH, paragraph_number, *padding[1:])]
+		for segment in segments:
+			kind = segment[0]
+			if kind == transform.SEGMENT_SOUND:
+				records.append(pack(_RECORD_SOUND, *(tuple(segment[1]) + (segment[2],))))
+			elif kind in _SEGMENT_RECORDS:
+				values = segment[1:]
+				records.append(pack(_SEGMENT_RECORDS[kind], *(values + padding[len(values):])))
+			else:
+				raise ValueError("Unknown segment kind: %r" % (kind,))
+		self._file.write(''.join(records))
+		
+	def close(self):
+		"""
+		Finishes writing the plan.
+		"""
+		self._file.close()
+		
+		
+class PlanReader(object):
+	"""
+	Reads an utterance plan, which is memory-mapped, so paragraphs can be read
+	in any order, by any number of readers, without loading the whole plan.
+	"""
+	_file = None #: The file from which the plan is read.
+	_map = None #: The memory-mapped contents of the file.
+	_paragraphs = None #: The paragraph number, first segment record, and segment count of each paragraph.
+	
+	def __init__(self, filename):
+		"""
+		Opens a plan and indexes its paragraphs.
+		
+		@type filename: basestring
+		@param filename: The path of the plan to be read.
+		
+		@raise IOError: If the file cannot be read.
+		@raise ValueError: If the file is not a complete plan of the current
+		    version.
+		"""
+		self._file = open(filename, 'rb')
+		try:
+			header = self._file.read(_HEADER.size)
+			if len(header) < _HEADER.size or not header.startswith(_MAGIC):
+				raise ValueError("'%s' is not an utterance plan." % (filename))
+			(magic, version) = _HEADER.unpack(header)
+			if version != _VERSION:
+				raise ValueError("'%s' is a version %i utterance plan; only version %i is supported." % (filename, version, _VERSION))
+			self._file.seek(0, 2)
+			size = self._file.tell()
+			if (size - _HEADER.size) % _RECORD.size:
+				raise ValueError("'%s' is truncated." % (filename))
+			self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+			self._indexParagraphs((size - _HEADER.size) // _RECORD.size)
+		except (EnvironmentError, ValueError):
+			if self._map is not None:
+				self._map.close()
+			self._file.close()
+			raise
+		
+	def getParagraphs(self):
+		"""
+		Describes the paragraphs in the plan.
+		
+		@rtype: list
+		@return: A tuple for each paragraph, in order, containing its position
+		    in its script, indexed from 1, and a (first record, record count)
+		    tuple that locates its segments, for use with L{readSegments}.
+		"""
+		return [(paragraph_number, (first_record, record_count)) for (paragraph_number, first_record, record_count) in self._paragraphs]
+		
+	def readSegments(self, first_record, record_count):
+		"""
+		Reads the segments of a paragraph.
+		
+		@type first_record: int
+		@param first_record: The index of the paragraph's first segment record.
+		@type record_count: int
+		@param record_count: The number of segment records in the paragraph.
+		
+		@rtype: generator
+		@return: A generator that yields segments, as described by the
+		    C{SEGMENT_*} enumeration of L{transform}.
+		"""
+		unpack_from = _RECORD.unpack_from #Cache for efficiency.
+		mapped = self._map
+		for offset in xrange(_HEADER.size + first_record * _RECORD.size, _HEADER.size + (first_record + record_count) * _RECORD.size, _RECORD.size):
+			values = unpack_from(mapped, offset)
+			kind = values[0]
+			if kind == _RECORD_SOUND:
+				yield (transform.SEGMENT_SOUND, values[1:34], values[34])
+			elif kind == _RECORD_PAUSE:
+				yield (transform.SEGMENT_PAUSE, values[1])
+			elif kind == _RECORD_SENTENCE_END:
+				yield (transform.SEGMENT_SENTENCE_END,)
+			else:
+				raise ValueError("Unknown record kind %i at offset %i." % (kind, offset))
+				
+	def close(self):
+		"""
+		Closes the plan.
+		"""
+		self._map.close()
+		self._file.close()
+		
+	def _indexParagraphs(self, record_count):
+		"""
+		Locates every paragraph in the plan.
+		
+		@type record_count: int
+		@param record_count: The number of records in the plan.
+		
+		@raise ValueError: If the plan does not begin with a paragraph.
+		"""
+		mapped = self._map
+		paragraphs = []
+		paragraph_number = first_record = None
+		for record in xrange(record_count):
+			offset = _HEADER.size + record * _RECORD.size
+			if ord(mapped[offset]) == _RECORD_PARAGRAPH:
+				if paragraph_number is not None:
+					paragraphs.append((paragraph_number, first_record, record - first_record))
+				paragraph_number = int(_RECORD.unpack_from(mapped, offset)[1])
+				first_record = record + 1
+			elif paragraph_number is None:
+				raise ValueError("The utterance plan does not begin with a paragraph.")
+		if paragraph_number is not None:
+			paragraphs.append((paragraph_number, first_record, record_count - first_record))
+		self._paragraphs = tuple(paragraphs)
+		
\ No newline at end of file
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: src.render_cache
+ 
+Purpose
+=======
+ Provides a content-addressed cache of rendered sounds, so that parameter-sets
+ which recur within and across scripts are only synthesized once.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2009
+"""
+import array
+import collections
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+
+_KEY_FORMAT = struct.Struct('<34d?16pQId') #: The canonical binary layout of a sound's description: 33 parameters, the f0 multiplier, the turbo flag, the rendering engine, the noise seed, the sample rate, and the formant limit.
+_KEY_VERSION = '4' #: Mixed into every key; change it whenever rendering changes, to invalidate stored sounds.
+_MEMORY_LIMIT = 32 * 1024 * 1024 #: The default number of bytes of samples held in memory.
+
+class RenderCache(object):
+	"""
+	Holds rendered sounds, keyed by a hash of everything that determines their
+	samples.
+	
+	Sounds live in a least-recently-used tier in memory, bounded by the number
+	of bytes they occupy, and, optionally, in a directory on disk, which is
+	never pruned and may be shared by any number of processes.
+	"""
+	_bytes = 0 #: The number of bytes of samples held in memory.
+	_directory = None #: The directory in which sounds are stored on disk, if any.
+	_disk_hits = 0 #: The number of lookups satisfied from disk.
+	_entries = None #: The sounds held in memory, ordered from least- to most-recently used.
+	_evictions = 0 #: The number of sounds discarded from memory to make room for others.
+	_hits = 0 #: The number of lookups satisfied from memory.
+	_memory_limit = None #: The maximum number of bytes of samples to hold in memory.
+	_misses = 0 #: The number of lookups that could not be satisfied.
+	
+	def __init__(self, memory_limit=_MEMORY_LIMIT, directory=None):
+		"""
+		Prepares an empty cache.
+		
+		@type memory_limit: int
+		@param memory_limit: The maximum number of bytes of samples to hold in
+		    memory.
+		@type directory: basestring|None
+		@param directory: The directory in which to store sounds on disk; it is
+		    created if necessary. If omitted, sounds are only held in memory.
+		
+		@raise OSError: If the directory cannot be created.
+		"""
+		self._memory_limit = memory_limit
+		self._entries = collections.OrderedDict()
+		if directory is not None:
+			if not os.path.isdir(directory):
+				os.makedirs(directory)
+			self._directory = directory
+			
+	def makeKey(self, parameters, f0_multiplier, turbo, engine, seed, sample_rate, formant_limit):
+		"""
+		Produces the key that identifies a sound.
+		
+		Numbers are hashed by value, so C{5} and C{5.0} describe the same sound.
+		
+		@type parameters: sequence(33)
+		@param parameters: A collection of synthesis parameters, as described in
+		    L{ipa.IPA_PARAMETERS} and L{ipa.IPA_DATA}.
+		@type f0_multiplier: number
+		@param f0_multiplier: The modifier applied to the f0 period.
+		@type turbo: bool
+		@param turbo: Whether turbo rendering is used.
+		@type engine: str
+		@param engine: The engine that renders the sound, one of
+		    L{parwave.ENGINES}; engines may differ in their least-significant
+		    bits, so each keeps its own sounds.
+		@type seed: int
+		@param seed: The seed of the synthesizer's noise.
+		@type sample_rate: int
+		@param sample_rate: The number of samples synthesized per second.
+		@type formant_limit: number
+		@param formant_limit: The frequency at or above which formants are
+		    dropped.
+		
+		@rtype: str
+		@return: A hexadecimal digest.
+		"""
+		values = [float(p) for p in parameters] + [float(f0_multiplier), bool(turbo), engine, seed, sample_rate, float(formant_limit)]
+		return hashlib.sha1(_KEY_VERSION + _KEY_FORMAT.pack(*values)).hexdigest()
+		
+	def lookup(self, key):
+		"""
+		Retrieves a sound, if it has been stored.
+		
+		@type key: str
+		@param key: The key produced by L{makeKey}.
+		
+		@rtype: array.array|None
+		@return: The sound's samples, as 16-bit signed integers, or None if it
+		    has not been stored.
+		"""
+		entries = self._entries
+		samples = entries.pop(key, None)
+		if samples is not None:
+			self._hits += 1
+			entries[key] = samples #Re-insert as the most-recently used sound.
+			return samples
+			
+		samples = self._read(key)
+		if samples is None:
+			self._misses += 1
+		else:
+			self._disk_hits += 1
+			self._hold(key, samples)
+		return samples
+		
+	def store(self, key, samples):
+		"""
+		Stores a sound.
+		
+		@type key: str
+		@param key: The key produced by L{makeKey}.
+		@type samples: sequence
+		@param samples: The sound's samples, as 16-bit signed integers.
+		"""
+		samples = array.array('h', samples)
+		self._hold(key, samples)
+		self._write(key, samples)
+		
+	def getStatistics(self):
+		"""
+		Describes how effective this cache has been.
+		
+		@rtype: dict
+		@return: The number of 'hits' from memory, 'disk_hits', 'misses', and
+		    'evictions' seen so far, plus the number of 'entries' and 'bytes'
+		    held in memory.
+		"""
+		return {
+		 'hits': self._hits,
+		 'disk_hits': self._disk_hits,
+		 'misses': self._misses,
+		 'evictions': self._evictions,
+		 'entries': len(self._entries),
+		 'bytes': self._bytes,
+		}
+		
+	def _hold(self, key, samples):
+		"""
+		Places a sound in memory, evicting the least-recently-used sounds until
+		it fits.
+		
+		@type key: str
+		@param key: The key produced by L{makeKey}.
+		@type samples: array.array
+		@param samples: The sound's samples.
+		"""
+		size = len(samples) * samples.itemsize
+		if size > self._memory_limit:
+			return
+			
+		entries = self._entries
+		while entries and self._bytes + size > self._memory_limit:
+			(evicted_key, evicted_samples) = entries.popitem(last=False)
+			self._bytes -= len(evicted_samples) * evicted_samples.itemsize
+			self._evictions += 1
+		entries[key] = samples
+		self._bytes += size
+		
+	def _read(self, key):
+		"""
+		Retrieves a sound from disk.
+		
+		A sound that is not a whole number of samples is corrupt, so it is
+		removed and treated as though it had never been stored.
+		
+		@type key: str
+		@param key: The key produced by L{makeKey}.
+		
+		@rtype: array.array|None
+		@return: The sound's samples, or None if it is not on disk.
+		"""
+		if self._directory is None:
+			return None
+		path = os.path.join(self._directory, key + '.pcm')
+		try:
+			pcm_file = open(path, 'rb')
+		except IOError:
+			return None
+		try:
+			data = pcm_file.read()
+		finally:
+			pcm_file.close()
+		samples = array.array('h')
+		try:
+			samples.fromstring(data)
+		except ValueError: #The file holds a partial sample.
+			try:
+				os.unlink(path)
+			except OSError: #Another process may already have removed it.
+				pass
+			return None
+		if sys.byteorder == 'big': #Sounds are stored little-endian.
+			samples.byteswap()
+		return samples
+		
+	def _write(self, key, samples):
+		"""
+		Stores a sound on disk, if a directory was given.
+		
+		The file is written under a temporary name and then renamed, so other
+		processes never see a partial sound; if either step fails, the
+		temporary file is removed.
+		
+		@type key: str
+		@param key: The key produced by L{makeKey}.
+		@type samples: array.array
+		@param samples: The sound's samples.
+		"""
+		if self._directory is None:
+			return
+		if sys.byteorder == 'big': #Sounds are stored little-endian.
+			samples = array.array('h', samples)
+			samples.byteswap()
+		(descriptor, temporary_path) = tempfile.mkstemp(dir=self._directory)
+		try:
+			try:
+				os.write(descriptor, samples.tostring())
+			finally:
+				os.close(descriptor)
+			os.rename(temporary_path, os.path.join(self._directory, key + '.pcm'))
+		except EnvironmentError:
+			os.unlink(temporary_path)
+			raise
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: src.scheduler
+ 
+Purpose
+=======
+ Divides a script's segments, as laid out by L{transform.layoutSegments},
+ into contiguous chunks of roughly equal cost, so several processes can
+ render them without one being left with a long paragraph while the others
+ sit idle.
+ 
+ The number of samples a sound produces stands in for the cost of rendering
+ it; silence costs nothing.
+ 
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+ 
+ (C) Neil Tallim, 2009
+"""
+import transform
+
+_CHUNKS_PER_JOB = 4 #: The number of chunks made for each process, so processes that finish early can take on more of the work.
+
+def scheduleChunks(placed_segments, jobs):
+	"""
+	Divides laid-out segments into chunks, in order, whose costs are as close
+	to equal as segment boundaries allow.
+	
+	@type placed_segments: sequence
+	@param placed_segments: The segments to be divided, as produced by
+	    L{transform.layoutSegments}.
+	@type jobs: int
+	@param jobs: The number of processes that will render the chunks.
+	
+	@rtype: list
+	@return: A list of chunks, each of which is a non-empty list of
+	    consecutive placed segments; joined, they are the original sequence.
+	"""
+	if not placed_segments:
+		return []
+		
+	costs = [_estimateCost(placed_segment) for placed_segment in placed_segments]
+	total_cost = sum(costs)
+	chunk_count = max(1, min(jobs * _CHUNKS_PER_JOB, len(placed_segments)))
+	
+	chunks = []
+	chunk = []
+	spent_cost = 0
+	for (placed_segment, cost) in zip(placed_segments, costs):
+		chunk.append(placed_segment)
+		spent_cost += cost
+		if spent_cost * chunk_count >= total_cost * (len(chunks) + 1): #This chunk reaches its share of the total.
+			chunks.append(chunk)
+			chunk = []
+	if chunk: #Trailing silence.
+		chunks.append(chunk)
+	return chunks
+	
+def _estimateCost(placed_segment):
+	"""
+	Estimates the cost of rendering a segment.
+	
+	@type placed_segment: tuple(4)
+	@param placed_segment: A segment, as produced by
+	    L{transform.layoutSegments}.
+	
+	@rtype: int
+	@return: The number of samples the segment produces, if it is a sound, or
+	    0 if it is silence.
+	"""
+	if placed_segment[0][0] == transform.SEGMENT_SOUND:
+		return placed_segment[2]
+	return 0
+	
\ No newline at end of file
@@ -13,8 +13,12 @@ Legal
  
  (C) Neil Tallim, Sydni Bennie, 2009
 """
+import bisect
+import hashlib
 import re
+import struct
 
+import context
 import ipa
 import language_rules
 import parwave
@@ -23,6 +27,8 @@ import universal_rules
 _IPA_CHARACTERS = u''.join([c for c in ipa.IPA_PARAMETERS.keys() if len(c) == 1]) #: A list of all characters the regular expression will have to deal with; not unlike an IPA [A-Z].
 _WORD_REGEXP = re.compile('^((?:[*]|"|[*]"|"[*])?\'?)([%s][-+<>%s]*[,]?)((?:[*]|"|[*]"|"[*])?(?:[.]|[?]|!|[?]!|![?])?)$' % (_IPA_CHARACTERS, _IPA_CHARACTERS)) #: The regular expression that matches tokens in the input file.
 _FILTER_REGEXP = re.compile('[*]|"|\'|-|[+]|<|>|,|\.|[?]|!') #: A regular expression that strips non-IPA characters from a token.
+_TOKEN_REGEXP = re.compile('\S+', re.UNICODE) #: A regular expression that finds each whitespace-delimited token in a paragraph.
+_VALID_CHARACTERS = frozenset(_IPA_CHARACTERS + u'*"\'-+<>,.?!') #: Every character that may appear in a token.
 del _IPA_CHARACTERS
 
 #Sentence markup enumeration.
@@ -34,44 +40,176 @@ _WORD_QUOTED = 1 #: Identifies a word as being quoted.
 _WORD_EMPHASIZED = 2 #: Identifies a word as being emphasized.
 _WORD_CONTENT = 3 #: Identifies a word as a key content item in a phrase.
 
-def paragraphToSound(paragraph, options, synthesizer):
+#Segment enumeration.
+SEGMENT_SOUND = 1 #: Describes a sound: (SEGMENT_SOUND, parameters, f0 multiplier).
+SEGMENT_PAUSE = 2 #: Describes a pause within a sentence, after which noise starts afresh: (SEGMENT_PAUSE, duration in milliseconds).
+SEGMENT_SENTENCE_END = 3 #: Marks the end of a sentence, which is followed by half a second of silence: (SEGMENT_SENTENCE_END,).
+
+_SEED_FORMAT = struct.Struct('<QII') #: The binary layout from which a segment's noise seed is derived: the script's seed, the paragraph number, and the segment's index within its paragraph.
+_SENTENCE_END_MILLISECONDS = 500 #: The duration of the silence that follows each sentence.
+
+def paragraphToSound(paragraph, options, synthesizer, paragraph_number=None):
 	"""
-	Transforms a paragraph into a collection of collections of integers,
+	Transforms a paragraph into a stream of collections of integers,
 	representing synthesized speech.
 	
+	Sounds are synthesized only as they are consumed, so no more than one is
+	held at a time, no matter how long the paragraph is.
+	
 	@type paragraph: unicode
 	@param paragraph: The text to be synthesized.
 	@type options: optparse.Values
 	@param options: The options with which synthesis should occur.
 	@type synthesizer: L{parwave.Synthesizer}
 	@param synthesizer: The synthesizer to use when rendering sounds.
+	@type paragraph_number: int|None
+	@param paragraph_number: The paragraph's position in its script, indexed
+	    from 1, which is reported if the paragraph is invalid.
 	
-	@rtype: list
-	@return: A list of tuples containing integers that represent synthesized
-	    speech.
+	@rtype: generator
+	@return: A generator that yields arrays containing 16-bit integers that
+	    represent synthesized speech.
 	"""
-	tokens = paragraph.split()
+	return renderSegments(paragraphToSegments(paragraph, options, paragraph_number), options, synthesizer)
 	
-	sentences = []
-	while tokens:
-		(sentence, tokens) = _extractSentence(tokens, len(sentences) + 1)
-		sentences.append(sentence)
+def paragraphToSegments(paragraph, options, paragraph_number=None):
+	"""
+	Transforms a paragraph into a stream of segments, which describe, in order,
+	every sound and pause that make up its speech, after all rules have been
+	applied, but without synthesizing anything.
+	
+	@type paragraph: unicode
+	@param paragraph: The text to be synthesized.
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	@type paragraph_number: int|None
+	@param paragraph_number: The paragraph's position in its script, indexed
+	    from 1, which is reported if the paragraph is invalid.
+	
+	@rtype: generator
+	@return: A generator that yields segments, as described by the C{SEGMENT_*}
+	    enumeration.
+	"""
+	sentences = _extractSentences(paragraph, paragraph_number)
 	if options.verbose:
 		print "\tParagraph analyzed."
 	if options.debug:
 		print sentences
 		
-	silent_half_second = synthesizer.generateSilence(500) #Half of a second of silence.
-	sounds = []
 	for (i, sentence) in enumerate(sentences): #Add the sentence, plus a half-second of silence.
-		sounds.append(_sentenceToSound(sentence, i + 1, len(sentences) - i - 1, options, synthesizer))
-		sounds.append(silent_half_second)
-	return sounds
+		for segment in _sentenceToSegments(sentence, i + 1, len(sentences) - i - 1, options):
+			yield segment
+		yield (SEGMENT_SENTENCE_END,)
+		
+def renderSegments(segments, options, synthesizer):
+	"""
+	Synthesizes a paragraph's stream of segments.
 	
-def _sentenceToSound(sentence, position, remaining_sentences, options, synthesizer):
+	@type segments: iterable
+	@param segments: The segments to be synthesized, as described by the
+	    C{SEGMENT_*} enumeration.
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	@type synthesizer: L{parwave.Synthesizer}
+	@param synthesizer: The synthesizer to use when rendering sounds.
+	
+	@rtype: generator
+	@return: A generator that yields arrays containing 16-bit integers that
+	    represent synthesized speech.
+	"""
+	silent_half_second = synthesizer.generateSilence(_SENTENCE_END_MILLISECONDS) #Half of a second of silence, shared by every sentence.
+	for segment in segments:
+		kind = segment[0]
+		if kind == SEGMENT_SOUND:
+			yield synthesizer.synthesize(segment[1], segment[2], options.turbo)
+		elif kind == SEGMENT_PAUSE:
+			yield synthesizer.generateSilence(segment[1])
+		elif kind == SEGMENT_SENTENCE_END:
+			if options.continuous: #Silence must break continuity, so it cannot be shared.
+				yield synthesizer.generateSilence(_SENTENCE_END_MILLISECONDS)
+			else:
+				yield silent_half_second
+				
+def layoutSegments(paragraphs, sample_rate, seed=None):
 	"""
-	Transforms a sentence into a collections of integers, representing
-	synthesized speech.
+	Lays out every segment of a script before anything is synthesized,
+	fixing the number of samples each produces and where they begin in the
+	output, so the script can be divided among processes at any segment.
+	
+	Every sound is rendered from its own noise, seeded by its place in the
+	script, and every sound resets the synthesizer's resonators, so a placed
+	segment sounds the same no matter which process renders it, or what that
+	process rendered before. This does not hold in continuous mode.
+	
+	@type paragraphs: iterable
+	@param paragraphs: A tuple for each paragraph, in order, containing its
+	    position in its script, indexed from 1, and its segments, as described
+	    by the C{SEGMENT_*} enumeration.
+	@type sample_rate: int
+	@param sample_rate: The number of samples the synthesizer produces per
+	    second.
+	@type seed: int|None
+	@param seed: The script's seed, from which each sound's noise seed is
+	    derived; if omitted, sounds are not re-seeded, which is only
+	    appropriate when a render cache seeds them instead.
+	
+	@rtype: list
+	@return: A tuple for each segment, in order, containing the segment, the
+	    offset of its first sample in the output, its number of samples, and
+	    its noise seed, which is None for silence or if no seed was given.
+	"""
+	samples_per_millisecond = sample_rate / 1000.0
+	placed_segments = []
+	position = 0
+	for (paragraph_number, segments) in paragraphs:
+		for (i, segment) in enumerate(segments):
+			kind = segment[0]
+			segment_seed = None
+			if kind == SEGMENT_SOUND:
+				sample_count = int(segment[1][-1] * samples_per_millisecond) #The same count that the synthesizer produces.
+				if seed is not None:
+					segment_seed = int(hashlib.sha1(_SEED_FORMAT.pack(seed, paragraph_number, i)).hexdigest()[:8], 16)
+			elif kind == SEGMENT_PAUSE:
+				sample_count = int(segment[1] * samples_per_millisecond)
+			elif kind == SEGMENT_SENTENCE_END:
+				sample_count = int(_SENTENCE_END_MILLISECONDS * samples_per_millisecond)
+			else:
+				raise ValueError("Unknown segment kind: %r" % (kind,))
+			placed_segments.append((segment, position, sample_count, segment_seed))
+			position += sample_count
+	return placed_segments
+	
+def renderPlacedSegments(placed_segments, options, synthesizer):
+	"""
+	Synthesizes a run of segments laid out by L{layoutSegments}, which may
+	begin anywhere in the script.
+	
+	@type placed_segments: iterable
+	@param placed_segments: The segments to be synthesized, as produced by
+	    L{layoutSegments}.
+	@type options: optparse.Values
+	@param options: The options with which synthesis should occur.
+	@type synthesizer: L{parwave.Synthesizer}
+	@param synthesizer: The synthesizer to use when rendering sounds.
+	
+	@rtype: generator
+	@return: A generator that yields arrays containing 16-bit integers that
+	    represent synthesized speech, one for each segment.
+	"""
+	for (segment, position, sample_count, segment_seed) in placed_segments:
+		kind = segment[0]
+		if kind == SEGMENT_SOUND:
+			if segment_seed is not None:
+				synthesizer.reseed(segment_seed)
+			yield synthesizer.synthesize(segment[1], segment[2], options.turbo)
+		elif kind == SEGMENT_PAUSE:
+			yield synthesizer.generateSilence(segment[1])
+		elif kind == SEGMENT_SENTENCE_END:
+			yield synthesizer.generateSilence(_SENTENCE_END_MILLISECONDS)
+			
+def _sentenceToSegments(sentence, position, remaining_sentences, options):
+	"""
+	Transforms a sentence into a stream of segments.
 	
 	@type sentence: tuple(2)
 	@param sentence: A collection of tokens comprising the words in the sentence,
@@ -84,11 +222,10 @@ def _sentenceToSound(sentence, position, remaining_sentences, options, synthesiz
 	    of the paragraph is reached, not including the current sentence.
 	@type options: optparse.Values
 	@param options: The options with which synthesis should occur.
-	@type synthesizer: L{parwave.Synthesizer}
-	@param synthesizer: The synthesizer to use when rendering sounds.
 	
-	@rtype: tuple
-	@return: A collection of integers that represent synthesized speech.
+	@rtype: generator
+	@return: A generator that yields segments, as described by the C{SEGMENT_*}
+	    enumeration.
 	"""
 	filter_regexp = _FILTER_REGEXP #Cache for efficiency.
 	
@@ -98,19 +235,75 @@ def _sentenceToSound(sentence, position, remaining_sentences, options, synthesiz
 	is_question = _SENTENCE_QUESTION in markup
 	is_exclamation = _SENTENCE_EXCLAMATION in markup
 	
+	#Reduce every word to its phonemes up front, so the sentence's features can be gathered in one pass.
+	word_phonemes = _extractPhonemes([w for (w, m) in words])
+	word_features = language_rules.analyzeSentence([[p for (p, d, t) in phonemes] for phonemes in word_phonemes])
+	
 	filtered_words = [filter_regexp.sub("", w) for (w, m) in words]
-	sounds = ()
 	for (i, word) in enumerate(words):
-		sounds += _wordToSound(word, i + 1, len(words) - i - 1, filtered_words[:i], filtered_words[i + 1:], position, remaining_sentences, is_question, is_exclamation, options, synthesizer)
-	return sounds
+		for segment in _wordToSegments(word, word_phonemes[i], word_features[i], i + 1, len(words) - i - 1, context.precedingView(filtered_words, i), context.followingView(filtered_words, i), position, remaining_sentences, is_question, is_exclamation, options):
+			yield segment
 	
-def _wordToSound(word, position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_question, is_exclamation, options, synthesizer):
+def _extractPhonemes(tokens):
 	"""
-	Transforms a word into a collections of integers, representing
-	synthesized speech.
+	Reduces the words of a sentence to their phonemes, in a single pass over
+	the whole sentence, folding extension syntax into the multipliers of the
+	phoneme it follows.
+	
+	@type tokens: sequence
+	@param tokens: The sentence's words, any of which may end with a comma,
+	    which is ignored.
+	
+	@rtype: list
+	@return: A list for each word, containing a tuple for each of its
+	    phonemes, with an IPA character, plus its duration multiplier and
+	    pitch multiplier.
+	"""
+	word_offsets = [] #The offset at which each word starts, once joined.
+	offset = 0
+	for token in tokens:
+		word_offsets.append(offset)
+		offset += len(token) + 1
+		
+	word_phonemes = [[] for token in tokens]
+	for (offset, ipa_character, modifiers) in ipa.findPhonemes(u' '.join(tokens)):
+		(duration_multiplier, pitch_multiplier) = _foldModifiers(modifiers)
+		word_phonemes[bisect.bisect_right(word_offsets, offset) - 1].append((ipa_character, duration_multiplier, pitch_multiplier))
+	return word_phonemes
+	
+def _foldModifiers(modifiers):
+	"""
+	Collapses a string of extension syntax into the multipliers it describes.
+	
+	@type modifiers: unicode
+	@param modifiers: The extension syntax that follows a phoneme.
+	
+	@rtype: tuple(2)
+	@return: The phoneme's duration multiplier and pitch multiplier.
+	"""
+	duration_multiplier = pitch_multiplier = 1.0
+	for modifier in modifiers: #Apply each modifier in order, so the products are always the same.
+		if modifier == u'>':
+			duration_multiplier *= 1.5
+		elif modifier == u'<':
+			duration_multiplier *= 0.5
+		elif modifier == u'+':
+			pitch_multiplier *= 0.95
+		elif modifier == u'-':
+			pitch_multiplier *= 1.05
+	return (duration_multiplier, pitch_multiplier)
+	
+def _wordToSegments(word, phonemes, word_features, position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_question, is_exclamation, options):
+	"""
+	Transforms a word into a stream of segments.
 	
 	@type word: tuple(2)
 	@param word: The word being processed, plus the word's markup flags.
+	@type phonemes: list
+	@param phonemes: The word's phonemes, as produced by L{_extractPhonemes}.
+	@type word_features: L{language_rules.WordFeatures}
+	@param word_features: The word's features, as gathered by
+	    L{language_rules.analyzeSentence}.
 	@type position: int
 	@param position: The current word's position in its sentence, indexed
 	    from 1.
@@ -136,58 +329,35 @@ def _wordToSound(word, position, remaining_words, previous_words, following_word
 	    mark.
 	@type options: optparse.Values
 	@param options: The options with which synthesis should occur.
-	@type synthesizer: L{parwave.Synthesizer}
-	@param synthesizer: The synthesizer to use when rendering sounds.
 	
-	@rtype: tuple
-	@return: A collection of integers that represent synthesized speech.
+	@rtype: generator
+	@return: A generator that yields segments, as described by the C{SEGMENT_*}
+	    enumeration.
 	"""
 	(token, markup) = word
 	
 	#Determine whether the word ends with timing-affecting punctuation.
 	terminal_pause = token.endswith(u',')
-	if terminal_pause:
-		token = token[:-1]
-		
+	
 	#Set markup flags.
 	is_quoted = _WORD_QUOTED in markup
 	is_emphasized = _WORD_EMPHASIZED in markup
 	is_content = _WORD_CONTENT in markup
 	
-	ipa_tokens = ipa.reduceIPAClusters(token)
-	phonemes = []
-	subject = ipa_tokens[0]
-	duration_multiplier = pitch_multiplier = 1.0
-	#For each character in the token, post-IPA-reduction, collapse extension syntax into the multiplier associated with the last-seen character.
-	for i in ipa_tokens[1:]:
-		if i == u'>':
-			duration_multiplier *= 1.5
-		elif i == u'<':
-			duration_multiplier *= 0.5
-		elif i == u'+':
-			pitch_multiplier *= 0.95
-		elif i == u'-':
-			pitch_multiplier *= 1.05
-		else:
-			phonemes.append((subject, duration_multiplier, pitch_multiplier))
-			subject = i
-			duration_multiplier = pitch_multiplier = 1.0
-	phonemes.append((subject, duration_multiplier, pitch_multiplier))
-	
 	if options.verbose:
 		print u"\tSynthesizing '%s'..." % (u''.join([phoneme for (phoneme, duration_multiplier, pitch_multiplier) in phonemes]))
 		
-	sounds = ()
+	characters = [p for (p, d, t) in phonemes]
 	for (i, phoneme) in enumerate(phonemes):
-		sounds += _phonemeToSound(phoneme, [p for (p, d, t) in phonemes[:i]], [p for (p, d, t) in phonemes[i + 1:]], position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, options, synthesizer)
+		for segment in _phonemeToSegments(phoneme, context.precedingView(characters, i), context.followingView(characters, i), word_features, position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, options):
+			yield segment
 	if terminal_pause: #Add a quarter of a second of silence.
-		sounds += synthesizer.generateSilence(250)
-	return sounds
+		yield (SEGMENT_PAUSE, 250)
 	
-def _phonemeToSound(phoneme, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, options, synthesizer):
+def _phonemeToSegments(phoneme, preceding_phonemes, following_phonemes, word_features, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, options):
 	"""
-	Transforms a phoneme into a collections of integers, representing
-	synthesized speech.
+	Transforms a phoneme into a stream of segments, one for each of the sounds
+	that represent it.
 	
 	@type phoneme: tuple(3)
 	@param phoneme: The IPA character being processed, plus the phoneme's
@@ -198,6 +368,9 @@ def _phonemeToSound(phoneme, preceding_phonemes, following_phonemes, word_positi
 	@type following_phonemes: sequence
 	@param following_phonemes: A collection of all phonemes, in order, that
 	    follow the current IPA character in the current word.
+	@type word_features: L{language_rules.WordFeatures}
+	@param word_features: The current word's features, as gathered by
+	    L{language_rules.analyzeSentence}.
 	@type word_position: int
 	@param word_position: The current word's position in its sentence, indexed
 	    from 1.
@@ -229,58 +402,50 @@ def _phonemeToSound(phoneme, preceding_phonemes, following_phonemes, word_positi
 	    mark.
 	@type options: optparse.Values
 	@param options: The options with which synthesis should occur.
-	@type synthesizer: L{parwave.Synthesizer}
-	@param synthesizer: The synthesizer to use when rendering sounds.
 	
-	@rtype: tuple
-	@return: A collection of integers that represent synthesized speech.
+	@rtype: generator
+	@return: A generator that yields segments, as described by the C{SEGMENT_*}
+	    enumeration.
 	"""
 	(ipa_character, duration_multiplier, pitch_multiplier) = phoneme
 	
 	#Retrieve synthesis parameters.
 	(parameters, regions) = ipa.IPA_DATA[ipa_character]
 	
-	#Parameters need to be mutable.
-	parameters = list(parameters)
-	parameters[-1] = int(parameters[-1] * duration_multiplier) #Adjust the duration based on markup.
-	#Universal rules may append additional steps, so there needs to be a list of parameters.
-	parameters_list = [parameters]
+	parameters = parameters[:-1] + (int(parameters[-1] * duration_multiplier),) #Adjust the duration based on markup.
 	
-	#Apply vowel nasalization.
-	parameters_list = universal_rules.nasalizeVowel(ipa_character, following_phonemes, parameters_list)
-	
-	#Apply liasons.
-	parameters_list = universal_rules.bridgeWords(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters_list)
-	
-	#Apply contour-shaping.
-	parameters_list = universal_rules.shapeContours(ipa_character, preceding_phonemes, following_phonemes, parameters_list)
+	#Apply vowel nasalization, liasons, and contour-shaping, which may add steps; the expansion is shared, so it must not be modified.
+	parameters_list = universal_rules.getExpansionCache().lookup(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters)
 	
 	#Apply language-specific rules to the parameters.
-	(parameters_list, f0_multipliers) = language_rules.applyRules(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, parameters_list)
+	(parameters_list, f0_multipliers) = language_rules.applyRules(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, parameters_list, word_features)
 	
-	#Synthesize sound.
-	sounds = ()
+	#Describe the sounds to be synthesized.
 	for (parameters, f0_multiplier) in zip(parameters_list, f0_multipliers):
 		if options.debug:
 			print parameters
-		sounds += synthesizer.synthesize(parameters, f0_multiplier * pitch_multiplier, options.turbo)
-	return sounds
+		yield (SEGMENT_SOUND, parameters, f0_multiplier * pitch_multiplier)
 	
-def _extractSentence(tokens, sentence_number):
+def _extractSentences(paragraph, paragraph_number=None):
 	"""
-	Reads through the token stream to assemble the next sentence, applying
-	context evaluation to its elements along the way.
+	Reads through a paragraph in a single pass to assemble its sentences,
+	applying context evaluation to their elements along the way.
 	
-	@type tokens: list
-	@param tokens: A list of all tokens remaining in the input data.
-	@type sentence_number: int
-	@param sentence_number: The position of this sentence within its containing
-	    paragraph.
+	@type paragraph: unicode
+	@param paragraph: The text to be synthesized.
+	@type paragraph_number: int|None
+	@param paragraph_number: The paragraph's position in its script, indexed
+	    from 1, which is reported if the paragraph is invalid.
 	
-	@rtype: tuple(2)
-	@return: A tuple containing every token that forms a word in the extracted
-	    sentence, plus flags that describe the sentence's nature, and a list of
-	    all remaining tokens that form successive sentences.
+	@rtype: list
+	@return: A list of tuples, each containing every token that forms a word in
+	    a sentence, plus flags that describe the sentence's nature.
+	
+	@raise ValueError: If a token is not a valid word; the offset of the
+	    offending character within the paragraph, and the paragraph's
+	    position, if known, are given. The offset counts characters in the
+	    paragraph as given, which, for a script read by klatt.py, is its line
+	    with surrounding whitespace and any byte-order mark removed.
 	"""
 	#Cache commonly-referenced variables in the local scope for efficiency.
 	word_regexp = _WORD_REGEXP
@@ -288,16 +453,17 @@ def _extractSentence(tokens, sentence_number):
 	word_emphasized = _WORD_EMPHASIZED
 	word_content = _WORD_CONTENT
 	
+	sentences = []
 	words = []
 	markup = []
 	
 	quotation = False
 	emphasis = False
-	while tokens:
-		token = tokens.pop(0) #Get the first token remaining in the queue.
+	for token_match in _TOKEN_REGEXP.finditer(paragraph):
+		token = token_match.group()
 		match = word_regexp.match(token) #Break the token into its component elements.
 		if not match:
-			raise ValueError(u"Invalid character in word %i, sentence %i." % (len(words) + 1, sentence_number))
+			_describeInvalidToken(token, token_match.start(), len(words) + 1, len(sentences) + 1, paragraph_number)
 			
 		#Set word-level markup flags.
 		if '"' in match.group(1):
@@ -322,17 +488,48 @@ def _extractSentence(tokens, sentence_number):
 			emphasis = False
 			
 		#Look for the end of the sentence, and set sentence-level markup flags.
-		if '.' in match.group(3):
-			break
-		elif '?' in match.group(3):
+		ending = match.group(3)
+		if '?' in ending:
 			markup.append(_SENTENCE_QUESTION)
-			if '!' in match.group(3):
-				markup.append(_SENTENCE_EXCLAMATION)
-			break
-		elif '!' in match.group(3):
-			if '?' in match.group(3):
-				markup.append(_SENTENCE_QUESTION)
+		if '!' in ending:
 			markup.append(_SENTENCE_EXCLAMATION)
-			break
-	return ((tuple(words), tuple(markup)), tokens)
+		if markup or '.' in ending:
+			sentences.append((tuple(words), tuple(markup)))
+			words = []
+			markup = []
+			quotation = False
+			emphasis = False
+	if words: #The paragraph ended without punctuation.
+		sentences.append((tuple(words), tuple(markup)))
+	return sentences
+	
+def _describeInvalidToken(token, offset, word_number, sentence_number, paragraph_number=None):
+	"""
+	Raises an error that pinpoints the problem with a token that is not a
+	valid word.
+	
+	@type token: unicode
+	@param token: The invalid token.
+	@type offset: int
+	@param offset: The offset of the token within its paragraph, in
+	    characters from the start of the paragraph as given, not of the raw
+	    line it was read from.
+	@type word_number: int
+	@param word_number: The position of the token within its sentence.
+	@type sentence_number: int
+	@param sentence_number: The position of the token's sentence within its
+	    paragraph.
+	@type paragraph_number: int|None
+	@param paragraph_number: The position of the paragraph within its script,
+	    if known.
+	
+	@raise ValueError: Always.
+	"""
+	location = u"sentence %i" % (sentence_number)
+	if paragraph_number is not None:
+		location += u", paragraph %i" % (paragraph_number)
+	for (i, character) in enumerate(token):
+		if not character in _VALID_CHARACTERS:
+			raise ValueError(u"Invalid character U+%04X at offset %i, in word %i, %s." % (ord(character), offset + i, word_number, location))
+	raise ValueError(u"Misplaced markup in the word at offset %i, word %i, %s." % (offset, word_number, location))
 	
\ No newline at end of file
@@ -13,8 +13,11 @@ Legal
  
  (C) Neil Tallim, Sydni Bennie, 2009
 """
+import bounded_cache
 import ipa
 
+_EXPANSION_CACHE_SIZE = 1024 #: The maximum number of expanded phonemes held by the expansion cache.
+
 def bridgeWords(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters_list):
 	"""
 	Inserts a pause between two vowels in co-located words, or causes the second
@@ -54,8 +57,12 @@ def bridgeWords(ipa_character, preceding_phonemes, following_phonemes, previous_
 		if character in ipa.VOWELS:
 			parameters_list.append(list(ipa.IPA_PARAMETERS[u'h'][:32]) + [50])
 		else:
-			values = zip(parameters_list[0][:32], ipa.IPA_PARAMETERS[character[:32]])
-			parameters_list.insert(0, [(c + v) / 2 for (v, c) in values] + [50])
+			base_values = parameters_list[0][:32]
+			if _isSoundOf(base_values, ipa_character):
+				parameters_list.insert(0, list(ipa.getLiaisonBlend(ipa_character, character)) + [50])
+			else:
+				values = zip(base_values, ipa.IPA_PARAMETERS[character[:32]])
+				parameters_list.insert(0, [(c + v) / 2 for (v, c) in values] + [50])
 	return parameters_list
 	
 def nasalizeVowel(ipa_character, following_phonemes, parameters_list):
@@ -107,14 +114,21 @@ def nasalizeVowel(ipa_character, following_phonemes, parameters_list):
 	vowel_values = vowel[:32]
 	
 	#Multiplex the nasal and vowel values.
-	values = zip(vowel_values, ipa.IPA_PARAMETERS[following_phonemes[0]][:32])
-	
+	if _isSoundOf(vowel_values, ipa_character):
+		(lead_in_values, terminator_values) = ipa.getNasalBlends(ipa_character, following_phonemes[0])
+		lead_in_values = list(lead_in_values)
+		terminator_values = list(terminator_values)
+	else:
+		values = zip(vowel_values, ipa.IPA_PARAMETERS[following_phonemes[0]][:32])
+		lead_in_values = [(v * 2 + n) / 3 for (v, n) in values]
+		terminator_values = [(v + n * 2) / 3 for (v, n) in values]
+		
 	#Reduce vowel duration by 50%.
 	parameters_list[0] = vowel_values + [int(vowel_duration * 0.5)]
 	#Add nazalized lead-in = 1/3 nasalized sound, 2/3 base vowel.
-	parameters_list.insert(1, [(v * 2 + n) / 3 for (v, n) in values] + [int(vowel_duration * 0.167)])
+	parameters_list.insert(1, lead_in_values + [int(vowel_duration * 0.167)])
 	#Add nasalized terminator = 2/3 nasalized sound, 1/3 base vowel.
-	parameters_list.insert(2, [(v + n * 2) / 3 for (v, n) in values] + [int(vowel_duration * 0.333)])
+	parameters_list.insert(2, terminator_values + [int(vowel_duration * 0.333)])
 	
 	return parameters_list
 	
@@ -156,7 +170,7 @@ def shapeContours(ipa_character, preceding_phonemes, following_phonemes, paramet
 		
 		#Place the new sound at the start of the list.
 		if not ipa_character in ipa.STOPS: #Blend the sounds, 2/3 current.
-			parameters_list.insert(0, [(c * 2 + p) / 3 for (c, p) in zip(lead_in_values, ipa.IPA_PARAMETERS[preceding_phonemes[-1]][:32])] + [15])
+			parameters_list.insert(0, _blendContour(lead_in_values, ipa_character, preceding_phonemes[-1]) + [15])
 		else: #Add a 'ʔ' gap.
 			parameters_list.insert(0, list(ipa.IPA_PARAMETERS[u'\u0294'][:32]) + [15])
 			
@@ -169,9 +183,146 @@ def shapeContours(ipa_character, preceding_phonemes, following_phonemes, paramet
 		
 		#Place the new sound at the end of the list.
 		if not following_phonemes[0] in ipa.STOPS: #Blend the sounds, 2/3 current.
-			parameters_list.append([(c * 2 + p) / 3 for (c, p) in zip(lead_out_values, ipa.IPA_PARAMETERS[following_phonemes[0]][:32])] + [15])
+			parameters_list.append(_blendContour(lead_out_values, ipa_character, following_phonemes[0]) + [15])
 		else: #Add a 'h' gap.
 			parameters_list.append(list(ipa.IPA_PARAMETERS[u'h'][:32]) + [15])
 			
 	return parameters_list
-	
\ No newline at end of file
+	
+def _blendContour(values, ipa_character, neighbour):
+	"""
+	Blends a sound with a neighbouring phoneme, two thirds to one third,
+	looking the result up if the sound is the unaltered sound of the phoneme
+	being processed.
+	
+	@type values: list(32)
+	@param values: The sound's parameters, without its duration.
+	@type ipa_character: unicode
+	@param ipa_character: The character, representative of a phoneme, being
+	    processed.
+	@type neighbour: unicode
+	@param neighbour: The phoneme with which the sound is to be blended.
+	
+	@rtype: list(32)
+	@return: The blended parameters.
+	"""
+	if _isSoundOf(values, ipa_character):
+		return list(ipa.getContourBlend(ipa_character, neighbour))
+	return [(c * 2 + p) / 3 for (c, p) in zip(values, ipa.IPA_PARAMETERS[neighbour][:32])]
+	
+def _isSoundOf(values, ipa_character):
+	"""
+	Determines whether a sound is the unaltered sound of a phoneme, in which
+	case its blends may be drawn from the tables in L{ipa}.
+	
+	@type values: list(32)
+	@param values: The sound's parameters, without its duration.
+	@type ipa_character: unicode
+	@param ipa_character: The phoneme to which the sound may belong.
+	
+	@rtype: bool
+	@return: True if the sound matches the phoneme's parameters.
+	"""
+	return tuple(values) == ipa.IPA_PARAMETERS[ipa_character][:32]
+	
+class ExpansionCache(bounded_cache.BoundedCache):
+	"""
+	A bounded table of the parameter-sets produced by the universal rules,
+	keyed by the local context on which they depend: the phoneme, its
+	immediate neighbours, the last character of the previous word, and its
+	base parameters.
+	
+	Expansions are stored and returned as tuples of tuples, so nothing that
+	receives one can alter the stored copy; callers that need to modify a
+	parameter-set must copy it into a list first. When the table is full, the
+	least-recently-used expansion is evicted.
+	"""
+	def __init__(self, capacity=_EXPANSION_CACHE_SIZE):
+		"""
+		Prepares an empty expansion table.
+		
+		@type capacity: int
+		@param capacity: The maximum number of expansions to hold; 0 disables
+		    storage entirely.
+		"""
+		bounded_cache.BoundedCache.__init__(self, capacity)
+		
+	def lookup(self, ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters):
+		"""
+		Retrieves the result of applying every universal rule to a phoneme,
+		applying them if necessary.
+		
+		@type ipa_character: unicode
+		@param ipa_character: The character, representative of a phoneme, being
+		    processed.
+		@type preceding_phonemes: sequence
+		@param preceding_phonemes: A collection of all phonemes, in order, that
+		    precede the current IPA character in the current word.
+		@type following_phonemes: sequence
+		@param following_phonemes: A collection of all phonemes, in order, that
+		    follow the current IPA character in the current word.
+		@type previous_words: sequence
+		@param previous_words: A collection of all words that have been
+		    previously synthesized.
+		@type parameters: sequence(33)
+		@param parameters: The base sound of the phoneme being processed.
+		
+		@rtype: tuple
+		@return: The phoneme's parameter-sets, in order, each as a tuple(33).
+		"""
+		preceding_phoneme = following_phoneme = bridged_character = None
+		if preceding_phonemes:
+			preceding_phoneme = preceding_phonemes[-1]
+		elif previous_words and ipa_character in ipa.VOWELS: #Only vowels are bridged to the previous word.
+			bridged_character = previous_words[-1][-1]
+		if following_phonemes:
+			following_phoneme = following_phonemes[0]
+		key = (ipa_character, preceding_phoneme, following_phoneme, bridged_character, tuple(parameters))
+		return self._fetch(key, _expand, ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters)
+		
+def _expand(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters):
+	"""
+	Applies every universal rule to a phoneme, in order.
+	
+	@type ipa_character: unicode
+	@param ipa_character: The character, representative of a phoneme, being
+	    processed.
+	@type preceding_phonemes: sequence
+	@param preceding_phonemes: A collection of all phonemes, in order, that
+	    precede the current IPA character in the current word.
+	@type following_phonemes: sequence
+	@param following_phonemes: A collection of all phonemes, in order, that
+	    follow the current IPA character in the current word.
+	@type previous_words: sequence
+	@param previous_words: A collection of all words that have been previously
+	    synthesized.
+	@type parameters: sequence(33)
+	@param parameters: The base sound of the phoneme being processed.
+	
+	@rtype: tuple
+	@return: The phoneme's parameter-sets, in order, each as a tuple(33).
+	"""
+	parameters_list = [list(parameters)]
+	
+	#Apply vowel nasalization.
+	parameters_list = nasalizeVowel(ipa_character, following_phonemes, parameters_list)
+	
+	#Apply liasons.
+	parameters_list = bridgeWords(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters_list)
+	
+	#Apply contour-shaping.
+	parameters_list = shapeContours(ipa_character, preceding_phonemes, following_phonemes, parameters_list)
+	
+	return tuple([tuple(parameters) for parameters in parameters_list])
+	
+def getExpansionCache():
+	"""
+	Provides the table through which phonemes are expanded by the universal
+	rules.
+	
+	@rtype: L{ExpansionCache}
+	@return: The shared expansion table.
+	"""
+	return _EXPANSION_CACHE
+	
+_EXPANSION_CACHE = ExpansionCache() #: The table through which phonemes are expanded by the universal rules.
@@ -13,7 +13,8 @@ Legal
  
  (C) Neil Tallim, 2009
 """
-import struct
+import array
+import sys
 import wave
 
 class WaveForm(object):
@@ -23,35 +24,66 @@ class WaveForm(object):
 	_finalized = False #: True when this file has been closed.
 	_wavefile = None #: The file into which wave data will be written.
 	
-	def __init__(self, filename):
+	def __init__(self, filename, sample_rate=10000):
 		"""
-		Opens a wavefile and prepares it to receive data at 10,000Hz.
+		Opens a wavefile and prepares it to receive data at the given rate.
 		
 		@type filename: basestring
 		@param filename: The path to the wavefile to be written.
+		@type sample_rate: int
+		@param sample_rate: The number of samples per second, which must match
+		    the rate at which they were synthesized.
 		
 		@raise IOError: If the specified file cannot be opened for writing.
 		"""
 		self._wavefile = wave.open(filename, 'wb')
 		self._wavefile.setnchannels(1) #Mono.
 		self._wavefile.setsampwidth(2) #16-bit.
-		self._wavefile.setframerate(10000) #10000 frames per second.
+		self._wavefile.setframerate(sample_rate)
 		
 	def addSamples(self, samples):
 		"""
 		Adds an arbitrary number of integers to the wavefile.
 		
-		@type samples: sequence
+		The samples are written as a single block of native 16-bit values, which
+		the wave module converts to little-endian order on big-endian hosts, as
+		wavefiles require.
+		
+		@type samples: array.array|sequence
 		@param samples: A collection of 16-bit signed integers. (-32768-32767)
+		    An array with typecode 'h' is written without being converted.
 		
 		@raise IOError: If the wavefile cannot be written to, either because the
 		    disk is full or the wavefile has been closed.
-		@raise struct.error: If a sample value is not in the acceptable integer
+		@raise OverflowError: If a sample value is not in the acceptable integer
 		    range.
 		"""
 		if self._finalized:
 			raise IOError("The waveform has already been finalized.")
-		self._wavefile.writeframes(''.join([struct.pack('h', sample) for sample in samples]))
+		if not isinstance(samples, array.array) or samples.typecode != 'h':
+			samples = array.array('h', samples)
+		self._wavefile.writeframesraw(samples.tostring())
+		
+	def addRawSamples(self, data):
+		"""
+		Adds samples that are already packed as native 16-bit signed integers,
+		such as a buffer shared between processes, in a single write.
+		
+		On little-endian hosts, the bytes are written without being copied. On
+		big-endian hosts, they are copied into a string first, since the wave
+		module, which swaps them into little-endian order, cannot swap a buffer.
+		
+		@type data: str|buffer
+		@param data: The bytes of the samples, in native order.
+		
+		@raise IOError: If the wavefile cannot be written to, either because the
+		    disk is full or the wavefile has been closed.
+		"""
+		if self._finalized:
+			raise IOError("The waveform has already been finalized.")
+		if sys.byteorder == 'big':
+			data = str(data)
+		self._wavefile.writeframesraw(data)
 		
 	def close(self):
 		"""
@@ -63,4 +95,4 @@ class WaveForm(object):
 		if not self._finalized:
 			self._wavefile.close()
 			self._finalized = True
-			
\ No newline at end of file
+			
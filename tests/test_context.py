@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_context
+
+Purpose
+=======
+ Checks that views onto words and phonemes behave exactly like the lists they
+ replace, including when given to rules written for lists.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import types
+import unittest
+
+import src.context as context
+import src.language_rules as language_rules
+
+_SEQUENCE = (u's', u'ɑ', u'm', u'ɑ', u't', u'i', u'h') #: The sequence viewed by the tests.
+_BOUNDS = ((0, 7), (1, 5), (2, 3), (4, 4), (6, 7)) #: The start and stop of each view tested, including an empty one.
+
+def _getViews():
+	"""
+	Provides each view of the tests, with the list it must behave like.
+	
+	@rtype: list
+	@return: A (view, list) pair for each view.
+	"""
+	return [(context.SequenceView(_SEQUENCE, start, stop), list(_SEQUENCE[start:stop])) for (start, stop) in _BOUNDS]
+	
+class SequenceViewTest(unittest.TestCase):
+	def testIndexing(self):
+		"""
+		Positive and negative indices must find what the list holds, and
+		indices outside it must raise IndexError.
+		"""
+		for (view, expected) in _getViews():
+			for i in xrange(-len(expected), len(expected)):
+				self.assertEqual(view[i], expected[i])
+			self.assertRaises(IndexError, view.__getitem__, len(expected))
+			self.assertRaises(IndexError, view.__getitem__, -len(expected) - 1)
+			
+	def testSlicing(self):
+		"""
+		Slices, with any step and with bounds beyond the view, must produce the
+		list's slices.
+		"""
+		for (view, expected) in _getViews():
+			for start in (None, -9, -2, 0, 1, 3, 9):
+				for stop in (None, -9, -1, 0, 2, 4, 9):
+					for step in (None, 1, 2, -1, -3):
+						self.assertEqual(view[start:stop:step], expected[start:stop:step])
+						
+	def testMeasurement(self):
+		"""
+		Length, truth, iteration and reversal must match the list's.
+		"""
+		for (view, expected) in _getViews():
+			self.assertEqual(len(view), len(expected))
+			self.assertEqual(bool(view), bool(expected))
+			self.assertEqual(list(iter(view)), expected)
+			self.assertEqual(list(reversed(view)), expected[::-1])
+			
+	def testSearching(self):
+		"""
+		Membership, index and count must match the list's, including for
+		elements outside the view.
+		"""
+		for (view, expected) in _getViews():
+			for item in set(_SEQUENCE) | set((u'x',)):
+				self.assertEqual(item in view, item in expected)
+				self.assertEqual(view.count(item), expected.count(item))
+				if item in expected:
+					self.assertEqual(view.index(item), expected.index(item))
+				else:
+					self.assertRaises(ValueError, view.index, item)
+					
+	def testComparison(self):
+		"""
+		Views must be equal to lists and tuples with the same elements, and to
+		each other, and unequal to anything else.
+		"""
+		for (view, expected) in _getViews():
+			self.assertTrue(view == expected)
+			self.assertTrue(expected == view)
+			self.assertTrue(view == tuple(expected))
+			self.assertFalse(view != expected)
+			self.assertFalse(view != tuple(expected))
+			self.assertTrue(view == context.SequenceView(list(expected)))
+			self.assertTrue(view != expected + [u'x'])
+			self.assertTrue(expected + [u'x'] != view)
+			self.assertTrue(view != u''.join(expected))
+			
+	def testConcatenation(self):
+		"""
+		Adding a list on either side must produce the list's concatenation.
+		"""
+		for (view, expected) in _getViews():
+			self.assertEqual(view + [u'x'], expected + [u'x'])
+			self.assertEqual([u'x'] + view, [u'x'] + expected)
+			self.assertTrue(isinstance(view + [u'x'], list))
+			self.assertTrue(isinstance([u'x'] + view, list))
+			
+	def testHelpers(self):
+		"""
+		Preceding and following views must match the slices they replace.
+		"""
+		for i in xrange(len(_SEQUENCE)):
+			self.assertEqual(context.precedingView(_SEQUENCE, i), list(_SEQUENCE[:i]))
+			self.assertEqual(context.followingView(_SEQUENCE, i), list(_SEQUENCE[i + 1:]))
+			
+class LegacyRuleTest(unittest.TestCase):
+	def setUp(self):
+		self._rules = language_rules._RULES
+		self._pipelines = language_rules._PIPELINES
+		
+		def legacyRule(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, previous_phoneme_parameters, remaining_phoneme_parameter_count, preceding_parameters, following_parameters, parameters):
+			description = (
+			 len(preceding_phonemes), preceding_phonemes[-1:], u'ɑ' in preceding_phonemes, preceding_phonemes.count(u'ɑ'),
+			 following_phonemes[::-1], following_phonemes + [ipa_character], [ipa_character] + following_phonemes,
+			 bool(previous_words), previous_words == [u'sɑ'], previous_words[:1], list(reversed(following_words)),
+			 following_words and following_words.index(following_words[-1]),
+			)
+			return ([[description]], [], 1.0)
+			
+		language = types.ModuleType('legacy')
+		language.NAME = 'Legacy'
+		language.RULE_FUNCTIONS = (legacyRule,)
+		language_rules._RULES = language_rules._loadRules(language)
+		language_rules._PIPELINES = {}
+		
+	def tearDown(self):
+		language_rules._RULES = self._rules
+		language_rules._PIPELINES = self._pipelines
+		
+	def testViewsMatchLists(self):
+		"""
+		A rule written for the original calling convention must reach the same
+		conclusions from views as from the lists they replace.
+		"""
+		phonemes = [u's', u'ɑ', u'm', u'ɑ', u't']
+		words = [u'sɑ', u'mɑt', u'hi', u'sɑ']
+		for i in xrange(len(phonemes)):
+			for j in xrange(len(words)):
+				with_views = language_rules.applyRules(phonemes[i], context.precedingView(phonemes, i), context.followingView(phonemes, i), j + 1, len(words) - j - 1, context.precedingView(words, j), context.followingView(words, j), 1, 0, False, False, False, False, False, ((0,),))
+				with_lists = language_rules.applyRules(phonemes[i], phonemes[:i], phonemes[i + 1:], j + 1, len(words) - j - 1, words[:j], words[j + 1:], 1, 0, False, False, False, False, False, ((0,),))
+				self.assertEqual(with_views, with_lists)
+				
+if __name__ == '__main__':
+	unittest.main()
+	
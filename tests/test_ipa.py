@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_ipa
+
+Purpose
+=======
+ Checks that text is divided into the longest IPA symbols possible, as it
+ was before symbols were matched by a single regular expression, and that
+ blends of phonemes are built as they were before they were tabulated.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, Sydni Bennie, 2009
+"""
+import unittest
+
+import src.ipa as ipa
+
+def _blend(ipa_character, other, weight, other_weight):
+	"""
+	Blends two phonemes as the universal rules did before blends were
+	tabulated.
+	
+	@type ipa_character: unicode
+	@param ipa_character: The first phoneme.
+	@type other: unicode
+	@param other: The second phoneme.
+	@type weight: int
+	@param weight: The first phoneme's share.
+	@type other_weight: int
+	@param other_weight: The second phoneme's share.
+	
+	@rtype: list
+	@return: The blended parameters, without a duration.
+	"""
+	values = zip(ipa.IPA_PARAMETERS[ipa_character][:32], ipa.IPA_PARAMETERS[other][:32])
+	return [(c * weight + o * other_weight) / (weight + other_weight) for (c, o) in values]
+	
+
+_REDUCTIONS = (
+ (u'sɑ', [u's', u'ɑ']),
+ (u'tʃɑ', [u't', u'ʃ', u'ɑ']),
+ (u'dʒi', [u'dʒ', u'i']),
+ (u'dʒdʒ', [u'dʒ', u'dʒ']),
+ (u'd', [u'd']),
+ (u'ɑj', [u'ɑj']),
+ (u'ɔj', [u'ɔj']),
+ (u'ɑjɑw', [u'ɑj', u'ɑw']),
+ (u'ɑ j', [u'ɑ', u' ', u'j']),
+ (u'ɑ<', [u'ɑ', u'<']),
+ (u'<ɑ', [u'<', u'ɑ']),
+ (u'ɑ<<j', [u'ɑ', u'<', u'<', u'j']),
+ (u'ɑj>+', [u'ɑj', u'>', u'+']),
+ (u'mɑ-n', [u'm', u'ɑ', u'-', u'n']),
+ (u'x', [u'x']),
+ (u'ɑxs', [u'ɑ', u'x', u's']),
+) #: Tokens and their reductions, as produced before symbols were matched by a regular expression.
+
+class ReduceIPAClustersTest(unittest.TestCase):
+	def testBaseline(self):
+		"""
+		Tokens must be reduced exactly as they were when only two-character
+		symbols were recognized, character by character.
+		"""
+		for (token, reduction) in _REDUCTIONS:
+			self.assertEqual(ipa.reduceIPAClusters(token), reduction)
+			
+	def testLongestMatch(self):
+		"""
+		Every multi-character symbol must win over its prefixes, including
+		those longer than two characters, which were once split apart.
+		"""
+		symbols = [ipa_character for ipa_character in ipa.IPA_PARAMETERS if len(ipa_character) > 1]
+		self.assertTrue([symbol for symbol in symbols if len(symbol) > 2])
+		for symbol in symbols:
+			self.assertEqual(ipa.reduceIPAClusters(symbol), [symbol])
+			self.assertEqual(ipa.reduceIPAClusters(u's' + symbol + u'<'), [u's', symbol, u'<'])
+			
+	def testEmptyToken(self):
+		"""
+		An empty token must reduce to nothing.
+		"""
+		self.assertEqual(ipa.reduceIPAClusters(u''), [])
+		
+class FindPhonemesTest(unittest.TestCase):
+	def testPhonemes(self):
+		"""
+		Phonemes must be found with their offsets and extension syntax, taking
+		the longest symbol possible and skipping anything that is not a
+		symbol.
+		"""
+		self.assertEqual(ipa.findPhonemes(u'dʒɑj, x sɑ<+ t(3'), [
+		 (0, u'dʒ', u''),
+		 (2, u'ɑj', u''),
+		 (8, u's', u''),
+		 (9, u'ɑ', u'<+'),
+		 (13, u't(3', u''),
+		])
+		
+	def testAgreesWithReduction(self):
+		"""
+		The phonemes found in a token must be the symbols it reduces to, less
+		extension syntax and unknown characters.
+		"""
+		for (token, reduction) in _REDUCTIONS:
+			self.assertEqual(
+			 [ipa_character for (offset, ipa_character, extensions) in ipa.findPhonemes(token)],
+			 [ipa_character for ipa_character in reduction if ipa_character in ipa.IPA_PARAMETERS]
+			)
+			
+	def testEmptyText(self):
+		"""
+		Empty text, or text without symbols, must have no phonemes.
+		"""
+		self.assertEqual(ipa.findPhonemes(u''), [])
+		self.assertEqual(ipa.findPhonemes(u' ,.?!x'), [])
+		
+class BlendTest(unittest.TestCase):
+	def testContourBlend(self):
+		"""
+		A contour blend must be two thirds phoneme and one third neighbour.
+		"""
+		self.assertEqual(list(ipa.getContourBlend(u'ɑ', u's')), _blend(u'ɑ', u's', 2, 1))
+		self.assertEqual(list(ipa.getContourBlend(u's', u'ɑ')), _blend(u's', u'ɑ', 2, 1))
+		
+	def testLiaisonBlend(self):
+		"""
+		A liaison blend must be equal parts vowel and previous character.
+		"""
+		self.assertEqual(list(ipa.getLiaisonBlend(u'ɑ', u'm')), _blend(u'ɑ', u'm', 1, 1))
+		
+	def testNasalBlends(self):
+		"""
+		Nasal blends must be a lead-in of two thirds vowel and a terminator of
+		two thirds nasal.
+		"""
+		(lead_in, terminator) = ipa.getNasalBlends(u'i', u'n')
+		self.assertEqual(list(lead_in), _blend(u'i', u'n', 2, 1))
+		self.assertEqual(list(terminator), _blend(u'i', u'n', 1, 2))
+		
+	def testMissesAreBuiltAndKept(self):
+		"""
+		A pair not yet in a table must be built on first use, as a tuple of 32
+		values, and the same blend returned from then on.
+		"""
+		for (getBlend, table, pair) in (
+		 (ipa.getContourBlend, ipa._CONTOUR_BLENDS, (u'ʒ', u'h')),
+		 (ipa.getLiaisonBlend, ipa._LIAISON_BLENDS, (u'u', u'ʒ')),
+		 (ipa.getNasalBlends, ipa._NASAL_BLENDS, (u'u', u'ŋ')),
+		):
+			table.pop(pair, None)
+			blend = getBlend(*pair)
+			self.assertTrue(table[pair] is blend)
+			self.assertTrue(getBlend(*pair) is blend)
+			self.assertTrue(isinstance(blend, tuple))
+			
+if __name__ == '__main__':
+	unittest.main()
+	
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_language_rules
+
+Purpose
+=======
+ Checks that word features are gathered correctly, that compiled rule
+ pipelines select exactly the rules that can fire, and that rules written
+ for the original calling convention still load and behave as they always
+ did.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import itertools
+import types
+import unittest
+
+import src.ipa as ipa
+import src.language_rules as language_rules
+
+_SENTENCE = (u'hu', u'sɑm', u'st', u'hæw', u'ɑjmi', u'hu') #: The words of the sentence analyzed by the tests, including question-words and a word without vowels.
+_FLAGS = ('is_quoted', 'is_emphasized', 'is_content', 'is_question', 'is_exclamation') #: The flags on which rule conditions may depend, in the order applyRules takes them.
+
+def _makeLegacyLanguage(calls):
+	"""
+	Creates a language module whose only rule, applied twice, uses the
+	original calling convention, taking every field as a separate argument.
+	
+	@type calls: list
+	@param calls: A list to which each call's sound lists, and copies of
+	    their contents at the time, are appended.
+	
+	@rtype: module
+	@return: A language module without a C{RULE_API_VERSION}.
+	"""
+	def legacyRule(ipa_character, preceding_phonemes, following_phonemes, word_position, remaining_words, previous_words, following_words, sentence_position, remaining_sentences, is_quoted, is_emphasized, is_content, is_question, is_exclamation, previous_phoneme_parameters, remaining_phoneme_parameter_count, preceding_parameters, following_parameters, parameters):
+		calls.append((preceding_parameters, list(preceding_parameters), following_parameters, list(following_parameters)))
+		parameters[0] += 1
+		return ([[ipa_character, len(preceding_parameters)]], [[remaining_phoneme_parameter_count]], 2.0)
+		
+	language = types.ModuleType('legacy')
+	language.NAME = 'Legacy'
+	language.RULE_FUNCTIONS = (legacyRule, legacyRule)
+	return language
+	
+class WordFeaturesTest(unittest.TestCase):
+	def testFeatures(self):
+		"""
+		Each word's vowels and question-words must be counted, with the count
+		of question-words accumulating across the sentence.
+		"""
+		features = language_rules.analyzeSentence([ipa.reduceIPAClusters(word) for word in _SENTENCE])
+		self.assertEqual([word_features.word for word_features in features], list(_SENTENCE))
+		self.assertEqual([word_features.vowel_count for word_features in features], [1, 1, 0, 1, 2, 1])
+		self.assertEqual([word_features.preceding_vowel_counts for word_features in features], [(0, 0), (0, 0, 1), (0, 0), (0, 0, 1), (0, 1, 1), (0, 0)])
+		self.assertEqual([word_features.last_vowel_index for word_features in features], [1, 1, None, 1, 2, 1])
+		self.assertEqual([word_features.is_question_word for word_features in features], [True, False, False, True, False, True])
+		self.assertEqual([word_features.question_words_before for word_features in features], [0, 1, 1, 1, 2, 2])
+		
+	def testEmptySentence(self):
+		"""
+		A sentence without words must have no features.
+		"""
+		self.assertEqual(language_rules.analyzeSentence([]), ())
+		
+	def testRulesIgnoreSource(self):
+		"""
+		Rules must produce the same output whether word features are gathered
+		for the sentence in advance or from each phoneme's context.
+		"""
+		words = [ipa.reduceIPAClusters(word) for word in _SENTENCE]
+		features = language_rules.analyzeSentence(words)
+		for flags in ((False,) * 5, (False, False, False, True, False), (True, True, True, False, True)):
+			for (i, phonemes) in enumerate(words):
+				for (j, ipa_character) in enumerate(phonemes):
+					arguments = (ipa_character, phonemes[:j], phonemes[j + 1:], i + 1, len(words) - i - 1, list(_SENTENCE[:i]), list(_SENTENCE[i + 1:]), 1, 0) + flags + ((ipa.IPA_PARAMETERS[ipa_character],),)
+					self.assertEqual(language_rules.applyRules(*(arguments + (features[i],))), language_rules.applyRules(*arguments))
+					
+class PipelineTest(unittest.TestCase):
+	def setUp(self):
+		self._rules = language_rules._RULES
+		self._pipelines = language_rules._PIPELINES
+		
+	def tearDown(self):
+		language_rules._RULES = self._rules
+		language_rules._PIPELINES = self._pipelines
+		
+	def _applyEverywhere(self):
+		"""
+		Applies the current rules to every phoneme, alone and within a word,
+		at the end of its sentence and before another word, under every
+		combination of flags.
+		
+		@rtype: list
+		@return: The result of L{language_rules.applyRules} for each case.
+		"""
+		language_rules._PIPELINES = {}
+		results = []
+		for ipa_character in sorted(ipa.IPA_PARAMETERS):
+			parameters_list = (ipa.IPA_PARAMETERS[ipa_character],)
+			for ((preceding_phonemes, following_phonemes), remaining_words, flags) in itertools.product(
+			 (([], []), ([u's'], [u'ɑ'])),
+			 (0, 1),
+			 itertools.product((False, True), repeat=len(_FLAGS)),
+			):
+				results.append(language_rules.applyRules(ipa_character, preceding_phonemes, following_phonemes, 1, remaining_words, [], [u'ɑ'] * remaining_words, 1, 0, *(flags + (parameters_list,))))
+		return results
+		
+	def testPipelinesMatchFullEvaluation(self):
+		"""
+		Compiled pipelines must produce exactly what evaluating every rule in
+		full does, for every phoneme and combination of flags.
+		"""
+		compiled = self._applyEverywhere()
+		language_rules._RULES = tuple([(function, None) for (function, conditions) in self._rules])
+		self.assertEqual(compiled, self._applyEverywhere())
+		
+	def testPipelinesSkipRules(self):
+		"""
+		Each pipeline must leave out the rules whose conditions it fails, and
+		must be compiled once for each combination of phoneme and flags.
+		"""
+		language_rules._PIPELINES = {}
+		for flags in itertools.product((False, True), repeat=len(_FLAGS)):
+			language_rules.applyRules(u's', [], [], 1, 0, [], [], 1, 0, *(flags + ((ipa.IPA_PARAMETERS[u's'],),)))
+			language_rules.applyRules(u's', [], [u'ɑ'], 1, 0, [], [], 1, 0, *(flags + ((ipa.IPA_PARAMETERS[u's'],),)))
+		self.assertEqual(len(language_rules._PIPELINES), 2 ** len(_FLAGS))
+		for pipeline in language_rules._PIPELINES.values():
+			self.assertTrue(len(pipeline) < len(self._rules))
+			
+class LegacyRuleTest(unittest.TestCase):
+	def setUp(self):
+		self._rules = language_rules._RULES
+		self._pipelines = language_rules._PIPELINES
+		self._calls = []
+		language_rules._RULES = language_rules._loadRules(_makeLegacyLanguage(self._calls))
+		language_rules._PIPELINES = {}
+		
+	def tearDown(self):
+		language_rules._RULES = self._rules
+		language_rules._PIPELINES = self._pipelines
+		
+	def _applyRules(self, parameters_list):
+		"""
+		Applies the legacy rules to a phoneme.
+		
+		@type parameters_list: sequence
+		@param parameters_list: The phoneme's parameter-sets.
+		
+		@rtype: tuple(2)
+		@return: The result of L{language_rules.applyRules}.
+		"""
+		return language_rules.applyRules(u'ɑ', [u's'], [], 1, 0, [], [], 1, 0, False, False, False, False, False, parameters_list)
+		
+	def testRulesAreAdapted(self):
+		"""
+		A language without a rule API version must have its rules wrapped, with
+		no conditions.
+		"""
+		self.assertEqual(len(language_rules._RULES), 2)
+		for (function, conditions) in language_rules._RULES:
+			self.assertEqual(function.__name__, 'legacyRule')
+			self.assertEqual(conditions, None)
+			
+	def testOutput(self):
+		"""
+		Legacy rules must produce what they did when called directly, with the
+		sounds they add arranged around each parameter-set.
+		"""
+		parameters_list = ((0,), (10,))
+		self.assertEqual(self._applyRules(parameters_list), (
+		 [[u'ɑ', 0], [u'ɑ', 1], [2], [1], [1], [u'ɑ', 0], [u'ɑ', 1], [12], [0], [0]],
+		 [4.0] * 10,
+		))
+		self.assertEqual(parameters_list, ((0,), (10,)))
+		
+	def testArgumentsDoNotChange(self):
+		"""
+		The sound lists a legacy rule receives must not change after it returns.
+		"""
+		self._applyRules(((0,), (10,)))
+		self.assertEqual(len(self._calls), 4)
+		for (preceding_parameters, preceding_copy, following_parameters, following_copy) in self._calls:
+			self.assertEqual(preceding_parameters, preceding_copy)
+			self.assertEqual(following_parameters, following_copy)
+			
+if __name__ == '__main__':
+	unittest.main()
+	
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_parwave
+
+Purpose
+=======
+ Checks that the rendering engines agree sample for sample, and that
+ continuous synthesis carries sound from one segment into the next without
+ discontinuities.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import unittest
+
+import src.ipa as ipa
+import src.parwave as parwave
+
+_VOWEL = u'ɑ' #: The vowel rendered by the continuous-synthesis tests.
+_PHONEMES = (u'ɑ', u's', u'ʒ', u'm', u't', u'h') #: Phonemes that exercise voicing, frication, aspiration and the nasal branch, rendered by the engine tests.
+
+def _vowelParameters(milliseconds):
+	"""
+	Provides the parameters of the test vowel.
+	
+	@type milliseconds: int
+	@param milliseconds: The vowel's duration.
+	
+	@rtype: tuple(33)
+	@return: The vowel's synthesis parameters.
+	"""
+	return ipa.IPA_DATA[_VOWEL][0][:-1] + (milliseconds,)
+	
+def _getEngines():
+	"""
+	Lists the engines that can be tested here.
+	
+	@rtype: list
+	@return: Every engine whose requirements are met.
+	"""
+	engines = []
+	for engine in parwave.ENGINES:
+		try:
+			parwave.Synthesizer(engine)
+		except ValueError: #NumPy is unavailable.
+			continue
+		engines.append(engine)
+	return engines
+	
+def _renderPhonemes(engine, turbo=False, seed=5, **options):
+	"""
+	Renders the engine tests' phonemes with a fixed seed.
+	
+	@type engine: basestring
+	@param engine: The engine to render with.
+	@type turbo: bool
+	@param turbo: True if turbo mode is to be used.
+	@type seed: int
+	@param seed: The seed for the synthesizer's noise.
+	@type options: dict
+	@param options: Any other arguments for the L{parwave.Synthesizer}.
+	
+	@rtype: list
+	@return: The samples of each phoneme, in order.
+	"""
+	synthesizer = parwave.Synthesizer(engine, seed=seed, **options)
+	return [synthesizer.synthesize(ipa.IPA_PARAMETERS[ipa_character], 1.0, turbo).tolist() for ipa_character in _PHONEMES]
+	
+class EngineTest(unittest.TestCase):
+	def setUp(self):
+		if parwave.ENGINE_VECTORIZED not in _getEngines():
+			self.skipTest('NumPy is unavailable')
+			
+	def testEnginesAgree(self):
+		"""
+		The vectorized engine must produce exactly the samples of the
+		reference engine, in every mode.
+		"""
+		for (turbo, options) in (
+		 (False, {}),
+		 (True, {}),
+		 (False, {'continuous': True}),
+		 (False, {'sample_rate': 22050}),
+		 (False, {'sample_rate': parwave.PREVIEW_SAMPLE_RATE, 'preview': True}),
+		):
+			reference = _renderPhonemes(parwave.ENGINE_REFERENCE, turbo, **options)
+			vectorized = _renderPhonemes(parwave.ENGINE_VECTORIZED, turbo, **options)
+			self.assertTrue(max([max([abs(sample) for sample in samples]) for samples in reference]) > 0)
+			self.assertEqual(reference, vectorized)
+			
+	def testEnginesAgreeOnEmptySounds(self):
+		"""
+		At low rates, short sounds have no samples at all, which the vectorized
+		engine must render as the reference engine does.
+		"""
+		for turbo in (False, True):
+			sounds = {}
+			for engine in parwave.ENGINES:
+				synthesizer = parwave.Synthesizer(engine, seed=5, sample_rate=100)
+				sounds[engine] = [synthesizer.synthesize(ipa.IPA_PARAMETERS[ipa_character][:-1] + (5,), 1.0, turbo).tolist() for ipa_character in _PHONEMES]
+			self.assertEqual(sounds[parwave.ENGINE_VECTORIZED], sounds[parwave.ENGINE_REFERENCE])
+			self.assertEqual(sounds[parwave.ENGINE_REFERENCE], [[]] * len(_PHONEMES))
+			
+	def testSeedsOutsideThirtyTwoBits(self):
+		"""
+		Both engines must accept negative and oversized seeds, agree on them,
+		and treat them as their lowest 32 bits.
+		"""
+		for seed in (-1, 2 ** 40 + 5):
+			reference = _renderPhonemes(parwave.ENGINE_REFERENCE, seed=seed)
+			self.assertEqual(_renderPhonemes(parwave.ENGINE_VECTORIZED, seed=seed), reference)
+			self.assertEqual(_renderPhonemes(parwave.ENGINE_REFERENCE, seed=seed & 0xFFFFFFFF), reference)
+			
+	def testNoiseSourcesAgree(self):
+		"""
+		Noise sources for either engine must accept seeds outside 32 bits,
+		directly and on re-seeding, and produce the same noise.
+		"""
+		for seed in (-1, 2 ** 40 + 5):
+			reference = parwave.NoiseSource(seed)
+			vectorized = parwave.NoiseSource(seed, True)
+			self.assertEqual(vectorized.generate(16), reference.generate(16))
+			reference.reseed(seed)
+			vectorized.reseed(seed)
+			self.assertEqual(vectorized.generate(16), reference.generate(16))
+			
+class CoefficientCacheTest(unittest.TestCase):
+	def _getBands(self, ipa_character):
+		"""
+		Provides the frequencies and bandwidths of a phoneme.
+		
+		@type ipa_character: unicode
+		@param ipa_character: The phoneme whose resonators are wanted.
+		
+		@rtype: tuple(2)
+		@return: The phoneme's frequencies and bandwidths, as given to
+		    L{parwave.CoefficientCache.lookup}.
+		"""
+		parameters = ipa.IPA_PARAMETERS[ipa_character]
+		return (parameters[0:11], parameters[11:22])
+		
+	def testHitsMatchComputation(self):
+		"""
+		Stored co-efficients must equal freshly computed ones, and lookups must
+		be counted as hits or misses.
+		"""
+		coefficient_cache = parwave.CoefficientCache()
+		for ipa_character in _PHONEMES + _PHONEMES:
+			(frequencies, bandwidths) = self._getBands(ipa_character)
+			self.assertEqual(coefficient_cache.lookup(frequencies, bandwidths), parwave._computeCoefficients(frequencies, bandwidths, parwave.SAMPLE_RATE))
+		statistics = coefficient_cache.getStatistics()
+		self.assertEqual((statistics['hits'], statistics['misses'], statistics['entries']), (len(_PHONEMES), len(_PHONEMES), len(_PHONEMES)))
+		
+	def testEviction(self):
+		"""
+		A full table must evict its least-recently-used co-efficients, and a
+		table with no capacity must store nothing.
+		"""
+		coefficient_cache = parwave.CoefficientCache(2)
+		for ipa_character in (u'ɑ', u's', u'ɑ', u'm'):
+			coefficient_cache.lookup(*self._getBands(ipa_character))
+		statistics = coefficient_cache.getStatistics()
+		self.assertEqual((statistics['hits'], statistics['misses'], statistics['evictions'], statistics['entries']), (1, 3, 1, 2))
+		coefficient_cache.lookup(*self._getBands(u'ɑ')) #Still held.
+		self.assertEqual(coefficient_cache.getStatistics()['hits'], 2)
+		coefficient_cache.lookup(*self._getBands(u's')) #Evicted.
+		self.assertEqual(coefficient_cache.getStatistics()['misses'], 4)
+		
+		coefficient_cache = parwave.CoefficientCache(0)
+		for i in xrange(2):
+			coefficient_cache.lookup(*self._getBands(u'ɑ'))
+		statistics = coefficient_cache.getStatistics()
+		self.assertEqual((statistics['hits'], statistics['misses'], statistics['entries']), (0, 2, 0))
+		
+	def testSampleRateIsKeyed(self):
+		"""
+		The same resonators at different rates must be stored separately, each
+		with its own co-efficients.
+		"""
+		coefficient_cache = parwave.CoefficientCache()
+		(frequencies, bandwidths) = self._getBands(u'ɑ')
+		default = coefficient_cache.lookup(frequencies, bandwidths)
+		preview = coefficient_cache.lookup(frequencies, bandwidths, parwave.PREVIEW_SAMPLE_RATE)
+		self.assertNotEqual(preview, default)
+		self.assertEqual(preview, parwave._computeCoefficients(frequencies, bandwidths, parwave.PREVIEW_SAMPLE_RATE))
+		self.assertEqual(coefficient_cache.getStatistics()['misses'], 2)
+		
+class PreviewTest(unittest.TestCase):
+	def testLowerRate(self):
+		"""
+		Preview output must be rendered at the preview rate, unless a lower
+		rate was asked for.
+		"""
+		for (sample_rate, expected_rate) in ((parwave.SAMPLE_RATE, parwave.PREVIEW_SAMPLE_RATE), (4000, 4000)):
+			synthesizer = parwave.Synthesizer(seed=1, sample_rate=sample_rate, preview=True)
+			self.assertEqual(synthesizer.getSampleRate(), expected_rate)
+			self.assertEqual(len(synthesizer.synthesize(_vowelParameters(100), 1.0, False)), 100 * expected_rate // 1000)
+			
+	def testFormantsArePruned(self):
+		"""
+		Formants at or above the preview limit must be dropped from the
+		network, along with every formant above them, while F1-F3 of every
+		phoneme must be kept.
+		"""
+		synthesizer = parwave.Synthesizer(seed=1, preview=True)
+		for parameters in ipa.IPA_PARAMETERS.values():
+			synthesizer._initResonators(parameters[0:11], parameters[11:22])
+			self.assertEqual(synthesizer._formant_count, 3)
+			
+		parameters = ipa.IPA_PARAMETERS[u's']
+		frequencies = parameters[0:7] + (parwave.PREVIEW_SAMPLE_RATE,) + parameters[8:11] #F3 at twice the Nyquist frequency.
+		synthesizer._initResonators(frequencies, parameters[11:22])
+		self.assertEqual(synthesizer._formant_count, 2)
+		(voiced, aspirated, cascaded, parallel_collection, bypassed) = synthesizer._planNetwork(0, 0, 0, 60, 0, (60,) * 5)
+		self.assertEqual([resonator for (resonator, amplitude) in parallel_collection], [synthesizer._parallel_resonators[0]])
+		
+		synthesizer = parwave.Synthesizer(seed=1)
+		synthesizer._initResonators(ipa.IPA_PARAMETERS[u'ɑ'][0:11], ipa.IPA_PARAMETERS[u'ɑ'][11:22])
+		self.assertEqual(synthesizer._formant_count, 6)
+		
+class ContinuousSynthesisTest(unittest.TestCase):
+	def testSynthesizeBeforeSilence(self):
+		"""
+		A fresh continuous synthesizer must render without silence first.
+		"""
+		for engine in _getEngines():
+			synthesizer = parwave.Synthesizer(engine, seed=1, continuous=True)
+			sounds = synthesizer.synthesize(_vowelParameters(100), 1.0, False)
+			self.assertEqual(len(sounds), 100 * synthesizer.getSampleRate() // 1000)
+			
+	def testIdenticalSoundsAreSmooth(self):
+		"""
+		Two identical consecutive sounds must join without a jump larger than
+		the sound's own peak, and must match one sound of twice the length.
+		"""
+		for engine in _getEngines():
+			synthesizer = parwave.Synthesizer(engine, seed=1, continuous=True)
+			first = synthesizer.synthesize(_vowelParameters(100), 1.0, False)
+			second = synthesizer.synthesize(_vowelParameters(100), 1.0, False)
+			peak = max([abs(sample) for sample in first])
+			self.assertTrue(peak > 0)
+			self.assertTrue(abs(second[0] - first[-1]) <= peak)
+			self.assertTrue(max([abs(sample) for sample in second]) <= 32767)
+			
+			whole = parwave.Synthesizer(engine, seed=1, continuous=True).synthesize(_vowelParameters(200), 1.0, False)
+			self.assertEqual(len(whole), len(first) + len(second))
+			self.assertTrue(max([abs(a - b) for (a, b) in zip(whole, first + second)]) <= 1)
+			
+if __name__ == '__main__':
+	unittest.main()
+	
+	
\ No newline at end of file
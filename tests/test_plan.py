@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_plan
+
+Purpose
+=======
+ Checks that utterance plans hold exactly the segments written to them, and
+ that files which are not complete plans are rejected.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import optparse
+import os
+import shutil
+import tempfile
+import unittest
+
+import src.parwave as parwave
+import src.plan as plan
+import src.transform as transform
+
+_OPTIONS = optparse.Values({'continuous': False, 'debug': False, 'turbo': False, 'verbose': False}) #: The options with which paragraphs are planned and rendered.
+_PARAGRAPHS = ((3, u'ɑ sɑ. mɑ?'), (7, u'tɑ hɑ!')) #: The paragraphs written to each plan, with their positions in an imagined script.
+
+def _describeSegments(segments):
+	"""
+	Describes segments in a form that compares equal whatever the types of
+	their values.
+	
+	@type segments: iterable
+	@param segments: The segments to be described.
+	
+	@rtype: list
+	@return: A tuple of each segment's kind and values, as floats.
+	"""
+	descriptions = []
+	for segment in segments:
+		values = segment[1:]
+		if segment[0] == transform.SEGMENT_SOUND:
+			values = tuple(segment[1]) + (segment[2],)
+		descriptions.append((segment[0], tuple([float(value) for value in values])))
+	return descriptions
+	
+def _renderSegments(segments):
+	"""
+	Renders segments with a fixed seed.
+	
+	@type segments: iterable
+	@param segments: The segments to be rendered.
+	
+	@rtype: list
+	@return: Every sample rendered, in order.
+	"""
+	samples = []
+	for sounds in transform.renderSegments(segments, _OPTIONS, parwave.Synthesizer(seed=1)):
+		samples.extend(sounds)
+	return samples
+	
+class PlanTest(unittest.TestCase):
+	def setUp(self):
+		self._directory = tempfile.mkdtemp()
+		self._path = os.path.join(self._directory, 'script.plan')
+		
+	def tearDown(self):
+		shutil.rmtree(self._directory)
+		
+	def _writePlan(self):
+		"""
+		Writes the test paragraphs to a plan.
+		"""
+		plan_writer = plan.PlanWriter(self._path)
+		for (paragraph_number, paragraph) in _PARAGRAPHS:
+			plan_writer.addParagraph(paragraph_number, transform.paragraphToSegments(paragraph, _OPTIONS, paragraph_number))
+		plan_writer.close()
+		
+	def _writeFile(self, data):
+		"""
+		Replaces the plan with arbitrary bytes.
+		
+		@type data: str
+		@param data: The file's new contents.
+		"""
+		plan_file = open(self._path, 'wb')
+		plan_file.write(data)
+		plan_file.close()
+		
+	def testRoundTrip(self):
+		"""
+		Every paragraph must be indexed by its position, and must read back as
+		the segments written, which render exactly as the text does.
+		"""
+		self._writePlan()
+		plan_reader = plan.PlanReader(self._path)
+		try:
+			paragraphs = plan_reader.getParagraphs()
+			self.assertEqual([paragraph_number for (paragraph_number, location) in paragraphs], [paragraph_number for (paragraph_number, paragraph) in _PARAGRAPHS])
+			for ((paragraph_number, location), (expected_number, paragraph)) in zip(paragraphs, _PARAGRAPHS):
+				segments = list(transform.paragraphToSegments(paragraph, _OPTIONS, paragraph_number))
+				self.assertEqual(_describeSegments(plan_reader.readSegments(*location)), _describeSegments(segments))
+				self.assertEqual(_renderSegments(plan_reader.readSegments(*location)), _renderSegments(segments))
+		finally:
+			plan_reader.close()
+			
+	def testEmptyPlan(self):
+		"""
+		A plan with no paragraphs must be read as such.
+		"""
+		plan.PlanWriter(self._path).close()
+		plan_reader = plan.PlanReader(self._path)
+		try:
+			self.assertEqual(plan_reader.getParagraphs(), [])
+		finally:
+			plan_reader.close()
+			
+	def testTruncatedPlan(self):
+		"""
+		A plan that ends partway through a record must be rejected.
+		"""
+		self._writePlan()
+		data = open(self._path, 'rb').read()
+		self._writeFile(data[:-1])
+		self.assertRaises(ValueError, plan.PlanReader, self._path)
+		
+	def testBadMagic(self):
+		"""
+		A file that does not begin with the plan's magic string, including one
+		too short to hold a header, must be rejected.
+		"""
+		self._writePlan()
+		data = open(self._path, 'rb').read()
+		self._writeFile('X' + data[1:])
+		self.assertRaises(ValueError, plan.PlanReader, self._path)
+		self._writeFile(data[:4])
+		self.assertRaises(ValueError, plan.PlanReader, self._path)
+		
+	def testMissingParagraph(self):
+		"""
+		A plan whose first record is not a paragraph must be rejected, without
+		leaving the file open.
+		"""
+		self._writePlan()
+		data = open(self._path, 'rb').read()
+		self._writeFile(data[:plan._HEADER.size] + data[plan._HEADER.size + plan._RECORD.size:])
+		
+		opened_files = []
+		def openFile(*arguments):
+			opened_files.append(open(*arguments))
+			return opened_files[-1]
+		plan.open = openFile #Shadows the built-in within the module, to watch the file.
+		try:
+			self.assertRaises(ValueError, plan.PlanReader, self._path)
+		finally:
+			del plan.open
+		self.assertEqual([plan_file.closed for plan_file in opened_files], [True])
+		
+if __name__ == '__main__':
+	unittest.main()
+	
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_render_cache
+
+Purpose
+=======
+ Checks that rendered sounds are keyed stably, evicted from memory by size,
+ stored on disk for later runs, and re-rendered when a stored sound is
+ corrupt.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import array
+import os
+import shutil
+import tempfile
+import unittest
+
+import src.ipa as ipa
+import src.parwave as parwave
+import src.render_cache as render_cache
+
+_PARAMETERS = ipa.IPA_PARAMETERS[u's'] #: The parameters of the sound keyed and rendered by the tests.
+
+def _makeKey(cache, seed=1, **changes):
+	"""
+	Produces the key of the test sound.
+	
+	@type cache: L{render_cache.RenderCache}
+	@param cache: The cache that produces the key.
+	@type seed: int
+	@param seed: The seed of the synthesizer's noise.
+	@type changes: dict
+	@param changes: Any other arguments of L{render_cache.RenderCache.makeKey}
+	    to be changed.
+	
+	@rtype: str
+	@return: The sound's key.
+	"""
+	arguments = {
+	 'parameters': _PARAMETERS,
+	 'f0_multiplier': 1.0,
+	 'turbo': False,
+	 'engine': parwave.ENGINE_REFERENCE,
+	 'seed': seed,
+	 'sample_rate': parwave.SAMPLE_RATE,
+	 'formant_limit': parwave.SAMPLE_RATE * 0.5,
+	}
+	arguments.update(changes)
+	return cache.makeKey(**arguments)
+	
+class KeyTest(unittest.TestCase):
+	def testKeysAreStable(self):
+		"""
+		Equal descriptions, by value, must produce equal keys, in any cache.
+		"""
+		key = _makeKey(render_cache.RenderCache())
+		self.assertEqual(_makeKey(render_cache.RenderCache()), key)
+		self.assertEqual(_makeKey(render_cache.RenderCache(), parameters=[float(p) for p in _PARAMETERS], f0_multiplier=1), key)
+		
+	def testKeysDistinguishSounds(self):
+		"""
+		Anything that changes a sound's samples must change its key.
+		"""
+		cache = render_cache.RenderCache()
+		keys = set((
+		 _makeKey(cache),
+		 _makeKey(cache, seed=2),
+		 _makeKey(cache, f0_multiplier=1.5),
+		 _makeKey(cache, turbo=True),
+		 _makeKey(cache, engine=parwave.ENGINE_VECTORIZED),
+		 _makeKey(cache, sample_rate=parwave.PREVIEW_SAMPLE_RATE),
+		 _makeKey(cache, formant_limit=1000),
+		 _makeKey(cache, parameters=_PARAMETERS[:-1] + (_PARAMETERS[-1] + 1,)),
+		))
+		self.assertEqual(len(keys), 8)
+		
+	def testNegativeSeed(self):
+		"""
+		A synthesizer given a negative seed must key its sounds as it would
+		with the seed's lowest 32 bits.
+		"""
+		samples = parwave.Synthesizer(seed=-1, render_cache=render_cache.RenderCache()).synthesize(_PARAMETERS, 1.0, False)
+		self.assertEqual(parwave.Synthesizer(seed=0xFFFFFFFF, render_cache=render_cache.RenderCache()).synthesize(_PARAMETERS, 1.0, False), samples)
+		
+class MemoryTest(unittest.TestCase):
+	def testEvictionBySize(self):
+		"""
+		The least-recently-used sounds must be evicted once the bytes held
+		would exceed the limit, and a sound larger than the limit must not be
+		held at all.
+		"""
+		cache = render_cache.RenderCache(memory_limit=100)
+		cache.store('a', [1] * 20) #40 bytes.
+		cache.store('b', [2] * 20)
+		self.assertEqual(cache.lookup('a').tolist(), [1] * 20) #'b' is now the least-recently used.
+		cache.store('c', [3] * 20)
+		self.assertEqual(cache.lookup('b'), None)
+		self.assertEqual(cache.lookup('a').tolist(), [1] * 20)
+		self.assertEqual(cache.lookup('c').tolist(), [3] * 20)
+		cache.store('d', [4] * 51)
+		self.assertEqual(cache.lookup('d'), None)
+		
+		statistics = cache.getStatistics()
+		self.assertEqual(statistics['evictions'], 1)
+		self.assertEqual(statistics['entries'], 2)
+		self.assertEqual(statistics['bytes'], 80)
+		
+class DiskTest(unittest.TestCase):
+	def setUp(self):
+		self._directory = tempfile.mkdtemp()
+		
+	def tearDown(self):
+		shutil.rmtree(self._directory)
+		
+	def testRoundTrip(self):
+		"""
+		A sound stored on disk must be found, unchanged, by another cache using
+		the same directory.
+		"""
+		samples = array.array('h', (-32768, -1, 0, 1, 32767))
+		render_cache.RenderCache(directory=self._directory).store('a', samples)
+		cache = render_cache.RenderCache(directory=self._directory)
+		self.assertEqual(cache.lookup('a'), samples)
+		self.assertEqual(cache.getStatistics()['disk_hits'], 1)
+		
+	def testCorruptEntry(self):
+		"""
+		A stored sound that is not a whole number of samples must be treated as
+		a miss and removed, so the sound is rendered again.
+		"""
+		synthesizer = parwave.Synthesizer(seed=1, render_cache=render_cache.RenderCache(directory=self._directory))
+		samples = synthesizer.synthesize(_PARAMETERS, 1.0, False)
+		(filename,) = os.listdir(self._directory)
+		path = os.path.join(self._directory, filename)
+		pcm_file = open(path, 'wb')
+		pcm_file.write('\x00' * 3)
+		pcm_file.close()
+		
+		cache = render_cache.RenderCache(directory=self._directory)
+		self.assertEqual(cache.lookup(filename[:-len('.pcm')]), None)
+		self.assertFalse(os.path.exists(path))
+		
+		synthesizer = parwave.Synthesizer(seed=1, render_cache=render_cache.RenderCache(directory=self._directory))
+		self.assertEqual(synthesizer.synthesize(_PARAMETERS, 1.0, False), samples)
+		self.assertEqual(os.path.getsize(path), len(samples) * samples.itemsize)
+		
+if __name__ == '__main__':
+	unittest.main()
+	
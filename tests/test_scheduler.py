@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_scheduler
+
+Purpose
+=======
+ Checks that scripts are divided into balanced chunks that rejoin into the
+ original, and that a balanced render does not depend on the number of
+ processes.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import optparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import src.parwave as parwave
+import src.scheduler as scheduler
+import src.transform as transform
+
+_OPTIONS = optparse.Values({'continuous': False, 'debug': False, 'turbo': False, 'verbose': False}) #: The options with which paragraphs are planned.
+_KLATT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'klatt.py') #: The command-line interface that renders scripts.
+_PARAGRAPHS = (u'ɑ sɑ. mɑ? tɑ hɑ!', u'sɑʒɑ mɑmɑ.', u'ɑ.') #: The script divided and rendered by the tests, with paragraphs of unequal length.
+
+def _layOut():
+	"""
+	Lays out the test script's segments.
+	
+	@rtype: list
+	@return: The placed segments, as produced by L{transform.layoutSegments}.
+	"""
+	paragraphs = [(i, transform.paragraphToSegments(paragraph, _OPTIONS, i)) for (i, paragraph) in enumerate(_PARAGRAPHS, 1)]
+	return transform.layoutSegments(paragraphs, parwave.SAMPLE_RATE, 1)
+	
+class ScheduleChunksTest(unittest.TestCase):
+	def testNoSegments(self):
+		"""
+		An empty script must have no chunks.
+		"""
+		self.assertEqual(scheduler.scheduleChunks([], 4), [])
+		
+	def testChunksRejoin(self):
+		"""
+		Chunks must be non-empty and must rejoin into the original segments,
+		for any number of jobs.
+		"""
+		placed_segments = _layOut()
+		for jobs in (1, 2, 3, 8, 1000):
+			chunks = scheduler.scheduleChunks(placed_segments, jobs)
+			self.assertTrue(chunks)
+			self.assertTrue(all(chunks))
+			self.assertEqual(sum(chunks, []), placed_segments)
+			
+	def testChunksAreBalanced(self):
+		"""
+		No chunk may cost more than its share of the total by more than a
+		single sound, the finest division segment boundaries allow.
+		"""
+		placed_segments = _layOut()
+		costs = [sample_count for (segment, position, sample_count, seed) in placed_segments if segment[0] == transform.SEGMENT_SOUND]
+		for jobs in (1, 2, 3):
+			chunks = scheduler.scheduleChunks(placed_segments, jobs)
+			share = sum(costs) / float(len(chunks))
+			for chunk in chunks:
+				cost = sum([sample_count for (segment, position, sample_count, seed) in chunk if segment[0] == transform.SEGMENT_SOUND])
+				self.assertTrue(cost <= share + max(costs))
+				
+class BalancedRenderTest(unittest.TestCase):
+	def setUp(self):
+		self._directory = tempfile.mkdtemp()
+		
+	def tearDown(self):
+		shutil.rmtree(self._directory)
+		
+	def _render(self, jobs, seed=1):
+		"""
+		Renders the test script with --balance.
+		
+		@type jobs: int
+		@param jobs: The number of processes to render with.
+		@type seed: int
+		@param seed: The seed given on the command line.
+		
+		@rtype: str
+		@return: The contents of the wavefile written.
+		"""
+		script_path = os.path.join(self._directory, 'script.txt')
+		script = open(script_path, 'wb')
+		script.write(u'\n'.join(_PARAGRAPHS).encode('utf-8'))
+		script.close()
+		
+		output_path = os.path.join(self._directory, 'output-%i-%i.wav' % (jobs, seed))
+		subprocess.check_call(
+		 (sys.executable, _KLATT, '--balance', '--jobs=%i' % (jobs), '--seed=%i' % (seed), '--output=%s' % (output_path), script_path),
+		 stdout=open(os.devnull, 'w')
+		)
+		return open(output_path, 'rb').read()
+		
+	def testOutputIgnoresJobCount(self):
+		"""
+		The wavefile must be the same, byte for byte, however many processes
+		render it.
+		"""
+		single = self._render(1)
+		self.assertTrue(len(single) > 44) #More than a header.
+		for jobs in (2, 3):
+			self.assertEqual(self._render(jobs), single)
+			
+	def testNegativeSeed(self):
+		"""
+		A negative seed must be accepted, and must name the same noise as the
+		unsigned seed with the same lowest 32 bits.
+		"""
+		negative = self._render(2, -1)
+		self.assertTrue(len(negative) > 44) #More than a header.
+		self.assertEqual(negative, self._render(2, 0xFFFFFFFF))
+		
+if __name__ == '__main__':
+	unittest.main()
+	
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_transform
+
+Purpose
+=======
+ Checks that paragraphs are divided into sentences by their punctuation, and
+ that invalid words are reported at the right place.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, 2009
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import klatt
+import src.transform as transform
+
+class SentenceTest(unittest.TestCase):
+	def testSentenceEndings(self):
+		"""
+		Every ending must close a sentence, marked by its punctuation, and a
+		paragraph without final punctuation must keep its last sentence.
+		"""
+		sentences = transform._extractSentences(u'ɑ. ɑ? sɑ! ɑ?! mɑ ɑ')
+		self.assertEqual([markup for (words, markup) in sentences], [
+		 (),
+		 (transform._SENTENCE_QUESTION,),
+		 (transform._SENTENCE_EXCLAMATION,),
+		 (transform._SENTENCE_QUESTION, transform._SENTENCE_EXCLAMATION),
+		 (),
+		])
+		self.assertEqual([[word for (word, markup) in words] for (words, markup) in sentences], [
+		 [u'ɑ'], [u'ɑ'], [u'sɑ'], [u'ɑ'], [u'mɑ', u'ɑ'],
+		])
+		
+	def testEmptyParagraph(self):
+		"""
+		A paragraph with no words must have no sentences.
+		"""
+		self.assertEqual(transform._extractSentences(u''), [])
+		
+class InvalidTokenTest(unittest.TestCase):
+	def _getError(self, paragraph, paragraph_number=None):
+		"""
+		Extracts the sentences of an invalid paragraph.
+		
+		@type paragraph: unicode
+		@param paragraph: The paragraph, which must contain an invalid word.
+		@type paragraph_number: int|None
+		@param paragraph_number: The paragraph's position in its script.
+		
+		@rtype: unicode
+		@return: The message of the error raised.
+		"""
+		try:
+			transform._extractSentences(paragraph, paragraph_number)
+		except ValueError, e:
+			return unicode(e)
+		self.fail("No error was raised for %r." % (paragraph))
+		
+	def testInvalidCharacter(self):
+		"""
+		The offending character must be named, at its offset within the
+		paragraph.
+		"""
+		self.assertEqual(
+		 self._getError(u'ɑ. mɑ s#ɑ', 4),
+		 u"Invalid character U+0023 at offset 7, in word 2, sentence 2, paragraph 4."
+		)
+		
+	def testMisplacedMarkup(self):
+		"""
+		A word made of valid characters in the wrong order must be reported
+		at the word's offset.
+		"""
+		self.assertEqual(
+		 self._getError(u'ɑ ,ɑ'),
+		 u"Misplaced markup in the word at offset 2, word 2, sentence 1."
+		)
+		
+	def testOffsetIsRelativeToStrippedLine(self):
+		"""
+		Offsets must count from the start of the paragraph as read, after
+		surrounding whitespace and the byte-order mark are removed.
+		"""
+		directory = tempfile.mkdtemp()
+		try:
+			path = os.path.join(directory, 'script.txt')
+			script = open(path, 'wb')
+			script.write(u'﻿  ɑ s#  \r\n\n\tɑ #\n'.encode('utf-8'))
+			script.close()
+			paragraphs = list(klatt._readParagraphs(path))
+		finally:
+			shutil.rmtree(directory)
+		self.assertEqual(paragraphs, [u'ɑ s#', u'ɑ #'])
+		self.assertTrue(u" at offset 3," in self._getError(paragraphs[0]))
+		self.assertTrue(u" at offset 2," in self._getError(paragraphs[1]))
+		
+if __name__ == '__main__':
+	unittest.main()
+	
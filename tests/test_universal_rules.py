@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+CPSC 599 module: tests.test_universal_rules
+
+Purpose
+=======
+ Checks that the universal rules blend phonemes as they did before blends
+ were tabulated, that phonemes expanded through the expansion table match
+ fresh expansions, that the table is bounded, and that stored expansions
+ cannot be altered.
+
+ Run from the project's root with C{python -m unittest discover tests}.
+
+Legal
+=====
+ All code, unless otherwise indicated, is original, and subject to the
+ terms of the GPLv3, which is provided in COPYING.
+
+ (C) Neil Tallim, Sydni Bennie, 2009
+"""
+import itertools
+import operator
+import unittest
+
+import src.ipa as ipa
+import src.universal_rules as universal_rules
+
+_PHONEMES = (u'ɑ', u'i', u's', u'm', u'n', u't', u'h') #: Phonemes that exercise nasalization, bridging and contour-shaping, combined by the tests.
+
+def _getSound(ipa_character):
+	"""
+	Provides the unaltered sound of a phoneme, as the rules receive it.
+	
+	@type ipa_character: unicode
+	@param ipa_character: The phoneme whose sound is wanted.
+	
+	@rtype: list
+	@return: A list of the phoneme's parameters, including its duration.
+	"""
+	return list(ipa.IPA_PARAMETERS[ipa_character])
+	
+def _blend(values, other, weight, other_weight):
+	"""
+	Blends a sound with a phoneme as the universal rules did before blends
+	were tabulated.
+	
+	@type values: sequence
+	@param values: The sound's parameters.
+	@type other: unicode
+	@param other: The phoneme blended with it.
+	@type weight: int
+	@param weight: The sound's share.
+	@type other_weight: int
+	@param other_weight: The phoneme's share.
+	
+	@rtype: list
+	@return: The blended parameters, without a duration.
+	"""
+	return [(c * weight + o * other_weight) / (weight + other_weight) for (c, o) in zip(values[:32], ipa.IPA_PARAMETERS[other][:32])]
+	
+def _getContexts():
+	"""
+	Describes every phoneme of the tests, between every pair of neighbours,
+	with differing phonemes beyond them, at the start of a word after every
+	previous word, and alone.
+	
+	@rtype: list
+	@return: A (phoneme, preceding phonemes, following phonemes, previous
+	    words) tuple for each context.
+	"""
+	contexts = []
+	for (ipa_character, preceding_phoneme, following_phoneme) in itertools.product(_PHONEMES, repeat=3):
+		for outer_phoneme in (u'ɑ', u's'):
+			contexts.append((ipa_character, [outer_phoneme, preceding_phoneme], [following_phoneme, outer_phoneme], []))
+		for previous_word in (u'sɑ', u'ɑs', u'ɑm'):
+			contexts.append((ipa_character, [], [following_phoneme], [u'ɑ', previous_word]))
+	for ipa_character in _PHONEMES:
+		contexts.append((ipa_character, [], [], []))
+	return contexts
+	
+class BlendTest(unittest.TestCase):
+	def _assertSounds(self, parameters_list, expected):
+		"""
+		Compares sounds, whatever sequence types hold them.
+		"""
+		self.assertEqual([list(parameters) for parameters in parameters_list], expected)
+		
+	def testContour(self):
+		"""
+		A phoneme between two others must gain lead-ins and lead-outs blended
+		with them, and lose 15ms from each end.
+		"""
+		sound = _getSound(u'ɑ')
+		self._assertSounds(universal_rules.shapeContours(u'ɑ', [u's'], [u'l'], [sound]), [
+		 _blend(sound, u's', 2, 1) + [15],
+		 sound[:32] + [sound[32] - 30],
+		 _blend(sound, u'l', 2, 1) + [15],
+		])
+		
+	def testLiaison(self):
+		"""
+		A vowel that begins a word after a consonant must gain a sound blended
+		equally with the consonant.
+		"""
+		sound = _getSound(u'ɑ')
+		self._assertSounds(universal_rules.bridgeWords(u'ɑ', [], [], [u'sɑm'], [sound]), [
+		 _blend(sound, u'm', 1, 1) + [50],
+		 sound,
+		])
+		
+	def testNasal(self):
+		"""
+		A vowel before a nasal must be halved and followed by a lead-in and a
+		terminator blended with the nasal.
+		"""
+		sound = _getSound(u'i')
+		self._assertSounds(universal_rules.nasalizeVowel(u'i', [u'n'], [sound]), [
+		 sound[:32] + [int(sound[32] * 0.5)],
+		 _blend(sound, u'n', 2, 1) + [int(sound[32] * 0.167)],
+		 _blend(sound, u'n', 1, 2) + [int(sound[32] * 0.333)],
+		])
+		
+	def testAlteredSounds(self):
+		"""
+		Sounds that are not a phoneme's own must be blended directly, rather
+		than taken from the tables.
+		"""
+		sound = _getSound(u'h')
+		self._assertSounds(universal_rules.shapeContours(u'ɑ', [u's'], [], [sound]), [
+		 _blend(sound, u's', 2, 1) + [15],
+		 sound[:32] + [sound[32] - 15],
+		])
+		
+class ExpansionCacheTest(unittest.TestCase):
+	def testHitsMatchFreshExpansions(self):
+		"""
+		Every expansion, whether stored or not, must equal a fresh expansion in
+		its own context.
+		"""
+		expansion_cache = universal_rules.ExpansionCache()
+		contexts = _getContexts()
+		for context in contexts + contexts:
+			(ipa_character, preceding_phonemes, following_phonemes, previous_words) = context
+			parameters = ipa.IPA_PARAMETERS[ipa_character]
+			self.assertEqual(
+			 expansion_cache.lookup(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters),
+			 universal_rules._expand(ipa_character, preceding_phonemes, following_phonemes, previous_words, parameters)
+			)
+		statistics = expansion_cache.getStatistics()
+		self.assertTrue(statistics['hits'] >= len(contexts))
+		self.assertEqual(statistics['hits'] + statistics['misses'], len(contexts) * 2)
+		
+	def testEviction(self):
+		"""
+		A full table must evict its least-recently-used expansion, and a table
+		with no capacity must store nothing.
+		"""
+		expansion_cache = universal_rules.ExpansionCache(2)
+		for ipa_character in (u'ɑ', u's', u'ɑ', u'm'):
+			expansion_cache.lookup(ipa_character, [], [], [], ipa.IPA_PARAMETERS[ipa_character])
+		statistics = expansion_cache.getStatistics()
+		self.assertEqual((statistics['hits'], statistics['misses'], statistics['evictions'], statistics['entries']), (1, 3, 1, 2))
+		expansion_cache.lookup(u'ɑ', [], [], [], ipa.IPA_PARAMETERS[u'ɑ'])
+		self.assertEqual(expansion_cache.getStatistics()['hits'], 2)
+		expansion_cache.lookup(u's', [], [], [], ipa.IPA_PARAMETERS[u's'])
+		self.assertEqual(expansion_cache.getStatistics()['misses'], 4)
+		
+		expansion_cache = universal_rules.ExpansionCache(0)
+		for i in xrange(2):
+			expansion_cache.lookup(u'ɑ', [], [], [], ipa.IPA_PARAMETERS[u'ɑ'])
+		statistics = expansion_cache.getStatistics()
+		self.assertEqual((statistics['hits'], statistics['misses'], statistics['entries']), (0, 2, 0))
+		
+	def testExpansionsAreImmutable(self):
+		"""
+		Expansions must be tuples of tuples, so callers cannot alter what is
+		stored.
+		"""
+		expansion_cache = universal_rules.ExpansionCache()
+		expansion = expansion_cache.lookup(u'ɑ', [], [u'm'], [], ipa.IPA_PARAMETERS[u'ɑ'])
+		self.assertTrue(isinstance(expansion, tuple))
+		self.assertTrue(expansion)
+		for parameters in expansion:
+			self.assertTrue(isinstance(parameters, tuple))
+		self.assertRaises(TypeError, operator.setitem, expansion, 0, ())
+		self.assertRaises(TypeError, operator.setitem, expansion[0], 0, 0)
+		self.assertEqual(expansion_cache.lookup(u'ɑ', [], [u'm'], [], ipa.IPA_PARAMETERS[u'ɑ']), expansion)
+		
+if __name__ == '__main__':
+	unittest.main()
+	